@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite
+Starts the stub upstreams (benchmarks/stub_upstreams.py) in a child process,
+points the services at them and drives three layers at each concurrency level:
+
+  mcp           MCP tool calls through the tool registry, serialized like server.py
+  orchestrator  MusicDiscoveryOrchestrator.search_all_platforms
+  http          the FastAPI routes of web_server.py, in process over ASGI
+
+For every scenario and concurrency level it reports p50/p95/p99 latency,
+throughput, errors and memory, and writes the results as JSON so runs from
+different commits can be compared with --compare.
+
+With --cassette the stubs are skipped and upstream responses are replayed from
+a recorded cassette (see servicies/cassette.py) instead, so the same load runs
+against real-shaped data.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import platform as platform_module
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_upstreams import DISTRIBUTIONS, PLATFORMS, StubServer, UpstreamProfile, point_at_stubs
+
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# A request factory takes the request number and returns the awaitable to time
+RequestFactory = Callable[[int], Awaitable[Any]]
+
+def configure_environment(tmp_dir: str) -> None:
+    """Credentials and settings for a benchmark run, set before the server modules are imported
+
+    Anything that would touch the user's own state (disk cache, index, YouTube
+    quota file, trace file) is always redirected; rate limits are lifted unless already set.
+    """
+    os.environ.update({
+        'SPOTIFY_CLIENT_ID': 'bench-client-id',
+        'SPOTIFY_CLIENT_SECRET': 'bench-client-secret',
+        'YOUTUBE_API_KEY': 'bench-youtube-key',
+        'LASTFM_API_KEY': 'bench-lastfm-key',
+        'CACHE_DISK': 'false',
+        'LOCAL_INDEX_PERSIST': 'false',
+        'YOUTUBE_QUOTA_PATH': os.path.join(tmp_dir, 'youtube_quota.json'),
+        'TRACE_PATH': os.path.join(tmp_dir, 'traces.jsonl'),
+    })
+    for name in PLATFORMS:
+        os.environ.setdefault(f'{name.upper()}_RATE_LIMIT', '1000000')
+        os.environ.setdefault(f'{name.upper()}_RATE_BURST', '1000000')
+    os.environ.setdefault('YOUTUBE_DAILY_QUOTA', str(10 ** 12))
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def rss_mb() -> float:
+    """Current resident set size in MiB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+def is_error(result: Any) -> bool:
+    """Whether a tool result or HTTP response reports a failure"""
+    if hasattr(result, "status_code"):
+        if result.status_code >= 400:
+            return True
+        # Routes report an unavailable provider as an error item in "results"
+        body = result.json()
+        return isinstance(body, dict) and is_error(body.get("results"))
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return "error" in result[0]
+    return False
+
+async def run_level(make_request: RequestFactory, requests: int, concurrency: int, trace_memory: bool) -> Dict[str, Any]:
+    """Run requests with at most concurrency in flight (closed loop) and summarize them"""
+    latencies: List[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_request
+        while next_request < requests:
+            number = next_request
+            next_request += 1
+            start = time.perf_counter()
+            try:
+                result = await make_request(number)
+            except Exception:
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += is_error(result)
+
+    gc.collect()
+    rss_before = rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    duration = time.perf_counter() - start
+    memory: Dict[str, Any] = {"rss_before_mb": round(rss_before, 1), "rss_after_mb": round(rss_mb(), 1)}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory.update({"traced_current_mb": round(current / 2 ** 20, 2), "traced_peak_mb": round(peak / 2 ** 20, 2)})
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "memory": memory,
+    }
+
+def build_scenarios(server: Any, http_client: Any, limit: int, query_pool: int) -> Dict[str, RequestFactory]:
+    """Request factories by scenario name
+
+    Queries are unique per request so every call goes upstream, unless query_pool
+    limits them to that many distinct queries to exercise the cache.
+    """
+    from serialization import dumps
+    from tool_registry import registry
+
+    def query(number: int) -> str:
+        return f"bench query {number % query_pool if query_pool else number}"
+
+    async def mcp_tool(name: str, arguments: Dict[str, Any]) -> Any:
+        result = await registry.call(server, name, arguments)
+        # Serialized as server.py does, so the cost of the result text is included
+        dumps(result)
+        return result
+
+    return {
+        "mcp.search_spotify_tracks": lambda n: mcp_tool("search_spotify_tracks", {"query": query(n), "limit": limit}),
+        "mcp.search_youtube_videos": lambda n: mcp_tool("search_youtube_videos", {"query": query(n), "max_results": limit}),
+        "mcp.search_lastfm_songs": lambda n: mcp_tool("search_lastfm_songs", {"query": query(n), "limit": limit}),
+        "mcp.search_all_platforms": lambda n: mcp_tool("search_all_platforms", {"query": query(n), "limit": limit}),
+        "orchestrator.search_all_platforms": lambda n: server.orchestrator.search_all_platforms(query(n), limit),
+        "http.search_spotify": lambda n: http_client.get(f"/search/spotify/{query(n)}", params={"limit": limit}),
+        "http.search_all": lambda n: http_client.get(f"/search/all/{query(n)}", params={"limit": limit}),
+        "http.tool_search_all_platforms": lambda n: http_client.post(
+            "/tools/search_all_platforms", json={"query": query(n), "limit": limit}
+        ),
+    }
+
+def select(scenarios: Dict[str, RequestFactory], patterns: List[str]) -> List[str]:
+    """Scenario names matching any pattern: an exact name or a layer prefix such as "mcp" """
+    chosen = [name for name in scenarios if any(name == p or name.startswith(f"{p}.") for p in patterns)]
+    unknown = [p for p in patterns if not any(name == p or name.startswith(f"{p}.") for name in scenarios)]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+    return chosen
+
+def git_revision() -> Tuple[Optional[str], bool]:
+    """Current commit and whether the working tree has changes"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+async def run_suite(args: argparse.Namespace, stub_url: Optional[str]) -> List[Dict[str, Any]]:
+    import httpx
+
+    import web_server
+    from mcp_server_class import MCPServer
+
+    # MCP and orchestrator scenarios use their own server; HTTP ones use the app's
+    server = MCPServer()
+    if stub_url is not None:
+        point_at_stubs(server, stub_url)
+        point_at_stubs(web_server.music_server, stub_url)
+
+    results = []
+    await server.startup()
+    try:
+        async with web_server.lifespan(web_server.app):
+            transport = httpx.ASGITransport(app=web_server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http_client:
+                scenarios = build_scenarios(server, http_client, args.limit, args.query_pool)
+                # Request numbers keep counting across scenarios and levels, so no run is served
+                # from the cache a previous one filled (unless --query-pool asks for that)
+                sequence = 0
+                for name in select(scenarios, args.scenarios):
+                    # Warm up connections, tokens and code paths outside the measurement
+                    for number in range(args.warmup):
+                        await scenarios[name](sequence + number)
+                    sequence += args.warmup
+                    for concurrency in args.concurrency:
+                        result = await run_level(
+                            lambda n, start=sequence: scenarios[name](start + n),
+                            args.requests, concurrency, args.trace_memory
+                        )
+                        sequence += args.requests
+                        result = {"scenario": name, **result}
+                        results.append(result)
+                        latency = result["latency_ms"]
+                        print(f"{name:36} c={concurrency:<4} p50={latency['p50']:8.2f}ms p95={latency['p95']:8.2f}ms "
+                              f"p99={latency['p99']:8.2f}ms {result['throughput_rps']:8.1f} req/s "
+                              f"errors={result['errors']} rss={result['memory']['rss_after_mb']}MiB", flush=True)
+    finally:
+        await server.shutdown()
+    return results
+
+def compare(baseline_path: str, results: List[Dict[str, Any]]) -> None:
+    """Print the change against a saved run for every scenario and concurrency level in both"""
+    from serialization import loads
+
+    with open(baseline_path, "rb") as baseline_file:
+        baseline = loads(baseline_file.read())
+    previous = {(item["scenario"], item["concurrency"]): item for item in baseline["results"]}
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "     n/a"
+
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')})")
+    for item in results:
+        old = previous.get((item["scenario"], item["concurrency"]))
+        if old is None:
+            continue
+        print(f"{item['scenario']:36} c={item['concurrency']:<4} "
+              + " ".join(f"{key}={change(item['latency_ms'][key], old['latency_ms'][key])}" for key in ("p50", "p95", "p99"))
+              + f" throughput={change(item['throughput_rps'], old['throughput_rps'])}")
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server, orchestrator and HTTP API against stub upstreams")
+    parser.add_argument("--scenarios", default="mcp,orchestrator,http",
+                        help="Comma-separated scenario names or layers: mcp, orchestrator, http (default: all)")
+    parser.add_argument("-c", "--concurrency", default="1,8,32",
+                        help="Comma-separated concurrency levels (default: 1,8,32)")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Requests per scenario and level (default: 200)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario (default: 5)")
+    parser.add_argument("--limit", type=int, default=10, help="Results requested per search (default: 10)")
+    parser.add_argument("--query-pool", type=int, default=0,
+                        help="Reuse this many distinct queries to measure cache hits (default: 0, every query unique)")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal",
+                        help="Upstream latency distribution (default: lognormal)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Median upstream latency (default: 50)")
+    parser.add_argument("--spread", type=float, default=0.5, help="Upstream latency spread (default: 0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls that fail (default: 0)")
+    parser.add_argument("--max-items", type=int, default=50, help="Most items per upstream page (default: 50)")
+    parser.add_argument("--text-bytes", type=int, default=200, help="Length of upstream description fields (default: 200)")
+    parser.add_argument("--profile", action="append", default=[], metavar="PLATFORM:KEY=VALUE,...",
+                        help="Override one platform, e.g. youtube:latency_ms=120,error_rate=0.05")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for upstream latencies and errors")
+    parser.add_argument("--cassette", default=None, metavar="PATH",
+                        help="Replay upstream responses from a recorded cassette instead of the stubs")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier for recorded latencies when replaying a cassette; 0 replays instantly (default: 1)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report Python heap peaks with tracemalloc (slows every request down)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Results file (default: benchmarks/results/offline-<commit>.json)")
+    parser.add_argument("--compare", default=None, metavar="BASELINE.json", help="Print changes against a saved run")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    return args
+
+def main() -> None:
+    args = parse_args()
+    base = UpstreamProfile(
+        distribution=args.distribution, latency_ms=args.latency_ms, spread=args.spread,
+        error_rate=args.error_rate, max_items=args.max_items, text_bytes=args.text_bytes
+    )
+    profiles = {name: base for name in PLATFORMS}
+    for spec in args.profile:
+        name, _, values = spec.partition(":")
+        if name not in PLATFORMS:
+            raise SystemExit(f"Unknown platform in --profile: {name}")
+        profiles[name] = profiles[name].with_overrides(values)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_environment(tmp_dir)
+        if args.cassette:
+            # Benchmark queries are never the recorded ones, so fall back to any recording of the endpoint
+            os.environ.update({
+                'CASSETTE_MODE': 'replay',
+                'CASSETTE_PATH': os.path.abspath(os.path.expanduser(args.cassette)),
+                'CASSETTE_MATCH': 'endpoint',
+                'CASSETTE_TIME_SCALE': str(args.time_scale),
+            })
+            results = asyncio.run(run_suite(args, None))
+        else:
+            os.environ['CASSETTE_MODE'] = 'off'
+            with StubServer(profiles, seed=args.seed) as stubs:
+                results = asyncio.run(run_suite(args, stubs.base_url))
+
+    from serialization import backend, dumps_bytes
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform_module.python_version(),
+            "platform": platform_module.platform(),
+            "cpus": os.cpu_count(),
+            "serializer": backend(),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "upstreams": (
+                {"cassette": os.environ['CASSETTE_PATH'], "time_scale": args.time_scale} if args.cassette
+                else {name: profile.model_dump() for name, profile in profiles.items()}
+            ),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"offline-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "wb") as output_file:
+        output_file.write(dumps_bytes(report, pretty=True))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
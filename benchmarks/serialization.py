@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for response serialization
+Serializes a synthetic search_all_platforms response with each serializer
+option and reports time per call and body size, raw and compressed.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import dumps_bytes, orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def make_response(results: int) -> Dict[str, Any]:
+    """A search_all_platforms-shaped response with `results` items per platform and type"""
+    def track(platform: str, i: int) -> Dict[str, Any]:
+        return {
+            "id": f"{platform}-track-{i:04d}",
+            "name": f"Bench Song {i} (Remastered)",
+            "artist": f"Bench Artist {i % 17}",
+            "album": f"Bench Album {i % 5}",
+            "duration_ms": 180000 + i,
+            "popularity": i % 100,
+            "spotify_url": f"https://open.spotify.com/track/{platform}-track-{i:04d}",
+            "preview_url": None,
+            "image_url": f"https://i.scdn.co/image/{i:040d}",
+        }
+
+    def video(i: int) -> Dict[str, Any]:
+        return {
+            "id": f"video{i:06d}",
+            "title": f"Bench Artist {i % 17} - Bench Song {i} (Official Video)",
+            "channel": f"BenchArtist{i % 17}VEVO",
+            "description": "Official music video. Listen on all platforms. " * 3,
+            "published_at": "2020-01-01T00:00:00Z",
+            "thumbnail": f"https://i.ytimg.com/vi/video{i:06d}/hqdefault.jpg",
+            "youtube_url": f"https://www.youtube.com/watch?v=video{i:06d}",
+        }
+
+    return {
+        "query": "bench",
+        "spotify": {"tracks": [track("spotify", i) for i in range(results)], "artists": [], "albums": []},
+        "youtube": {"videos": [video(i) for i in range(results)], "playlists": []},
+        "lastfm": {"tracks": [track("lastfm", i) for i in range(results)], "artists": [], "albums": []},
+        "platforms": {platform: {"status": "ok", "latency_ms": 120.5, "circuit": "closed"}
+                      for platform in ("spotify", "youtube", "lastfm")},
+        "status": "success",
+    }
+
+def time_call(func: Callable[[], bytes], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+def run(results: int, iterations: int) -> None:
+    response = make_response(results)
+    options = {
+        "json indent=2 (old)": lambda: json.dumps(response, indent=2).encode("utf-8"),
+        "json compact": lambda: json.dumps(response, separators=(',', ':')).encode("utf-8"),
+    }
+    if orjson is not None:
+        options["orjson compact"] = lambda: dumps_bytes(response)
+        options["orjson pretty"] = lambda: dumps_bytes(response, pretty=True)
+    else:
+        print("orjson is not installed; only the json module is measured")
+
+    baseline = len(options["json indent=2 (old)"]())
+    print(f"items per platform/type: {results}, iterations: {iterations}")
+    print(f"{'serializer':<22} {'time/call':>11} {'bytes':>9} {'vs old':>7}")
+    for name, func in options.items():
+        seconds = time_call(func, iterations)
+        size = len(func())
+        print(f"{name:<22} {seconds * 1e6:>9.0f}us {size:>9} {size / baseline:>6.0%}")
+
+    body = dumps_bytes(response)
+    codecs = {"gzip level 6": lambda: gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        codecs["brotli quality 4"] = lambda: brotli.compress(body, quality=4)
+    else:
+        print("brotli is not installed; only gzip is measured")
+
+    print(f"\ncompressing the compact body ({len(body)} bytes)")
+    print(f"{'codec':<22} {'time/call':>11} {'bytes':>9} {'ratio':>7}")
+    for name, func in codecs.items():
+        seconds = time_call(func, max(1, iterations // 10))
+        size = len(func())
+        print(f"{name:<22} {seconds * 1e6:>9.0f}us {size:>9} {size / len(body):>6.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("-r", "--results", type=int, default=50, help="Items per platform and type (default: 50)")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="Iterations per option (default: 200)")
+    args = parser.parse_args()
+    run(args.results, args.iterations)
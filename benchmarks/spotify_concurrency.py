@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for concurrent Spotify searches
+Runs N searches through SpotifyService against a mock transport with a fixed
+simulated round-trip time, first one after another and then concurrently.
+With a non-blocking client the concurrent run should take about one round-trip.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servicies.spotify_service import SpotifyService
+
+def make_transport(latency: float) -> httpx.MockTransport:
+    """Mock Spotify token and search endpoints that answer after `latency` seconds"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            return httpx.Response(200, json={"access_token": "bench-token", "expires_in": 3600})
+
+        await asyncio.sleep(latency)
+        track = {
+            "id": "track-id",
+            "name": request.url.params.get("q", ""),
+            "artists": [{"name": "Bench Artist"}],
+            "album": {"name": "Bench Album", "release_date": "2020-01-01", "images": []},
+            "duration_ms": 200000,
+            "popularity": 50,
+            "external_urls": {"spotify": "https://open.spotify.com/track/track-id"},
+            "preview_url": None
+        }
+        return httpx.Response(200, json={"tracks": {"items": [track]}})
+
+    return httpx.MockTransport(handler)
+
+async def run(searches: int, latency: float) -> None:
+    service = SpotifyService("bench-id", "bench-secret", transport=make_transport(latency))
+    await service.open()
+    try:
+        # Fetch the token up front so both runs only measure searches
+        await service.search_tracks("warmup", 1)
+
+        start = time.perf_counter()
+        for i in range(searches):
+            await service.search_tracks(f"query {i}", 1)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[service.search_tracks(f"query {i}", 1) for i in range(searches)])
+        concurrent = time.perf_counter() - start
+    finally:
+        await service.close()
+
+    assert all(results), "every concurrent search should return a result"
+    print(f"searches:          {searches}")
+    print(f"round-trip time:   {latency * 1000:.0f} ms")
+    print(f"sequential total:  {sequential * 1000:.0f} ms ({sequential / latency:.1f} round-trips)")
+    print(f"concurrent total:  {concurrent * 1000:.0f} ms ({concurrent / latency:.1f} round-trips)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent Spotify searches")
+    parser.add_argument("-n", "--searches", type=int, default=20, help="Number of searches (default: 20)")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated round-trip in seconds (default: 0.1)")
+    args = parser.parse_args()
+    asyncio.run(run(args.searches, args.latency))
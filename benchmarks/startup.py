@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Starts the stdio MCP server (server.py) from cold several times and measures
+how long a client waits for the initialize response and for the first
+tools/list response. The median time to the first tools/list is checked
+against a budget, so a slow import or blocking startup step fails the run.
+
+With --index-documents the server starts on a persisted local index of that
+size, to show that loading it no longer delays the first response.
+"""
+
+import argparse
+import json
+import os
+import platform as platform_module
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.offline_suite import DEFAULT_OUTPUT_DIR, git_revision
+
+DEFAULT_BUDGET_MS = 1000.0
+PROTOCOL_VERSION = "2024-11-05"
+
+def server_environment(tmp_dir: str, index_path: Optional[str]) -> Dict[str, str]:
+    """Credentials and settings for one server process; nothing touches the user's own state"""
+    env = dict(os.environ)
+    env.update({
+        'SPOTIFY_CLIENT_ID': 'bench-client-id',
+        'SPOTIFY_CLIENT_SECRET': 'bench-client-secret',
+        'YOUTUBE_API_KEY': 'bench-youtube-key',
+        'LASTFM_API_KEY': 'bench-lastfm-key',
+        'CACHE_DISK': 'false',
+        'CASSETTE_MODE': 'off',
+        'YOUTUBE_QUOTA_PATH': os.path.join(tmp_dir, 'youtube_quota.json'),
+        'TRACE_PATH': os.path.join(tmp_dir, 'traces.jsonl'),
+    })
+    if index_path:
+        env.update({'LOCAL_INDEX_PERSIST': 'true', 'LOCAL_INDEX_PATH': index_path})
+    else:
+        env['LOCAL_INDEX_PERSIST'] = 'false'
+    return env
+
+def seed_index(path: str, documents: int) -> None:
+    """Write a persisted local index with the given number of track documents"""
+    from servicies.local_index import LocalIndex
+
+    words = "love night blue heart fire dream rain city summer dance gold river moon star road".split()
+    index = LocalIndex(path=path, max_documents=max(documents, 1))
+    index.add("spotify", "tracks", [
+        {
+            "id": f"bench-track-{i}",
+            "name": f"{words[i % 15]} {words[(i // 15) % 15]} {words[(i // 225) % 15]} {i}",
+            "artist": f"Bench Artist {i % 977}",
+            "album": f"Bench Album {i % 131}",
+        }
+        for i in range(documents)
+    ])
+    index.close()
+
+class StdioClient:
+    """Minimal newline-delimited JSON-RPC client for a server process"""
+
+    def __init__(self, process: subprocess.Popen, timeout: float):
+        self.process = process
+        self.timeout = timeout
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.process.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.process.stdin.flush()
+
+    def response(self, request_id: int) -> Dict[str, Any]:
+        """Read lines until the response to request_id, skipping notifications"""
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            ready, _, _ = select.select([self.process.stdout], [], [], max(remaining, 0))
+            if not ready:
+                raise TimeoutError(f"No response to request {request_id} within {self.timeout}s")
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"Server exited with code {self.process.wait()} before responding")
+            message = json.loads(line)
+            if message.get("id") == request_id:
+                if "error" in message:
+                    raise RuntimeError(f"Request {request_id} failed: {message['error']}")
+                return message["result"]
+
+def measure_start(python: str, env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    """Time one cold start up to the first tools/list response"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [python, os.path.join(ROOT, "server.py")], cwd=ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    client = StdioClient(process, timeout)
+    try:
+        client.send({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "startup-benchmark", "version": "1.0.0"},
+        }})
+        client.response(1)
+        initialize_ms = (time.perf_counter() - start) * 1000
+
+        client.send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        client.send({"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = client.response(2)["tools"]
+        list_tools_ms = (time.perf_counter() - start) * 1000
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {"initialize_ms": round(initialize_ms, 1), "list_tools_ms": round(list_tools_ms, 1), "tools": len(tools)}
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "min": round(min(values), 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(max(values), 1),
+    }
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure stdio MCP server startup up to the first tools/list response")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Cold starts to measure (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Unmeasured starts first, to warm the OS file cache (default: 1)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Fail if the median time to the first tools/list exceeds this (default: {DEFAULT_BUDGET_MS:.0f})")
+    parser.add_argument("--index-documents", type=int, default=0,
+                        help="Start on a persisted local index with this many documents (default: 0, no index file)")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter to run server.py with (default: this one)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each response (default: 60)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Results file (default: benchmarks/results/startup-<commit>.json)")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = None
+        if args.index_documents:
+            index_path = os.path.join(tmp_dir, "index.sqlite3")
+            seed_index(index_path, args.index_documents)
+        env = server_environment(tmp_dir, index_path)
+
+        for _ in range(args.warmup):
+            measure_start(args.python, env, args.timeout)
+        for run in range(args.runs):
+            result = measure_start(args.python, env, args.timeout)
+            runs.append(result)
+            print(f"run {run + 1:<3} initialize={result['initialize_ms']:8.1f}ms "
+                  f"list_tools={result['list_tools_ms']:8.1f}ms tools={result['tools']}")
+
+    initialize = summarize([run["initialize_ms"] for run in runs])
+    list_tools = summarize([run["list_tools_ms"] for run in runs])
+    within_budget = list_tools["median"] <= args.budget_ms
+    print(f"\ninitialize  min={initialize['min']:.1f}ms median={initialize['median']:.1f}ms max={initialize['max']:.1f}ms")
+    print(f"list_tools  min={list_tools['min']:.1f}ms median={list_tools['median']:.1f}ms max={list_tools['max']:.1f}ms "
+          f"budget={args.budget_ms:.0f}ms {'ok' if within_budget else 'OVER BUDGET'}")
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform_module.python_version(),
+            "platform": platform_module.platform(),
+            "cpus": os.cpu_count(),
+            "options": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "initialize_ms": initialize,
+        "list_tools_ms": list_tools,
+        "within_budget": within_budget,
+        "runs": runs,
+    }
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"startup-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {output}")
+
+    if not within_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Local stub upstreams for offline benchmarks
+This module provides a Starlette app that imitates the Spotify Web API, the
+YouTube Data API and the Last.fm API closely enough for the services to parse
+its responses. Each platform has its own latency distribution, error rate and
+payload size, and everything is served under a /<platform> prefix so one local
+server can stand in for all three.
+
+Run it directly to serve the stubs on a port, or use StubServer to start them
+in a child process so they don't compete with the code being measured.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+PLATFORMS = ("spotify", "youtube", "lastfm")
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+class UpstreamProfile(BaseModel):
+    """Simulated behaviour of one upstream API"""
+    distribution: str = Field(default="lognormal", description="Latency distribution: fixed, uniform, normal or lognormal")
+    latency_ms: float = Field(default=50.0, description="Median response latency in milliseconds")
+    spread: float = Field(default=0.5, description="Latency spread: fraction of the median (uniform, normal) or sigma (lognormal)")
+    error_rate: float = Field(default=0.0, description="Fraction of API calls answered with error_status")
+    error_status: int = Field(default=503, description="HTTP status of injected errors")
+    max_items: int = Field(default=50, description="Most items returned per page, whatever the requested limit")
+    text_bytes: int = Field(default=200, description="Length of free-text fields such as descriptions")
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """One response latency in seconds"""
+        median = self.latency_ms / 1000
+        if self.distribution == "fixed":
+            latency = median
+        elif self.distribution == "uniform":
+            latency = rng.uniform(median * (1 - self.spread), median * (1 + self.spread))
+        elif self.distribution == "normal":
+            latency = rng.gauss(median, median * self.spread)
+        elif self.distribution == "lognormal":
+            latency = median * rng.lognormvariate(0, self.spread)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        return max(0.0, latency)
+
+    def with_overrides(self, spec: str) -> "UpstreamProfile":
+        """Copy with comma-separated key=value overrides, e.g. "latency_ms=120,error_rate=0.05" """
+        values = dict(part.split("=", 1) for part in spec.split(",") if part)
+        return self.model_validate({**self.model_dump(), **values})
+
+def _text(rng: random.Random, length: int) -> str:
+    words = ("lorem", "ipsum", "remastered", "live", "session", "acoustic", "official", "video", "audio")
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length]
+
+def _stable_id(*parts: Any) -> int:
+    """Deterministic number for building IDs (hash() of strings changes between processes)"""
+    return zlib.crc32(repr(parts).encode("utf-8"))
+
+def _count(request: Request, name: str, profile: UpstreamProfile, default: int = 10) -> int:
+    try:
+        requested = int(request.query_params.get(name, default))
+    except ValueError:
+        requested = default
+    return max(0, min(requested, profile.max_items))
+
+# Spotify Web API
+
+def _spotify_images(item_id: str) -> List[Dict[str, Any]]:
+    return [{"url": f"https://i.scdn.co/image/{item_id}", "height": 640, "width": 640}]
+
+def _spotify_album(query: str, i: int) -> Dict[str, Any]:
+    album_id = f"album{_stable_id(query, i):010d}"
+    return {
+        "id": album_id,
+        "name": f"{query.title()} Album {i}",
+        "artists": [{"id": f"artist{i % 7}", "name": f"{query.title()} Artist {i % 7}"}],
+        "release_date": f"{1990 + i % 30}-01-01",
+        "total_tracks": 8 + i % 10,
+        "album_type": "album",
+        "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+        "images": _spotify_images(album_id),
+    }
+
+def _spotify_track(query: str, i: int) -> Dict[str, Any]:
+    track_id = f"track{_stable_id(query, i):010d}"
+    return {
+        "id": track_id,
+        "name": f"{query.title()} {i}",
+        "artists": [{"id": f"artist{i % 7}", "name": f"{query.title()} Artist {i % 7}"}],
+        "album": _spotify_album(query, i // 3),
+        "duration_ms": 150000 + i * 1000,
+        "popularity": 100 - i % 100,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "preview_url": None,
+    }
+
+def _spotify_artist(query: str, i: int) -> Dict[str, Any]:
+    artist_id = f"artist{_stable_id(query, i):010d}"
+    return {
+        "id": artist_id,
+        "name": f"{query.title()} Artist {i}",
+        "popularity": 100 - i % 100,
+        "followers": {"total": 1000 * (i + 1)},
+        "genres": ["rock", "pop"],
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "images": _spotify_images(artist_id),
+    }
+
+SPOTIFY_BUILDERS = {"track": _spotify_track, "artist": _spotify_artist, "album": _spotify_album}
+
+# YouTube Data API
+
+def _youtube_snippet(query: str, i: int, profile: UpstreamProfile, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "title": f"{query.title()} Artist {i % 7} - {query.title()} {i} (Official Video)",
+        "channelTitle": f"{query.title()} Artist {i % 7}",
+        "description": _text(rng, profile.text_bytes),
+        "publishedAt": "2020-01-01T00:00:00Z",
+        "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{query}{i}/hqdefault.jpg"}},
+    }
+
+# Last.fm API
+
+def _lastfm_image(name: str) -> List[Dict[str, str]]:
+    return [{"#text": f"https://lastfm.freetls.fastly.net/i/u/{size}/{name}.png", "size": size}
+            for size in ("small", "medium", "large")]
+
+def _lastfm_item(kind: str, query: str, i: int) -> Dict[str, Any]:
+    name = f"{query.title()} {i}" if kind != "artist" else f"{query.title()} Artist {i}"
+    item = {
+        "name": name,
+        "url": f"https://www.last.fm/music/{kind}/{query}-{i}",
+        "listeners": str(10000 - i),
+        "image": _lastfm_image(f"{kind}{i}"),
+        "mbid": "",
+    }
+    if kind != "artist":
+        item["artist"] = f"{query.title()} Artist {i % 7}"
+    return item
+
+def create_app(profiles: Optional[Dict[str, UpstreamProfile]] = None, seed: Optional[int] = None) -> Starlette:
+    """Stub app serving every platform under its own path prefix"""
+    profiles = {platform: UpstreamProfile() for platform in PLATFORMS} | (profiles or {})
+    rng = random.Random(seed)
+    counters = {platform: 0 for platform in PLATFORMS}
+
+    async def simulate(platform: str) -> Optional[Response]:
+        """Wait the sampled latency, then maybe return an injected error"""
+        profile = profiles[platform]
+        counters[platform] += 1
+        await asyncio.sleep(profile.sample_latency(rng))
+        if rng.random() < profile.error_rate:
+            return JSONResponse({"error": {"code": profile.error_status, "message": "injected error"}},
+                                status_code=profile.error_status)
+        return None
+
+    async def spotify_token(request: Request) -> Response:
+        return JSONResponse({"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def spotify_search(request: Request) -> Response:
+        error = await simulate("spotify")
+        if error is not None:
+            return error
+        query = request.query_params.get("q", "")
+        offset = int(request.query_params.get("offset", 0))
+        count = _count(request, "limit", profiles["spotify"])
+        body = {}
+        for kind in request.query_params.get("type", "track").split(","):
+            builder = SPOTIFY_BUILDERS[kind]
+            body[f"{kind}s"] = {"items": [builder(query, offset + i) for i in range(count)], "total": 1000}
+        return JSONResponse(body)
+
+    async def spotify_lookup(request: Request) -> Response:
+        error = await simulate("spotify")
+        if error is not None:
+            return error
+        kind = request.path_params["kind"]
+        ids = [item_id for item_id in request.query_params.get("ids", "").split(",") if item_id]
+        builder = SPOTIFY_BUILDERS[kind[:-1]]
+        items = []
+        for i, item_id in enumerate(ids):
+            item = builder("lookup", i)
+            item["id"] = item_id
+            items.append(item)
+        return JSONResponse({kind: items})
+
+    async def spotify_recommendations(request: Request) -> Response:
+        error = await simulate("spotify")
+        if error is not None:
+            return error
+        count = _count(request, "limit", profiles["spotify"])
+        return JSONResponse({"tracks": [_spotify_track("recommended", i) for i in range(count)]})
+
+    async def youtube_search(request: Request) -> Response:
+        error = await simulate("youtube")
+        if error is not None:
+            return error
+        profile = profiles["youtube"]
+        query = request.query_params.get("q", "")
+        kind = request.query_params.get("type", "video")
+        page = int(request.query_params.get("pageToken", "0") or 0)
+        count = _count(request, "maxResults", profile, default=5)
+        id_key = "videoId" if kind == "video" else "playlistId"
+        items = [
+            {"id": {"kind": f"youtube#{kind}", id_key: f"{kind[:2]}{_stable_id(query, page, i):010d}"},
+             "snippet": _youtube_snippet(query, page * count + i, profile, rng)}
+            for i in range(count)
+        ]
+        return JSONResponse({"items": items, "nextPageToken": str(page + 1), "pageInfo": {"totalResults": 1000000}})
+
+    async def youtube_videos(request: Request) -> Response:
+        error = await simulate("youtube")
+        if error is not None:
+            return error
+        profile = profiles["youtube"]
+        ids = [video_id for video_id in request.query_params.get("id", "").split(",") if video_id]
+        items = [
+            {"id": video_id,
+             "snippet": _youtube_snippet("details", i, profile, rng),
+             "contentDetails": {"duration": f"PT{3 + i % 4}M{i % 60}S"},
+             "statistics": {"viewCount": str(100000 * (i + 1)), "likeCount": str(1000 * (i + 1))}}
+            for i, video_id in enumerate(ids)
+        ]
+        return JSONResponse({"items": items})
+
+    async def lastfm(request: Request) -> Response:
+        error = await simulate("lastfm")
+        if error is not None:
+            return error
+        method = request.query_params.get("method", "")
+        count = _count(request, "limit", profiles["lastfm"])
+        page = int(request.query_params.get("page", 1))
+        start = (page - 1) * count
+
+        if method.endswith(".search"):
+            kind = method.split(".")[0]
+            query = request.query_params.get(kind, "")
+            items = [_lastfm_item(kind, query, start + i) for i in range(count)]
+            return JSONResponse({"results": {f"{kind}matches": {kind: items}, "opensearch:totalResults": "1000"}})
+
+        if method in ("track.getsimilar", "chart.gettoptracks"):
+            tracks = []
+            for i in range(count):
+                track = _lastfm_item("track", "similar", start + i)
+                track["artist"] = {"name": track["artist"], "url": "https://www.last.fm/music/artist"}
+                track["match"] = round(1 - i / max(count, 1), 3)
+                tracks.append(track)
+            key = "similartracks" if method == "track.getsimilar" else "tracks"
+            return JSONResponse({key: {"track": tracks}})
+
+        return JSONResponse({"error": 3, "message": "Invalid Method"}, status_code=400)
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse({"calls": counters, "profiles": {name: p.model_dump() for name, p in profiles.items()}})
+
+    return Starlette(routes=[
+        Route("/spotify/api/token", spotify_token, methods=["POST"]),
+        Route("/spotify/v1/search", spotify_search),
+        Route("/spotify/v1/recommendations", spotify_recommendations),
+        Route("/spotify/v1/{kind:str}", spotify_lookup),
+        Route("/youtube/v3/search", youtube_search),
+        Route("/youtube/v3/videos", youtube_videos),
+        Route("/lastfm/2.0/", lastfm),
+        Route("/stats", stats),
+    ])
+
+def point_at_stubs(server: Any, base_url: str) -> None:
+    """Send an MCPServer's service traffic to the stub upstreams at base_url"""
+    if server.spotify_service is not None:
+        server.spotify_service.api_url = f"{base_url}/spotify/v1"
+        server.spotify_service.token_url = f"{base_url}/spotify/api/token"
+    if server.youtube_service is not None:
+        server.youtube_service.base_url = f"{base_url}/youtube/v3"
+    if server.lastfm_service is not None:
+        server.lastfm_service.base_url = f"{base_url}/lastfm/2.0/"
+
+def _serve(port: int, profiles: Dict[str, Dict[str, Any]], seed: Optional[int]) -> None:
+    import uvicorn
+
+    app = create_app({name: UpstreamProfile(**values) for name, values in profiles.items()}, seed)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class StubServer:
+    """Stub upstreams served by uvicorn in a child process"""
+
+    def __init__(self, profiles: Optional[Dict[str, UpstreamProfile]] = None, seed: Optional[int] = None, port: Optional[int] = None):
+        self.profiles = profiles or {}
+        self.seed = seed
+        self.port = port or free_port()
+        self._process: Optional[multiprocessing.Process] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> None:
+        profiles = {name: profile.model_dump() for name, profile in self.profiles.items()}
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(self.port, profiles, self.seed), daemon=True
+        )
+        self._process.start()
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return
+            except OSError:
+                if not self._process.is_alive():
+                    break
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError(f"Stub upstreams did not start on port {self.port}")
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=5)
+            self._process = None
+
+    def __enter__(self) -> "StubServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stub Spotify, YouTube and Last.fm APIs")
+    parser.add_argument("--port", type=int, default=8900, help="Port to listen on (default: 8900)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latencies and errors")
+    parser.add_argument("--profile", action="append", default=[], metavar="PLATFORM:KEY=VALUE,...",
+                        help="Override a platform's profile, e.g. youtube:latency_ms=120,error_rate=0.05")
+    args = parser.parse_args()
+
+    overrides: Dict[str, Dict[str, Any]] = {}
+    for spec in args.profile:
+        platform, _, values = spec.partition(":")
+        overrides[platform] = UpstreamProfile().with_overrides(values).model_dump()
+    _serve(args.port, overrides, args.seed)
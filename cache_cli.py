@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Command line tool for the on-disk result cache
+
+    python cache_cli.py stats
+    python cache_cli.py list --limit 20
+    python cache_cli.py purge [--expired] [--namespace spotify]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from servicies.disk_cache import DEFAULT_DB_PATH, DiskCache
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Inspect or purge the on-disk result cache"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--path", default=os.path.expanduser(os.getenv('CACHE_DB_PATH', DEFAULT_DB_PATH)),
+                        help="Cache database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="Show entry counts and size")
+
+    list_parser = commands.add_parser("list", help="Show most recently used entries")
+    list_parser.add_argument("--limit", type=int, default=20, help="Number of entries (default: 20)")
+
+    purge_parser = commands.add_parser("purge", help="Delete entries")
+    purge_parser.add_argument("--expired", action="store_true", help="Only delete expired entries")
+    purge_parser.add_argument("--namespace", help="Only delete entries for one service (spotify, youtube, lastfm)")
+
+    args = parser.parse_args(argv)
+    cache = DiskCache(args.path)
+    try:
+        if args.command == "stats":
+            print(json.dumps(cache.stats(), indent=2))
+        elif args.command == "list":
+            for entry in cache.entries(args.limit):
+                print(json.dumps(entry))
+        elif args.command == "purge":
+            deleted = cache.purge(expired_only=args.expired, namespace=args.namespace)
+            print(f"Deleted {deleted} entries")
+    finally:
+        cache.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
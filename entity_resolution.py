@@ -0,0 +1,214 @@
+"""
+Cross-platform entity resolution for MCP music server
+This module clusters track results from Spotify, Last.fm and YouTube that refer
+to the same song into unified "work" records linking every platform's IDs.
+
+Titles and artists are normalized (accents, case, "(Official Video)",
+"- Remastered 2011", "feat." credits). Results with the same title and artist
+are grouped outright; the rest are blocked on (title, artist word) and
+(title word, artist) so only plausible pairs are compared, and oversized blocks
+are skipped rather than compared pairwise. Titles match on token overlap with a
+difflib fallback for near misses; artists must be equal, contain one another,
+or differ only by a near-identical word.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
+
+from servicies.text import normalize_text
+
+# Bracketed or dashed suffixes that don't change which song a result is
+NOISE_PATTERN = re.compile(
+    r"[\(\[][^\)\]]*\b(official|video|audio|lyrics?|visualizer|hd|hq|4k|remaster(ed)?|mono|stereo|"
+    r"version|explicit|clean|radio edit|music video|mv)\b[^\)\]]*[\)\]]"
+    r"|\s-\s.*\b(remaster(ed)?|version|mono|stereo|radio edit)\b.*$",
+    re.IGNORECASE
+)
+FEATURING_PATTERN = re.compile(r"[\(\[]?\b(feat\.?|ft\.?|featuring)\s[^\)\]]*[\)\]]?", re.IGNORECASE)
+CHANNEL_SUFFIX_PATTERN = re.compile(r"(vevo|\s-\stopic|official)$", re.IGNORECASE)
+
+# Words too common to block on
+STOPWORDS = frozenset({"the", "a", "an", "of", "and", "to", "in", "on", "my", "me", "you", "i"})
+# Blocks bigger than this are too common to tell results apart and are never compared pairwise
+MAX_BLOCK_SIZE = 64
+
+TITLE_MATCH = 0.8
+# Similarity needed between the words two artist names don't share
+ARTIST_MATCH = 0.85
+
+def strip_title_noise(title: str) -> str:
+    """Drop version/video noise and featured artists from a title, keeping its casing"""
+    title = NOISE_PATTERN.sub(" ", title)
+    title = FEATURING_PATTERN.sub(" ", title)
+    return " ".join(title.split())
+
+def clean_title(title: str) -> str:
+    """Normalize a track title for matching"""
+    return normalize_text(strip_title_noise(title))
+
+def clean_artist(artist: str) -> str:
+    """Normalize an artist or channel name"""
+    artist = CHANNEL_SUFFIX_PATTERN.sub("", artist.strip())
+    artist = FEATURING_PATTERN.sub(" ", artist)
+    artist = normalize_text(artist)
+    return artist[4:] if artist.startswith("the ") else artist
+
+def split_youtube_title(title: str, channel: str) -> Tuple[str, str]:
+    """Split an "Artist - Title" video title, falling back to the channel as the artist"""
+    for separator in (" - ", " – ", " — ", " | "):
+        if separator in title:
+            artist, song = title.split(separator, 1)
+            return artist, song
+    return channel, title
+
+def _similarity(left: str, right: str, left_tokens: FrozenSet[str], right_tokens: FrozenSet[str]) -> float:
+    if left == right:
+        return 1.0
+    if not left_tokens or not right_tokens:
+        return 0.0
+    # "Song 2" and "Song 3" are different songs however similar the strings look
+    if {token for token in left_tokens if token.isdigit()} != {token for token in right_tokens if token.isdigit()}:
+        return 0.0
+    jaccard = len(left_tokens & right_tokens) / len(left_tokens | right_tokens)
+    if jaccard >= TITLE_MATCH or jaccard < 0.3:
+        return jaccard
+    # Near misses (typos, small extra words) get a character-level check
+    return max(jaccard, SequenceMatcher(None, left, right).ratio())
+
+def _artists_match(left: str, right: str, left_tokens: FrozenSet[str], right_tokens: FrozenSet[str]) -> bool:
+    if not left or not right:
+        return False
+    if left == right:
+        return True
+    # "Beatles" matches "The Beatles", "Queen" matches "Queen Official"
+    if left_tokens <= right_tokens or right_tokens <= left_tokens:
+        return True
+    # Only the differing words are compared, so a shared first or last name counts for
+    # nothing: "John Lennon" vs "John Legend" compares "lennon" with "legend"
+    left_rest = " ".join(sorted(left_tokens - right_tokens))
+    right_rest = " ".join(sorted(right_tokens - left_tokens))
+    # "Blink 182" and "Blink 183" are different artists however similar the strings look
+    if [char for char in left_rest if char.isdigit()] != [char for char in right_rest if char.isdigit()]:
+        return False
+    return SequenceMatcher(None, left_rest, right_rest).ratio() >= ARTIST_MATCH
+
+class _Candidate:
+    """One platform result prepared for matching"""
+
+    __slots__ = ("platform", "item", "title", "artist", "title_tokens", "artist_tokens", "display_title", "display_artist")
+
+    def __init__(self, platform: str, item: Dict[str, Any], title: str, artist: str):
+        self.platform = platform
+        self.item = item
+        self.display_title = title
+        self.display_artist = artist
+        self.title = clean_title(title)
+        self.artist = clean_artist(artist)
+        self.title_tokens = frozenset(self.title.split())
+        self.artist_tokens = frozenset(self.artist.split())
+
+def _candidates(results: Dict[str, Any]) -> List[_Candidate]:
+    candidates = []
+    for item in results.get("spotify", {}).get("tracks", []):
+        if isinstance(item, dict) and item.get("name"):
+            candidates.append(_Candidate("spotify", item, item["name"], item.get("artist", "")))
+    for item in results.get("lastfm", {}).get("tracks", []):
+        if isinstance(item, dict) and item.get("name"):
+            candidates.append(_Candidate("lastfm", item, item["name"], item.get("artist", "")))
+    for item in results.get("youtube", {}).get("videos", []):
+        if isinstance(item, dict) and item.get("title"):
+            artist, title = split_youtube_title(item["title"], item.get("channel", ""))
+            candidates.append(_Candidate("youtube", item, title, artist))
+    return [candidate for candidate in candidates if candidate.title]
+
+def _find(parents: List[int], index: int) -> int:
+    while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+    return index
+
+def _link(candidate: _Candidate) -> Dict[str, Any]:
+    item = candidate.item
+    if candidate.platform == "spotify":
+        return {"id": item.get("id"), "url": item.get("spotify_url")}
+    if candidate.platform == "youtube":
+        return {"id": item.get("id"), "url": item.get("youtube_url"), "title": item.get("title")}
+    return {"url": item.get("url"), "mbid": item.get("mbid") or None}
+
+def resolve_works(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Cluster track-like results from a search_all_platforms response into work records
+
+    Each work has a canonical title and artist (Spotify first, then Last.fm, then
+    YouTube) and lists the matching items from every platform. Works found on more
+    platforms come first.
+    """
+    candidates = _candidates(results)
+    if not candidates:
+        return []
+
+    parents = list(range(len(candidates)))
+
+    # Results with the same title and artist are one work without comparing anything
+    first_seen: Dict[Tuple[str, str], int] = {}
+    representatives = []
+    for index, candidate in enumerate(candidates):
+        if not candidate.artist:
+            continue
+        key = (candidate.title, candidate.artist)
+        if key in first_seen:
+            parents[index] = first_seen[key]
+        else:
+            first_seen[key] = index
+            representatives.append(index)
+
+    # Blocking: only pairs with the same title and a shared artist word or artist prefix
+    # (variants of one artist), or the same artist and a shared title word (variants of
+    # one title), are compared
+    blocks: Dict[Tuple[str, str, str], List[int]] = {}
+    for index in representatives:
+        candidate = candidates[index]
+        keys = {("artist", candidate.title, token) for token in candidate.artist_tokens}
+        keys.add(("prefix", candidate.title, candidate.artist[:2]))
+        keys.update(("title", token, candidate.artist) for token in candidate.title_tokens if token not in STOPWORDS)
+        for key in keys:
+            blocks.setdefault(key, []).append(index)
+
+    compared: Set[Tuple[int, int]] = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for position, index in enumerate(members):
+            candidate = candidates[index]
+            for other_index in members[position + 1:]:
+                if (index, other_index) in compared:
+                    continue
+                compared.add((index, other_index))
+                if _find(parents, index) == _find(parents, other_index):
+                    continue
+                other = candidates[other_index]
+                title_score = _similarity(candidate.title, other.title, candidate.title_tokens, other.title_tokens)
+                if title_score < TITLE_MATCH:
+                    continue
+                if _artists_match(candidate.artist, other.artist, candidate.artist_tokens, other.artist_tokens):
+                    parents[_find(parents, other_index)] = _find(parents, index)
+
+    clusters: Dict[int, List[_Candidate]] = {}
+    for index, candidate in enumerate(candidates):
+        clusters.setdefault(_find(parents, index), []).append(candidate)
+
+    platform_rank = {"spotify": 0, "lastfm": 1, "youtube": 2}
+    works = []
+    for members in clusters.values():
+        canonical = min(members, key=lambda member: platform_rank[member.platform])
+        work: Dict[str, Any] = {
+            "title": strip_title_noise(canonical.display_title) or canonical.display_title.strip(),
+            "artist": canonical.display_artist.strip(),
+            "platforms": sorted({member.platform for member in members}, key=platform_rank.get),
+        }
+        for member in members:
+            work.setdefault(member.platform, []).append(_link(member))
+        works.append(work)
+
+    works.sort(key=lambda work: (-len(work["platforms"]), -sum(len(work[p]) for p in work["platforms"])))
+    return works
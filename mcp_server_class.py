@@ -4,16 +4,29 @@ This module contains the MCPServer class that provides the core functionality
 for the music MCP server
 """
 
+import asyncio
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
 
+import httpx
 from pydantic import BaseModel, Field
 
-from servicies.spotify_service import SpotifyService
-from servicies.youtube_service import YouTubeService
-from servicies.lastfm_service import LastfmService
-from orchestrator import MusicDiscoveryOrchestrator
+from servicies.spotify_service import SEARCH_PAGE_SIZE as SPOTIFY_PAGE_SIZE, SpotifyService
+from servicies.youtube_service import SEARCH_PAGE_SIZE as YOUTUBE_PAGE_SIZE, YouTubeService
+from servicies.lastfm_service import SEARCH_PAGE_SIZE as LASTFM_PAGE_SIZE, LastfmService
+from servicies.http_client import BaseHTTPService, HTTPClientConfig, http2_available, shared_ssl_context
+from servicies.cache import ResponseCache
+from servicies.cassette import Cassette
+from servicies.errors import ServiceUnavailableError
+from servicies import fields, metrics, tracing
+from servicies.local_index import LocalIndex
+from servicies.rate_limit import QuotaTracker, TokenBucket
+from servicies.resilience import CircuitBreaker, RetryPolicy
+from orchestrator import DEFAULT_SEARCH_DEADLINE, MusicDiscoveryOrchestrator, Platform, ResultType
+from tool_registry import tool
 
 logger = logging.getLogger(__name__)
 
@@ -36,11 +49,24 @@ class MCPServer:
             youtube_api_key=os.getenv('YOUTUBE_API_KEY'),
             lastfm_api_key=os.getenv('LASTFM_API_KEY')
         )
+        self.http_config = HTTPClientConfig.from_env()
+        self.cache = ResponseCache.from_env()
+        self.retry_policy = RetryPolicy.from_env()
+        self.local_index = LocalIndex.from_env()
+        self.cassette = Cassette.from_env()
+        self.tracer = tracing.Tracer.from_env()
+        tracing.install(self.tracer)
+        metrics.registry.set_collector("server", self.metrics_families)
 
         self.spotify_service = None
         self.youtube_service = None
         self.lastfm_service = None
         self.orchestrator = None
+        self._warm_up: Optional[asyncio.Task] = None
+
+        # Shared by every batch search, so concurrent batches together stay under the limit
+        self.batch_semaphore = asyncio.Semaphore(int(os.getenv('BATCH_CONCURRENCY', 8)))
+        self.batch_max_queries = int(os.getenv('BATCH_MAX_QUERIES', 500))
 
         self.initialize_servicies()
 
@@ -51,115 +77,470 @@ class MCPServer:
                 self.spotify_service = SpotifyService(
                     self.auth_config.spotify_client_id,
                     self.auth_config.spotify_client_secret,
-                    self.auth_config.spotify_redirect_uri
+                    self.auth_config.spotify_redirect_uri,
+                    http_config=self.http_config,
+                    cache=self.cache,
+                    rate_limiter=TokenBucket.from_env('spotify', rate=10, capacity=20),
+                    retry_policy=self.retry_policy,
+                    circuit_breaker=CircuitBreaker.from_env('spotify'),
+                    index=self.local_index,
+                    transport=self.upstream_transport()
                 )
                 logger.info("Spotify service initialized.")
 
             if self.auth_config.youtube_api_key:
                 self.youtube_service = YouTubeService(
-                    self.auth_config.youtube_api_key
+                    self.auth_config.youtube_api_key,
+                    http_config=self.http_config,
+                    cache=self.cache,
+                    rate_limiter=TokenBucket.from_env('youtube', rate=10, capacity=10),
+                    retry_policy=self.retry_policy,
+                    circuit_breaker=CircuitBreaker.from_env('youtube'),
+                    # Replayed calls cost no real quota, so they are counted in memory only
+                    quota=QuotaTracker.from_env(persist=not self.replaying),
+                    index=self.local_index,
+                    transport=self.upstream_transport()
                 )
                 logger.info("YouTube service initialized")
 
             if self.auth_config.lastfm_api_key:
                 self.lastfm_service = LastfmService(
-                    self.auth_config.lastfm_api_key
+                    self.auth_config.lastfm_api_key,
+                    http_config=self.http_config,
+                    cache=self.cache,
+                    rate_limiter=TokenBucket.from_env('lastfm', rate=5, capacity=10),
+                    retry_policy=self.retry_policy,
+                    circuit_breaker=CircuitBreaker.from_env('lastfm'),
+                    index=self.local_index,
+                    transport=self.upstream_transport()
                 )
                 logger.info("Last.fm service initialized")
 
             if any([self.spotify_service, self.youtube_service, self.lastfm_service]):
                 self.orchestrator = MusicDiscoveryOrchestrator(
-                    self.spotify_service, self.youtube_service, self.lastfm_service
+                    self.spotify_service, self.youtube_service, self.lastfm_service,
+                    platform_timeouts=self.platform_timeouts(),
+                    search_deadline=float(os.getenv('SEARCH_DEADLINE', DEFAULT_SEARCH_DEADLINE)),
+                    local_index=self.local_index
                 )
                 logger.info("Music discovery orchestrator initialized")
         except Exception as e:
             logger.error(f"Error initializing servicies: {e}")
 
+    @property
+    def replaying(self) -> bool:
+        """Whether upstream responses come from a cassette instead of the network"""
+        return self.cassette is not None and self.cassette.replaying
+
+    def upstream_transport(self) -> Optional[httpx.AsyncBaseTransport]:
+        """Transport for a service's HTTP client: a cassette when CASSETTE_MODE is set, else httpx's default"""
+        if self.cassette is None:
+            return None
+        if self.cassette.replaying:
+            return self.cassette.transport()
+        # A custom transport replaces the client's own pool, so it gets the pool settings
+        return self.cassette.transport(httpx.AsyncHTTPTransport(
+            verify=shared_ssl_context(),
+            limits=self.http_config.limits(),
+            http2=self.http_config.http2 and http2_available()
+        ))
+
+    def platform_timeouts(self) -> Dict[str, float]:
+        """Per-platform search timeouts overridden by SEARCH_TIMEOUT_<PLATFORM> variables"""
+        timeouts = {}
+        for platform in ['spotify', 'youtube', 'lastfm']:
+            value = os.getenv(f'SEARCH_TIMEOUT_{platform.upper()}')
+            if value:
+                timeouts[platform] = float(value)
+        return timeouts
+
+    def http_services(self) -> List[BaseHTTPService]:
+        """Initialized services that hold a pooled HTTP client"""
+        servicies = [self.spotify_service, self.youtube_service, self.lastfm_service]
+        return [service for service in servicies if isinstance(service, BaseHTTPService)]
+
+    async def startup(self) -> None:
+        """Start tracing and warm up in the background, so the server can answer straight away"""
+        if self.tracer is not None:
+            await self.tracer.start()
+        self._warm_up = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self) -> None:
+        """Open long-lived HTTP clients and load the local index ahead of the first call
+
+        Both also happen on first use, so calls arriving before warm-up finishes still work.
+        """
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(shared_ssl_context)
+            for service in self.http_services():
+                await service.open()
+            logger.info("HTTP clients opened")
+            if self.local_index is not None:
+                await self.local_index.preload()
+        except Exception as e:
+            logger.error(f"Error warming up: {e}")
+        logger.info(f"Warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def shutdown(self) -> None:
+        """Close HTTP clients and release pooled connections"""
+        if self._warm_up is not None and not self._warm_up.done():
+            self._warm_up.cancel()
+        for service in self.http_services():
+            try:
+                await service.close()
+            except Exception as e:
+                logger.error(f"Error closing {type(service).__name__}: {e}")
+        logger.info("HTTP clients closed")
+        await self.cache.close()
+        if self.local_index is not None:
+            await self.local_index.flush()
+            self.local_index.close()
+        if self.cassette is not None:
+            self.cassette.close()
+        if self.tracer is not None:
+            await self.tracer.close()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the shared response cache"""
+        return self.cache.stats()
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Per-service counts of upstream calls collapsed by request coalescing"""
+        return {service.cache_namespace: service.single_flight.stats() for service in self.http_services()}
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """Per-service rate limiter state and YouTube quota usage"""
+        stats = {}
+        for service in self.http_services():
+            stats[service.cache_namespace] = {
+                "rate_limiter": service.rate_limiter.stats() if service.rate_limiter else None,
+                "quota": service.quota.stats() if service.quota else None
+            }
+        return stats
+
+    def local_index_stats(self) -> Dict[str, Any]:
+        """Size and usage of the local search index"""
+        if self.local_index is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.local_index.stats()}
+
+    def tracing_stats(self) -> Dict[str, Any]:
+        """How many traces were seen and how many were kept as slow or sampled"""
+        if self.tracer is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.tracer.stats()}
+
+    def cassette_stats(self) -> Dict[str, Any]:
+        """Recording or replay counters of the HTTP cassette"""
+        if self.cassette is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cassette.stats()}
+
+    def metrics_families(self) -> List[metrics.Family]:
+        """Cache, circuit breaker, coalescing, rate limit and index figures for /metrics, read at scrape time"""
+        cache = self.cache.stats()
+        services = self.http_services()
+        families: List[metrics.Family] = [
+            ("cache_entries", "gauge", "Entries in the in-memory response cache", [({}, cache["entries"])]),
+            ("cache_bytes", "gauge", "Approximate size of the in-memory response cache", [({}, cache["bytes"])]),
+            ("cache_hits_total", "counter", "Response cache hits", [({}, cache["hits"])]),
+            ("cache_misses_total", "counter", "Response cache misses", [({}, cache["misses"])]),
+            ("cache_stale_hits_total", "counter", "Stale cache entries served while refreshing", [({}, cache["stale_hits"])]),
+            ("cache_disk_hits_total", "counter", "Cache hits served from the disk tier", [({}, cache["disk_hits"])]),
+            ("cache_evictions_total", "counter", "Entries evicted from the in-memory cache", [({}, cache["evictions"])]),
+            ("circuit_breaker_open", "gauge", "1 while a provider's circuit breaker is not closed",
+             [({"provider": service.cache_namespace}, int(service.circuit_breaker.state != service.circuit_breaker.CLOSED)) for service in services]),
+            ("circuit_breaker_opened_total", "counter", "Times a provider's circuit breaker opened",
+             [({"provider": service.cache_namespace}, service.circuit_breaker.times_opened) for service in services]),
+            ("upstream_coalesced_total", "counter", "Upstream requests saved by joining an identical one in flight",
+             [({"provider": service.cache_namespace}, service.single_flight.collapsed) for service in services]),
+            ("rate_limiter_waited_total", "counter", "Requests that queued for the rate limiter",
+             [({"provider": service.cache_namespace}, service.rate_limiter.waited) for service in services if service.rate_limiter]),
+            ("rate_limiter_rejected_total", "counter", "Requests rejected by the rate limiter",
+             [({"provider": service.cache_namespace}, service.rate_limiter.rejected) for service in services if service.rate_limiter]),
+            ("quota_used_units", "gauge", "Daily API quota units used",
+             [({"provider": service.cache_namespace}, service.quota.used) for service in services if service.quota]),
+        ]
+        if self.local_index is not None:
+            families.append(("local_index_documents", "gauge", "Documents in the local search index",
+                             [({}, self.local_index.stats()["documents"])]))
+        return families
+
+    def health(self) -> Dict[str, Any]:
+        """Circuit breaker state for each initialized service"""
+        return {service.cache_namespace: service.circuit_breaker.stats() for service in self.http_services()}
+
+    async def _call_service(self, call: Awaitable[Any]) -> Any:
+        """Await a service call, turning an unavailable provider into an error result"""
+        try:
+            return await call
+        except ServiceUnavailableError as e:
+            logger.warning(f"{e.service} unavailable: {e}")
+            return [e.to_result()]
+
+    async def _collect(self, items: AsyncIterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Gather a paginated search into one list"""
+        return [item async for item in items]
+
     # Spotify methods
-    async def search_spotify_tracks(self, query: str, limit: int = 10) -> List[Dict[str, any]]:
+    @tool("Search for tracks on Spotify", query="Search query for tracks", limit="Max number of results")
+    async def search_spotify_tracks(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search Tracks on spotify"""
         if not self.spotify_service:
             return [{"Error": "Spotify service unavailable"}]
-        return await self.spotify_service.search_tracks(query, limit)
+        if limit > SPOTIFY_PAGE_SIZE:
+            return await self._call_service(self._collect(self.spotify_service.iter_search(query, "tracks", limit)))
+        return await self._call_service(self.spotify_service.search_tracks(query, limit))
     
+    @tool("Search for artists on Spotify", query="Search query for artists", limit="Max number of results")
     async def search_spotify_artists(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for artists on Spotify"""
         if not self.spotify_service:
             return [{"error": "Spotify service unavailable"}]
-        return await self.spotify_service.search_artists(query, limit)
+        if limit > SPOTIFY_PAGE_SIZE:
+            return await self._call_service(self._collect(self.spotify_service.iter_search(query, "artists", limit)))
+        return await self._call_service(self.spotify_service.search_artists(query, limit))
         
+    @tool("Search for albums on Spotify", query="Search query for albums", limit="Max number of results")
     async def search_spotify_albums(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for albums on Spotify"""
         if not self.spotify_service:
             return [{"error": "spotify service unavailable"}]
-        return await self.spotify_service.search_albums(query, limit)
+        if limit > SPOTIFY_PAGE_SIZE:
+            return await self._call_service(self._collect(self.spotify_service.iter_search(query, "albums", limit)))
+        return await self._call_service(self.spotify_service.search_albums(query, limit))
     
+    @tool("Get track recommendations from Spotify",
+          seed_tracks="List of Spotify track IDs", seed_artists="List of Spotify artist IDs")
     async def get_spotify_recommendations(self, seed_tracks: List[str] = None, seed_artists: List[str] = None) -> List[Dict[str, Any]]:
         """Get Spotify recommendations"""
         if not self.spotify_service:
             return [{"error": "Spotify service unavailable"}]
-        return await self.spotify_service.get_recommendations(seed_tracks, seed_artists)
+        return await self._call_service(self.spotify_service.get_recommendations(seed_tracks, seed_artists))
     
+    @tool("Get Spotify tracks by ID (resolves many IDs in bulk)", ids="List of Spotify track IDs")
+    async def get_spotify_tracks(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Get Spotify tracks by ID"""
+        if not self.spotify_service:
+            return [{"error": "Spotify service unavailable"}]
+        return await self._call_service(self.spotify_service.get_tracks(ids))
+
+    @tool("Get Spotify artists by ID (resolves many IDs in bulk)", ids="List of Spotify artist IDs")
+    async def get_spotify_artists(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Get Spotify artists by ID"""
+        if not self.spotify_service:
+            return [{"error": "Spotify service unavailable"}]
+        return await self._call_service(self.spotify_service.get_artists(ids))
+
+    @tool("Get Spotify albums by ID (resolves many IDs in bulk)", ids="List of Spotify album IDs")
+    async def get_spotify_albums(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Get Spotify albums by ID"""
+        if not self.spotify_service:
+            return [{"error": "Spotify service unavailable"}]
+        return await self._call_service(self.spotify_service.get_albums(ids))
+
     # YouTube methods
-    async def search_youtube_videos(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    @tool("Search for music videos on YouTube", query="Search query for music videos",
+          max_results="Max number of results", include_details="Add duration, view and like counts")
+    async def search_youtube_videos(self, query: str, max_results: int = 10, include_details: bool = False) -> List[Dict[str, Any]]:
         """Search music videos on YouTube"""
         if not self.youtube_service:
             return [{"error": "YouTube service unavailable"}]
-        return await self.youtube_service.search_music_videos(query, max_results)
+        if max_results > YOUTUBE_PAGE_SIZE:
+            return await self._call_service(self._collect(
+                self.youtube_service.iter_search(query, "videos", max_results, include_details=include_details)
+            ))
+        return await self._call_service(self.youtube_service.search_music_videos(query, max_results, include_details))
     
+    @tool("Search for music playlists on YouTube", query="Search query for playlists", max_results="Max number of results")
     async def search_youtube_playlists(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """Search YouTube playlists for music"""
         if not self.youtube_service:
             return [{"error": "YouTube service unavailable"}]
-        return await self.youtube_service.search_music_playlists(query, max_results)
+        if max_results > YOUTUBE_PAGE_SIZE:
+            return await self._call_service(self._collect(self.youtube_service.iter_search(query, "playlists", max_results)))
+        return await self._call_service(self.youtube_service.search_music_playlists(query, max_results))
     
+    @tool("Get detailed information about a YouTube video", video_id="YouTube video ID")
     async def get_youtube_video_details(self, video_id: str) -> Optional[Dict[str, Any]]:
         if not self.youtube_service:
             return [{"error": "YouTube service unavailable"}]
-        return await self.youtube_service.get_video_details(video_id)
+        return await self._call_service(self.youtube_service.get_video_details(video_id))
+
+    @tool("Get detailed information about many YouTube videos at once", video_ids="List of YouTube video IDs")
+    async def get_youtube_videos_details(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get details for many YouTube videos in as few calls as possible"""
+        if not self.youtube_service:
+            return [{"error": "YouTube service unavailable"}]
+        return await self._call_service(self.youtube_service.get_videos_details(video_ids))
     
     # Last.fm methods
+    @tool("Search for songs on Last.fm", query="Search query for songs", limit="Max number of results")
     async def search_lastfm_songs(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for songs on Last.fm"""
         if not self.lastfm_service:
             return [{"error": "last.fm service unavailable"}]
-        return await self.lastfm_service.search_tracks(query, limit)
+        if limit > LASTFM_PAGE_SIZE:
+            return await self._call_service(self._collect(self.lastfm_service.iter_search(query, "tracks", limit)))
+        return await self._call_service(self.lastfm_service.search_tracks(query, limit))
     
+    @tool("Search for albums on Last.fm", query="Search query for albums", limit="Max number of results")
     async def search_lastfm_albums(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search albums on Last.fm"""
         if not self.lastfm_service:
             return [{"error": "Last.fm service unavailable"}]
-        return await self.lastfm_service.search_albums(query, limit)
+        if limit > LASTFM_PAGE_SIZE:
+            return await self._call_service(self._collect(self.lastfm_service.iter_search(query, "albums", limit)))
+        return await self._call_service(self.lastfm_service.search_albums(query, limit))
     
+    @tool("Search for artists on Last.fm", query="Search query for artists", limit="Max number of results")
     async def search_lastfm_artists(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search artists on Last.fm"""
         if not self.lastfm_service:
             return [{"error": "Last.fm service unavailable"}]
-        return await self.lastfm_service.search_artists(query, limit)
+        if limit > LASTFM_PAGE_SIZE:
+            return await self._call_service(self._collect(self.lastfm_service.iter_search(query, "artists", limit)))
+        return await self._call_service(self.lastfm_service.search_artists(query, limit))
     
+    @tool("Find tracks similar to a track on Last.fm", artist="Artist name", track="Track name", limit="Max number of results")
     async def get_lastfm_similar_tracks(self, artist: str, track: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Find similar tracks on Last.fm"""
         if not self.lastfm_service:
             return [{"error": "Last.fm service unavailable"}]
-        return await self.lastfm_service.get_similar_tracks(artist, track, limit)
+        return await self._call_service(self.lastfm_service.get_similar_tracks(artist, track, limit))
     
+    @tool("Get top tracks from Last.fm charts", limit="Max number of results")
     async def get_lastfm_top_tracks(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top tracks on Last.fm"""
         if not self.lastfm_service:
             return [{"error": "Last.fm service unavailable"}]
-        return await self.lastfm_service.get_top_tracks(limit)
+        return await self._call_service(self.lastfm_service.get_top_tracks(limit))
     
     # Cross-platform methods
-    async def search_all_platforms(self, query: str, limit: int = 5) -> Dict[str, Any]:
-        """Search all platforms"""
+    @tool("Search music across all platforms (Spotify, YouTube, Last.fm)",
+          query="Search query for music",
+          limit="Max number of results per platform and type",
+          platforms="Platforms to search (default: all)",
+          types="Result types to search for (default: all)",
+          merge="Group the same song across platforms into works",
+          local_first="Answer from the local index when it has enough matches")
+    async def search_all_platforms(self,
+                                   query: str,
+                                   limit: int = 5,
+                                   platforms: Optional[List[Platform]] = None,
+                                   types: Optional[List[ResultType]] = None,
+                                   merge: bool = True,
+                                   local_first: bool = False) -> Dict[str, Any]:
+        """Search all platforms, or only the selected platforms and result types"""
         if not self.orchestrator:
             return [{"error": "Music orchestrator not available"}]
-        return await self.orchestrator.search_all_platforms(query, limit)
+        return await self.orchestrator.search_all_platforms(query, limit, platforms, types, merge, local_first)
+
+    def batch_error(self, queries: List[str]) -> Optional[str]:
+        """Why a batch of queries cannot be searched, or None if it can"""
+        if not self.orchestrator:
+            return "Music orchestrator not available"
+        if len(queries) > self.batch_max_queries:
+            return f"At most {self.batch_max_queries} queries per batch, got {len(queries)}"
+        return None
+
+    async def search_batch_results(self,
+                                   queries: List[str],
+                                   limit: int = 5,
+                                   platforms: Optional[List[Platform]] = None,
+                                   types: Optional[List[ResultType]] = None,
+                                   merge: bool = False) -> AsyncIterator[Tuple[List[str], Dict[str, Any]]]:
+        """Search each distinct query on all platforms, yielding (queries, result) as searches finish
+
+        Queries that differ only in case or spacing are searched once and yielded together.
+        Every search holds a slot of the shared batch semaphore while it runs, and searches
+        still pending are cancelled if the caller stops early (e.g. with contextlib.aclosing).
+        """
+        groups: Dict[str, List[str]] = {}
+        for query in dict.fromkeys(queries):
+            groups.setdefault(" ".join(query.split()).casefold(), []).append(query)
+
+        if "" in groups:
+            yield groups.pop(""), {"status": "error", "message": "Empty query"}
+
+        async def search(key: str) -> Tuple[str, Dict[str, Any]]:
+            async with self.batch_semaphore:
+                return key, await self.orchestrator.search_all_platforms(groups[key][0], limit, platforms, types, merge)
+
+        tasks = [asyncio.create_task(search(key)) for key in groups]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                key, result = await finished
+                yield groups[key], result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @tool("Search many queries across all platforms in one call; repeated queries are searched once "
+          "and results are keyed by query",
+          queries="Search queries",
+          limit="Max number of results per query, platform and type",
+          platforms="Platforms to search (default: all)",
+          types="Result types to search for (default: all)",
+          merge="Group the same song across platforms into works")
+    async def search_batch(self,
+                           queries: List[str],
+                           limit: int = 5,
+                           platforms: Optional[List[Platform]] = None,
+                           types: Optional[List[ResultType]] = None,
+                           merge: bool = False) -> Dict[str, Any]:
+        """Search a batch of queries, each distinct one once, under the shared batch concurrency limit"""
+        error = self.batch_error(queries)
+        if error:
+            return {"error": error}
+        results: Dict[str, Any] = {}
+        distinct = 0
+        async with aclosing(self.search_batch_results(queries, limit, platforms, types, merge)) as batch:
+            async for group, result in batch:
+                distinct += 1
+                for query in group:
+                    results[query] = result
+        return {
+            "results": {query: results[query] for query in dict.fromkeys(queries)},
+            "queries": len(queries),
+            "distinct": distinct,
+            "status": "success"
+        }
+
+    @tool("Search results fetched earlier from any platform, without calling upstream",
+          query="Title or artist, prefixes and typos allowed",
+          limit="Max number of results",
+          platforms="Platforms to include (default: all)",
+          types="Result types to include (default: all)")
+    async def search_local(self,
+                           query: str,
+                           limit: int = 10,
+                           platforms: Optional[List[Platform]] = None,
+                           types: Optional[List[ResultType]] = None) -> List[Dict[str, Any]]:
+        """Search results fetched earlier from any platform, without calling upstream"""
+        if self.local_index is None:
+            return [{"error": "Local index disabled"}]
+        return fields.project_all(self.local_index.search(query, limit, platforms, types))
     
+    @tool("Get music recommendations based on seeds",
+          seed_tracks="List of Spotify track IDs", seed_artists="List of Spotify artist IDs")
     async def get_music_recommendations(self, seed_tracks: List[str] = None, seed_artists: List[str] = None) -> Dict[str, Any]:
         """Get music recommendations"""
         if not self.orchestrator:
             return [{"error": "Music orchestrator not available"}]
         return await self.orchestrator.get_music_recommendations(seed_tracks, seed_artists)
 
-
+    @tool("Get server metrics: per-tool and per-provider call counts, latency percentiles, errors, "
+          "in-flight requests and cache statistics")
+    async def get_server_stats(self) -> Dict[str, Any]:
+        """Metrics summary plus cache, circuit breaker, coalescing and rate limit state"""
+        return {
+            **metrics.summary(),
+            "cache": self.cache_stats(),
+            "circuits": self.health(),
+            "coalescing": self.coalescing_stats(),
+            "rate_limits": self.rate_limit_stats(),
+            "local_index": self.local_index_stats(),
+            "tracing": self.tracing_stats(),
+        }
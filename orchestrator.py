@@ -5,70 +5,207 @@ searches across multiple platforms.
 """
 
 import asyncio
+import functools
 import logging
-from typing import Any, Dict, List
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Set, Tuple
 
 from servicies.spotify_service import SpotifyService
 from servicies.youtube_service import YouTubeService
 from servicies.lastfm_service import LastfmService
+from servicies.errors import ServiceUnavailableError
+from servicies.local_index import LocalIndex
+from servicies import tracing
+from entity_resolution import resolve_works
 
 logger = logging.getLogger(__name__)
 
+# A platform reports the worst status among its calls
+STATUS_SEVERITY = {
+    "ok": 0, "timeout": 1, "rate_limited": 2, "quota_exhausted": 2,
+    "circuit_open": 3, "upstream_error": 3, "error": 3
+}
+
+Platform = Literal["spotify", "youtube", "lastfm"]
+ResultType = Literal["tracks", "artists", "albums", "videos", "playlists"]
+
+# Result types each platform can search for
+PLATFORM_TYPES = {
+    "spotify": ("tracks", "artists", "albums"),
+    "youtube": ("videos", "playlists"),
+    "lastfm": ("tracks", "artists", "albums")
+}
+
+# Per-call timeout (seconds) for each platform, and the overall deadline for a fan-out
+DEFAULT_PLATFORM_TIMEOUTS = {"spotify": 5.0, "youtube": 5.0, "lastfm": 5.0}
+DEFAULT_SEARCH_DEADLINE = 8.0
+
 class MusicDiscoveryOrchestrator:
     """Orchestrates music discovery across multiple platforms."""
 
     def __init__(self,
                  spotify_service: SpotifyService,
                  youtube_service: YouTubeService, 
-                 lastfm_service: LastfmService):
+                 lastfm_service: LastfmService,
+                 platform_timeouts: Optional[Dict[str, float]] = None,
+                 search_deadline: float = DEFAULT_SEARCH_DEADLINE,
+                 local_index: Optional[LocalIndex] = None):
         self.spotify = spotify_service
         self.youtube = youtube_service
         self.lastfm = lastfm_service
+        self.platform_timeouts = {**DEFAULT_PLATFORM_TIMEOUTS, **(platform_timeouts or {})}
+        self.search_deadline = search_deadline
+        self.local_index = local_index
+        # Fan-outs left running after a local-first answer, kept so they are not garbage collected
+        self._background: Set[asyncio.Task] = set()
+
+    def _service(self, platform: str) -> Any:
+        return {"spotify": self.spotify, "youtube": self.youtube, "lastfm": self.lastfm}[platform]
+
+    async def _timed_call(self, platform: str, call: Awaitable[Any]) -> Tuple[str, Any, float]:
+        """Run one upstream call under its platform timeout, returning (status, result, latency_ms)"""
+        start = time.perf_counter()
+        with tracing.span(f"orchestrator.{platform}") as platform_span:
+            try:
+                result = await asyncio.wait_for(call, timeout=self.platform_timeouts[platform])
+                status = "ok"
+            except asyncio.TimeoutError:
+                logger.warning(f"{platform} call timed out after {self.platform_timeouts[platform]}s")
+                result, status = [], "timeout"
+            except ServiceUnavailableError as e:
+                logger.warning(f"{platform} unavailable: {e}")
+                result, status = [], e.reason
+            except Exception as e:
+                logger.error(f"Error in {platform} call: {e}")
+                result, status = [], "error"
+            if platform_span is not None:
+                platform_span.set(outcome=status)
+        return status, result, (time.perf_counter() - start) * 1000
+
+    def _search_calls(self,
+                      query: str,
+                      limit: int,
+                      platform: str,
+                      types: List[str]) -> List[Tuple[str, Tuple[str, ...], Callable[[], Awaitable[Any]]]]:
+        """Upstream calls for the requested types on one platform
+
+        Calls are returned unstarted, so no coroutine exists until its task is created.
+        """
+        if platform == "spotify":
+            # One multi-type request covers every Spotify type
+            return [("spotify", tuple(types), functools.partial(self.spotify.search_multi, query, limit, types))]
+
+        if platform == "youtube":
+            searches = {
+                "videos": self.youtube.search_music_videos,
+                "playlists": self.youtube.search_music_playlists
+            }
+        else:
+            searches = {
+                "tracks": self.lastfm.search_tracks,
+                "artists": self.lastfm.search_artists,
+                "albums": self.lastfm.search_albums
+            }
+        return [(platform, (kind,), functools.partial(searches[kind], query, limit)) for kind in types]
+
+    async def _finish(self, tasks: List[asyncio.Task]) -> None:
+        """Let a fan-out run to the search deadline, then cancel whatever is left"""
+        _, pending = await asyncio.wait(tasks, timeout=self.search_deadline)
+        for task in pending:
+            task.cancel()
 
-    async def search_all_platforms(self, query: str, limit: int = 5) -> Dict[str, Any]:
-        """Search for music across all platforms"""
+    async def search_all_platforms(self,
+                                   query: str,
+                                   limit: int = 5,
+                                   platforms: Optional[List[str]] = None,
+                                   types: Optional[List[str]] = None,
+                                   merge: bool = True,
+                                   local_first: bool = False) -> Dict[str, Any]:
+        """Search for music across all platforms, or only the given platforms and result types
+
+        With merge, tracks and videos that are the same song are also grouped into
+        "works" linking each platform's results. With local_first, matches from the
+        local index are included, and if there are at least limit of them they are
+        returned straight away while the upstream calls finish in the background to
+        refresh the cache and index.
+        """
         try:
-            # Search all platforms concurrently
-            spotify_tasks = [
-                self.spotify.search_tracks(query, limit),
-                self.spotify.search_artists(query, limit),
-                self.spotify.search_albums(query, limit)
-            ]
+            unknown_platforms = set(platforms or []) - set(PLATFORM_TYPES)
+            if unknown_platforms:
+                raise ValueError(f"Unknown platforms: {', '.join(sorted(unknown_platforms))}")
+            all_types = {kind for kinds in PLATFORM_TYPES.values() for kind in kinds}
+            unknown_types = set(types or []) - all_types
+            if unknown_types:
+                raise ValueError(f"Unknown types: {', '.join(sorted(unknown_types))}")
 
-            youtube_tasks = [
-                self.youtube.search_music_playlists(query, limit),
-                self.youtube.search_music_videos(query, limit)
-            ]
+            response: Dict[str, Any] = {"query": query}
+            platforms_status: Dict[str, Dict[str, Any]] = {}
 
-            lastfm_tasks = [
-                self.lastfm.search_tracks(query, limit),
-                self.lastfm.search_artists(query, limit),
-                self.lastfm.search_albums(query, limit)
+            # (platform, result kinds, call); a call with several kinds returns a dict keyed by kind
+            calls = []
+            for platform in (platforms or PLATFORM_TYPES):
+                platform_types = [kind for kind in PLATFORM_TYPES[platform] if not types or kind in types]
+                if not platform_types:
+                    continue
+                if self._service(platform) is None:
+                    # Skip unconfigured services up front rather than failing inside the fan-out
+                    platforms_status[platform] = {"status": "disabled", "latency_ms": 0.0, "circuit": None}
+                    continue
+                calls.extend(self._search_calls(query, limit, platform, platform_types))
+
+            local = None
+            if local_first and self.local_index is not None:
+                local = self.local_index.search(query, limit, platforms, types)
+                response["local"] = local
+
+            # Run every upstream call in one fan-out so no platform waits on another
+            tasks = [
+                (platform, kinds, asyncio.create_task(self._timed_call(platform, call())))
+                for platform, kinds, call in calls
             ]
+            if local is not None and len(local) >= limit:
+                if tasks:
+                    background = asyncio.create_task(self._finish([task for _, _, task in tasks]))
+                    self._background.add(background)
+                    background.add_done_callback(self._background.discard)
+                response["platforms"] = {
+                    **platforms_status,
+                    **{platform: {"status": "pending", "latency_ms": 0.0, "circuit": None} for platform, _, _ in tasks}
+                }
+                response["source"] = "local"
+                response["status"] = "success"
+                return response
 
-            # Execute all searches
-            spotify_results = await asyncio.gather(*spotify_tasks, return_exceptions=True)
-            youtube_results = await asyncio.gather(*youtube_tasks, return_exceptions=True)
-            lastfm_results = await asyncio.gather(*lastfm_tasks, return_exceptions=True)
+            if tasks:
+                await asyncio.wait([task for _, _, task in tasks], timeout=self.search_deadline)
 
-            return {
-                "query": query,
-                "spotify": {
-                    "tracks": spotify_results[0] if not isinstance(spotify_results[0], Exception) else [],
-                    "artists": spotify_results[1] if not isinstance(spotify_results[1], Exception) else [],
-                    "albums": spotify_results[2] if not isinstance(spotify_results[2], Exception) else []
-                },
-                "youtube": {
-                    "videos": youtube_results[0] if not isinstance(youtube_results[0], Exception) else [],
-                    "playlists": youtube_results[1] if not isinstance(youtube_results[1], Exception) else []
-                },
-                "lastfm": {
-                    "tracks": lastfm_results[0] if not isinstance(lastfm_results[0], Exception) else [],
-                    "artists": lastfm_results[1] if not isinstance(lastfm_results[1], Exception) else [],
-                    "albums": lastfm_results[2] if not isinstance(lastfm_results[2], Exception) else []
-                },
-                "status": "success"
-            }
+            platforms = {}
+            for platform, kinds, task in tasks:
+                if task.done():
+                    status, result, latency_ms = task.result()
+                else:
+                    task.cancel()
+                    status, result, latency_ms = "timeout", [], self.search_deadline * 1000
+
+                results = result if isinstance(result, dict) else {kinds[0]: result}
+                for kind in kinds:
+                    response.setdefault(platform, {})[kind] = results.get(kind, [])
+
+                summary = platforms.setdefault(platform, {"status": "ok", "latency_ms": 0.0})
+                if STATUS_SEVERITY[status] > STATUS_SEVERITY[summary["status"]]:
+                    summary["status"] = status
+                summary["latency_ms"] = round(max(summary["latency_ms"], latency_ms), 1)
+
+            for platform, summary in platforms.items():
+                breaker = getattr(self._service(platform), 'circuit_breaker', None)
+                summary["circuit"] = breaker.state if breaker is not None else None
+
+            if merge:
+                response["works"] = resolve_works(response)
+            response["platforms"] = {**platforms_status, **platforms}
+            response["source"] = "upstream"
+            response["status"] = "success"
+            return response
         except Exception as e:
             logger.error(f"Error in cross-platform search: {e}")
             return {"status": "error", "message": str(e)}
@@ -0,0 +1,49 @@
+"""
+Response serialization for MCP music server
+This module provides the JSON serializer used for MCP tool results and HTTP
+responses: orjson when it is installed, the standard json module otherwise.
+Output is compact by default; pretty-printing is opt-in.
+"""
+
+import json
+import os
+from contextvars import ContextVar
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Per-request pretty-printing for HTTP responses, set by PrettyQueryMiddleware
+pretty_output: ContextVar[bool] = ContextVar("pretty_output", default=False)
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+# Pretty-print MCP tool results unless a call sets pretty (they end up in LLM context, so compact is the default)
+MCP_PRETTY_JSON = _env_flag('MCP_PRETTY_JSON')
+
+def backend() -> str:
+    """Name of the serializer in use"""
+    return "orjson" if orjson is not None else "json"
+
+def dumps_bytes(value: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes; values JSON can't represent are converted with str()"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(value, default=str, option=option)
+    if pretty:
+        return json.dumps(value, indent=2, ensure_ascii=False, default=str).encode("utf-8")
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str).encode("utf-8")
+
+def dumps(value: Any, pretty: bool = False) -> str:
+    """Serialize to a JSON string"""
+    return dumps_bytes(value, pretty).decode("utf-8")
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -8,5 +8,19 @@ with various music APIs, such as Spotify, YpuTube, and Last.fm.
 from .spotify_service import SpotifyService
 from .youtube_service import YouTubeService
 from .lastfm_service import LastfmService
+from .http_client import BaseHTTPService, HTTPClientConfig
+from .cache import ResponseCache
+from .disk_cache import DiskCache
+from .local_index import LocalIndex
+from .single_flight import SingleFlight
+from .rate_limit import QuotaTracker, TokenBucket
+from .errors import QuotaExhaustedError, RateLimitedError, ServiceUnavailableError
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, UpstreamError
 
-__all__ = ["SpotifyService", "YouTubeService", "LastfmService"]
\ No newline at end of file
+__all__ = [
+    "SpotifyService", "YouTubeService", "LastfmService",
+    "BaseHTTPService", "HTTPClientConfig", "ResponseCache", "DiskCache",
+    "LocalIndex", "SingleFlight", "TokenBucket", "QuotaTracker",
+    "RetryPolicy", "CircuitBreaker",
+    "ServiceUnavailableError", "RateLimitedError", "QuotaExhaustedError", "CircuitOpenError", "UpstreamError"
+]
\ No newline at end of file
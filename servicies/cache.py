@@ -0,0 +1,297 @@
+"""
+Response cache for MCP Music Server services
+This module provides the ResponseCache class, an in-memory TTL + LRU cache
+shared by all services with an optional persistent DiskCache tier underneath,
+and the cached decorator for service methods. Disk reads and writes run in
+worker threads; writes are not awaited by the request that made them.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from . import fields, tracing
+from .disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live in seconds for each kind of cached call
+DEFAULT_TTLS = {
+    "chart": 10 * 60,
+    "search": 60 * 60,
+    "similar": 60 * 60,
+    "recommendations": 60 * 60,
+    "details": 24 * 60 * 60,
+}
+
+def normalize_value(value: Any, fold_case: bool = True) -> Hashable:
+    """Normalize a call argument so equivalent queries share one cache key
+
+    Case is only folded for free-text arguments; IDs are case-sensitive.
+    """
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.lower() if fold_case else value
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_value(item, fold_case) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_value(item, fold_case)) for key, item in value.items()))
+    return value
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory cost of a cached value by its JSON length"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+class ResponseCache:
+    """In-memory TTL cache bounded by entry count and total bytes, evicting least recently used"""
+
+    def __init__(self,
+                 max_entries: int = 2048,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None,
+                 disk: Optional[DiskCache] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.disk = disk
+
+        # key -> (expires_at, size, value), oldest first
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+        self._refreshing: Set[Tuple] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._disk_writes: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from CACHE_* environment variables"""
+        ttls = {}
+        for name in DEFAULT_TTLS:
+            value = os.getenv(f'CACHE_TTL_{name.upper()}')
+            if value:
+                ttls[name] = float(value)
+        return cls(
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 2048)),
+            max_bytes=int(os.getenv('CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+            ttls=ttls,
+            disk=DiskCache.from_env()
+        )
+
+    @staticmethod
+    def make_key(service: str,
+                 method: str,
+                 arguments: Dict[str, Any],
+                 fold_case: bool = True,
+                 case_sensitive: Tuple[str, ...] = ()) -> Tuple:
+        """Build a cache key from the service, method and normalized call arguments
+
+        Arguments named in case_sensitive keep their case even when fold_case is set.
+        """
+        return (service, method) + tuple(
+            (name, normalize_value(value, fold_case and name not in case_sensitive)) for name, value in arguments.items()
+        )
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Return (found, value) for a key, dropping it if expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key: Tuple, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds, evicting least recently used entries to stay in bounds"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def ttl_for(self, kind: str) -> float:
+        return self.ttls.get(kind, DEFAULT_TTLS["search"])
+
+    async def lookup(self, key: Tuple) -> Tuple[bool, Any]:
+        """Return (found, value) from memory or a fresh disk entry, without loading anything"""
+        found, value = self.get(key)
+        if found or self.disk is None:
+            return found, value
+
+        stored = await asyncio.to_thread(self.disk.get, key)
+        if stored is None or stored[1] <= 0:
+            return False, None
+        value, expires_in = stored
+        self.disk_hits += 1
+        self.set(key, value, expires_in)
+        return True, value
+
+    async def get_or_load(self, key: Tuple, kind: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached value, or await the loader and cache a non-empty result
+
+        Entries found only on disk are promoted to memory. Stale disk entries are
+        returned right away while the loader refreshes them in the background.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        if self.disk is not None:
+            stored = await asyncio.to_thread(self.disk.get, key)
+            if stored is not None:
+                value, expires_in = stored
+                if expires_in > 0:
+                    self.disk_hits += 1
+                    self.set(key, value, expires_in)
+                else:
+                    self.stale_hits += 1
+                    self._refresh_in_background(key, kind, loader)
+                return value
+
+        value = await loader()
+        self.store(key, value, kind)
+        return value
+
+    def store(self, key: Tuple, value: Any, kind: str) -> None:
+        """Store a value in memory and on disk with the TTL for its kind"""
+        # Services return empty results on errors, so those are never cached
+        if not value:
+            return
+        ttl = self.ttl_for(kind)
+        self.set(key, value, ttl)
+        if self.disk is not None:
+            self._write_in_background(key, value, ttl)
+
+    def _write_in_background(self, key: Tuple, value: Any, ttl: float) -> None:
+        async def write():
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, ttl)
+            except Exception as e:
+                logger.error(f"Error writing to disk cache: {e}")
+
+        task = asyncio.create_task(write())
+        self._disk_writes.add(task)
+        task.add_done_callback(self._disk_writes.discard)
+
+    def _refresh_in_background(self, key: Tuple, kind: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                self.store(key, await loader(), kind)
+                self.refreshes += 1
+            except Exception as e:
+                logger.error(f"Error refreshing stale cache entry: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def close(self) -> None:
+        """Cancel pending background refreshes, finish disk writes and close the disk tier"""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        if self._disk_writes:
+            await asyncio.gather(*self._disk_writes, return_exceptions=True)
+        if self.disk is not None:
+            self.disk.close()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+    def _remove(self, key: Tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+def cached(kind: str, fold_case: bool = True, case_sensitive: Tuple[str, ...] = ()):
+    """Cache a service method's result in the service's ResponseCache under the given TTL kind
+
+    Pass fold_case=False for methods whose arguments are case-sensitive IDs, or name
+    the case-sensitive arguments (such as opaque page tokens) in case_sensitive.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            cache: Optional[ResponseCache] = getattr(self, 'cache', None)
+            if cache is None:
+                return await func(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop('self')
+            projection = fields.current()
+            if projection is not None:
+                # Projected results are parsed differently, so they are cached separately
+                arguments['_fields'] = sorted(projection)
+            key = cache.make_key(self.cache_namespace, func.__name__, arguments, fold_case, case_sensitive)
+            with tracing.span(f"{self.cache_namespace}.{func.__name__}", cache="hit") as method_span:
+                def load():
+                    if method_span is not None and method_span.end is None:
+                        method_span.set(cache="miss")
+                    return func(self, *args, **kwargs)
+                return await cache.get_or_load(key, kind, load)
+
+        return wrapper
+    return decorator
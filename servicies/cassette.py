@@ -0,0 +1,244 @@
+"""
+Record/replay HTTP cassettes for MCP Music Server services
+This module provides the Cassette archive and the CassetteTransport that the
+services' httpx clients use when CASSETTE_MODE is set. In record mode every
+upstream request/response pair is appended to a gzipped JSON Lines file; in
+replay mode responses are served from that file with their recorded timing
+(optionally scaled) and nothing goes over the network.
+
+Each recording is written and flushed as its own gzip member, so a server that
+is killed loses at most the recording it was writing; a truncated tail or a
+bad line is skipped with a warning when the cassette is loaded.
+
+API keys are left out of recorded URLs and access tokens are blanked out of
+recorded bodies, so a cassette can be shared.
+"""
+
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASSETTE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-music-server", "cassette.jsonl.gz")
+
+MODES = ("record", "replay")
+# exact: same method, URL and query; endpoint: also fall back to any recording of the same endpoint
+MATCH_MODES = ("exact", "endpoint")
+
+# Query parameters holding credentials, never recorded or matched on
+SECRET_PARAMS = frozenset({"key", "api_key"})
+# Query parameters that select a different API call on the same path (Last.fm method, search type, YouTube parts)
+ENDPOINT_PARAMS = ("method", "type", "part")
+# Response body fields blanked out when recording
+SECRET_FIELDS = ("access_token", "refresh_token")
+# Response headers worth keeping; the rest are transport details
+KEPT_HEADERS = ("content-type", "retry-after")
+
+def _request_key(method: str, url: httpx.URL) -> str:
+    params = sorted((name, value) for name, value in url.params.multi_items() if name not in SECRET_PARAMS)
+    return f"{method} {url.scheme}://{url.netloc.decode('ascii')}{url.path}?{httpx.QueryParams(params)}"
+
+def _endpoint_key(method: str, url: httpx.URL) -> str:
+    params = [(name, url.params[name]) for name in ENDPOINT_PARAMS if name in url.params]
+    return f"{method} {url.scheme}://{url.netloc.decode('ascii')}{url.path}?{httpx.QueryParams(params)}"
+
+def _redact(body: str) -> str:
+    """Blank out access tokens in a JSON body"""
+    if not any(f'"{field}"' in body for field in SECRET_FIELDS):
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(data, dict):
+        for field in SECRET_FIELDS:
+            if field in data:
+                data[field] = "redacted"
+    return json.dumps(data, separators=(',', ':'))
+
+class Cassette:
+    """Upstream interactions recorded to, or replayed from, a gzipped JSON Lines archive"""
+
+    def __init__(self,
+                 path: str = DEFAULT_CASSETTE_PATH,
+                 mode: str = "replay",
+                 time_scale: float = 1.0,
+                 match: str = "exact"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode} (choose from {', '.join(MODES)})")
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unknown cassette match: {match} (choose from {', '.join(MATCH_MODES)})")
+        self.path = path
+        self.mode = mode
+        # Replayed responses wait recorded time * time_scale; 0 replays instantly
+        self.time_scale = time_scale
+        self.match = match
+
+        self._exact: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._endpoints: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # Next recording to serve per key, so repeated requests cycle through their recordings
+        self._cursors: DefaultDict[str, int] = defaultdict(int)
+        self._file = None
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """Build a cassette from CASSETTE_* environment variables, or None if CASSETTE_MODE is unset or off"""
+        mode = os.getenv('CASSETTE_MODE', 'off').lower()
+        if mode in ('', '0', 'false', 'no', 'off'):
+            return None
+        return cls(
+            path=os.path.expanduser(os.getenv('CASSETTE_PATH', DEFAULT_CASSETTE_PATH)),
+            mode=mode,
+            time_scale=float(os.getenv('CASSETTE_TIME_SCALE', 1.0)),
+            match=os.getenv('CASSETTE_MATCH', 'exact').lower()
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.error(f"Cassette {self.path} does not exist, every upstream request will miss")
+            return
+        skipped = 0
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    if not line.strip():
+                        continue
+                    try:
+                        self._add(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+        except (EOFError, OSError, UnicodeDecodeError) as e:
+            # A server killed mid-write leaves a truncated last member; keep everything before it
+            logger.warning(f"Cassette {self.path} ends with a truncated recording, ignoring the rest: {e}")
+        if skipped:
+            logger.warning(f"Cassette {self.path} had {skipped} unreadable recordings, skipped them")
+        logger.info(f"Cassette loaded {sum(len(entries) for entries in self._exact.values())} recordings from {self.path}")
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        url = httpx.URL(entry["url"])
+        self._exact[_request_key(entry["method"], url)].append(entry)
+        self._endpoints[_endpoint_key(entry["method"], url)].append(entry)
+
+    def transport(self, inner: Optional[httpx.AsyncBaseTransport] = None) -> "CassetteTransport":
+        """A transport for one service's client; inner sends recorded requests upstream"""
+        return CassetteTransport(self, inner)
+
+    def lookup(self, method: str, url: httpx.URL) -> Optional[Dict[str, Any]]:
+        """The next recording for a request, or None if there is none"""
+        for key, recordings in ((_request_key(method, url), self._exact), (_endpoint_key(method, url), self._endpoints)):
+            entries = recordings.get(key)
+            if entries:
+                cursor = self._cursors[key]
+                self._cursors[key] = cursor + 1
+                self.replayed += 1
+                return entries[cursor % len(entries)]
+            if self.match == "exact":
+                break
+        self.misses += 1
+        return None
+
+    def record(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float) -> None:
+        """Append one interaction to the archive"""
+        params = [(name, value) for name, value in request.url.params.multi_items() if name not in SECRET_PARAMS]
+        entry: Dict[str, Any] = {
+            "method": request.method,
+            "url": str(request.url.copy_with(params=params)),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "recorded_at": round(time.time(), 3),
+        }
+        try:
+            entry["body"] = _redact(body.decode("utf-8"))
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(body).decode("ascii")
+
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        # One complete, flushed gzip member per recording; readers see one continuous stream
+        line = json.dumps(entry, separators=(',', ':')) + "\n"
+        self._file.write(gzip.compress(line.encode("utf-8")))
+        self._file.flush()
+        self._add(entry)
+        self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "match": self.match,
+            "time_scale": self.time_scale,
+            "recordings": sum(len(entries) for entries in self._exact.values()),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Cassette saved {self.recorded} recordings to {self.path}")
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records through an inner transport or replays from a Cassette"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.cassette.replaying:
+            return await self._replay(request)
+
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            # Reading decodes any content-encoding, so the body is recorded and returned decoded
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        self.cassette.record(request, response, body, time.perf_counter() - start)
+
+        headers = [(name, value) for name, value in response.headers.multi_items()
+                   if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def _replay(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cassette.lookup(request.method, request.url)
+        if entry is None:
+            logger.warning(f"Cassette has no recording for {_request_key(request.method, request.url)}")
+            # A 404 is neither retried nor counted against the circuit breaker
+            return httpx.Response(404, json={"error": "no cassette recording for this request"}, request=request)
+
+        if self.cassette.time_scale > 0:
+            await asyncio.sleep(entry["elapsed_ms"] / 1000 * self.cassette.time_scale)
+        body = base64.b64decode(entry["body_b64"]) if "body_b64" in entry else entry["body"].encode("utf-8")
+        return httpx.Response(entry["status"], headers=entry["headers"], content=body, request=request)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
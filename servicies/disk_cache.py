@@ -0,0 +1,195 @@
+"""
+Persistent result cache for MCP Music Server services
+This module provides the DiskCache class, a SQLite (WAL mode) tier that sits
+under the in-memory ResponseCache so results survive server restarts.
+ResponseCache calls it from worker threads so SQLite I/O stays off the event
+loop, and the size cap is enforced against the database itself, so several
+processes can share one file. Use cache_cli.py to inspect or purge it.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-music-server", "cache.sqlite3")
+
+class DiskCache:
+    """SQLite-backed cache tier bounded by total bytes, evicting least recently used entries"""
+
+    def __init__(self,
+                 path: str = DEFAULT_DB_PATH,
+                 max_bytes: int = 256 * 1024 * 1024,
+                 stale_ttl: float = 7 * 24 * 60 * 60):
+        self.path = path
+        self.max_bytes = max_bytes
+        # How long past expiry an entry may still be served while it is refreshed
+        self.stale_ttl = stale_ttl
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Shared by worker threads, one call at a time
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        # Lets the size cap be summed without reading every value
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_size ON entries (size)")
+
+    @classmethod
+    def from_env(cls) -> Optional["DiskCache"]:
+        """Build a disk cache from CACHE_DB_* environment variables, or None if disabled"""
+        if os.getenv('CACHE_DISK', 'true').lower() in ('0', 'false', 'no', 'off'):
+            return None
+        try:
+            return cls(
+                path=os.path.expanduser(os.getenv('CACHE_DB_PATH', DEFAULT_DB_PATH)),
+                max_bytes=int(os.getenv('CACHE_DB_MAX_BYTES', 256 * 1024 * 1024)),
+                stale_ttl=float(os.getenv('CACHE_STALE_TTL', 7 * 24 * 60 * 60))
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Disk cache disabled, could not open database: {e}")
+            return None
+
+    @staticmethod
+    def encode_key(key: Tuple) -> str:
+        return json.dumps(key, separators=(',', ':'), default=str)
+
+    def get(self, key: Tuple) -> Optional[Tuple[Any, float]]:
+        """Return (value, seconds until expiry) for a key, or None if missing or too stale to serve
+
+        A negative expiry means the entry is stale but may still be served while it is refreshed.
+        """
+        encoded = self.encode_key(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (encoded,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            now = time.time()
+            if now > expires_at + self.stale_ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (encoded,))
+                return None
+
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, encoded))
+        return json.loads(value), expires_at - now
+
+    def set(self, key: Tuple, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds, then evict old entries if over the size cap"""
+        encoded = self.encode_key(key)
+        payload = json.dumps(value, separators=(',', ':'), default=str)
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, namespace, value, size, stored_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (encoded, str(key[0]), payload, size, now, now + ttl, now)
+            )
+            self._evict()
+
+    def delete(self, key: Tuple) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (self.encode_key(key),))
+
+    def size_bytes(self) -> int:
+        """Total size of stored values, including entries written by other processes"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self) -> None:
+        """If over the cap, delete least recently used entries until the total size is under 90% of it"""
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        while total > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in rows])
+            total -= sum(size for _, size in rows)
+
+    def purge(self, expired_only: bool = False, namespace: Optional[str] = None) -> int:
+        """Delete entries, optionally only expired ones or one service's, returning the count"""
+        conditions, params = [], []
+        if expired_only:
+            conditions.append("expires_at < ?")
+            params.append(time.time())
+        if namespace:
+            conditions.append("namespace = ?")
+            params.append(namespace)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            deleted = self._conn.execute(f"DELETE FROM entries{where}", params).rowcount
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def entries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently used entries, without their values"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, size, stored_at, expires_at, accessed_at FROM entries "
+                "ORDER BY accessed_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {
+                "key": key,
+                "size": size,
+                "age_s": round(now - stored_at, 1),
+                "expires_in_s": round(expires_at - now, 1),
+                "last_used_s": round(now - accessed_at, 1),
+            }
+            for key, size, stored_at, expires_at, accessed_at in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            total, expired, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at < ?), 0), COALESCE(SUM(size), 0) FROM entries", (now,)
+            ).fetchone()
+            namespaces = dict(self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM entries GROUP BY namespace"
+            ).fetchall())
+        return {
+            "path": self.path,
+            "entries": total,
+            "expired": expired,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "namespaces": namespaces,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,35 @@
+"""
+Errors raised by MCP Music Server services
+Services return empty results when a search finds nothing or fails. These
+errors are raised instead when a provider cannot be called at all, so callers
+can tell "no results" apart from "unavailable".
+"""
+
+from typing import Any, Dict, Optional
+
+class ServiceUnavailableError(Exception):
+    """A provider cannot be called right now"""
+
+    reason = "unavailable"
+
+    def __init__(self, service: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.service = service
+        self.retry_after = retry_after
+
+    def to_result(self) -> Dict[str, Any]:
+        """Error entry in the shape MCPServer returns for unavailable services"""
+        result = {"error": str(self), "service": self.service, "reason": self.reason}
+        if self.retry_after is not None:
+            result["retry_after_s"] = round(self.retry_after, 1)
+        return result
+
+class RateLimitedError(ServiceUnavailableError):
+    """The provider's request rate limit would be exceeded"""
+
+    reason = "rate_limited"
+
+class QuotaExhaustedError(ServiceUnavailableError):
+    """The provider's daily quota is used up"""
+
+    reason = "quota_exhausted"
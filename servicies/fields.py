@@ -0,0 +1,86 @@
+"""
+Field projection for MCP Music Server services
+This module defines the named response profiles (minimal, standard, full) and
+the per-request projection that service parsers consult, so fields nobody
+asked for are never built.
+
+The projection lives in a context variable set around a tool call or HTTP
+request. Tasks started during the request inherit it, so a cross-platform
+fan-out is projected the same way on every platform.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+PROFILES: Dict[str, Optional[FrozenSet[str]]] = {
+    # Enough to identify and display a result, and to link it across platforms
+    "minimal": frozenset({
+        "id", "name", "title", "artist", "channel", "url", "spotify_url", "youtube_url"
+    }),
+    "standard": frozenset({
+        "id", "name", "title", "artist", "channel", "url", "spotify_url", "youtube_url",
+        "album", "release_date", "published_at", "duration", "duration_ms", "popularity",
+        "followers", "genres", "total_tracks", "album_type", "listeners", "match",
+        "view_count", "like_count", "mbid"
+    }),
+    "full": None,
+}
+DEFAULT_PROFILE = "full"
+
+# Keys that are never projected away: error details and local index metadata
+ALWAYS_KEPT = frozenset({"error", "service", "reason", "retry_after_s", "platform", "type", "score"})
+
+_projection: ContextVar[Optional[FrozenSet[str]]] = ContextVar("projection", default=None)
+
+def resolve(fields: Optional[Iterable[str]] = None, profile: Optional[str] = None) -> Optional[FrozenSet[str]]:
+    """Fields to keep for a request, or None for every field
+
+    Explicit fields win over a profile. Raises ValueError for an unknown profile.
+    """
+    if fields:
+        return frozenset(field.strip() for field in fields if field.strip())
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile: {profile} (choose from {', '.join(PROFILES)})")
+    return PROFILES[profile]
+
+def current() -> Optional[FrozenSet[str]]:
+    """The projection for the running request, or None for every field"""
+    return _projection.get()
+
+@contextmanager
+def projected(fields: Optional[FrozenSet[str]]) -> Iterator[None]:
+    """Apply a projection to everything run inside the block"""
+    token = _projection.set(fields)
+    try:
+        yield
+    finally:
+        _projection.reset(token)
+
+@contextmanager
+def including(*names: str) -> Iterator[None]:
+    """Widen the running projection by names, for fields needed internally (such as IDs to merge on)"""
+    fields = _projection.get()
+    with projected(None if fields is None else fields | frozenset(names)):
+        yield
+
+def build(extractors: Dict[str, Callable[[Dict[str, Any]], Any]], item: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a parsed result, calling only the extractors for projected fields"""
+    fields = _projection.get()
+    if fields is None:
+        return {name: extract(item) for name, extract in extractors.items()}
+    return {name: extract(item) for name, extract in extractors.items() if name in fields}
+
+def project(item: Any, fields: Optional[FrozenSet[str]] = None) -> Any:
+    """Drop unprojected keys from an already built result"""
+    fields = fields if fields is not None else _projection.get()
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {key: value for key, value in item.items() if key in fields or key in ALWAYS_KEPT}
+
+def project_all(items: List[Any], fields: Optional[FrozenSet[str]] = None) -> List[Any]:
+    fields = fields if fields is not None else _projection.get()
+    if fields is None:
+        return items
+    return [project(item, fields) for item in items]
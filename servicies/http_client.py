@@ -0,0 +1,405 @@
+"""
+Shared HTTP client support for MCP Music Server services
+This module provides the HTTPClientConfig model and the BaseHTTPService class
+that gives each service one long-lived, pooled httpx.AsyncClient.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import ssl
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+from . import fields, tracing
+from .cache import ResponseCache
+from .errors import RateLimitedError, ServiceUnavailableError
+from .local_index import LocalIndex
+from .metrics import UPSTREAM_FAILURES, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_REQUESTS
+from .rate_limit import QuotaTracker, TokenBucket
+from .resilience import CircuitBreaker, RetryPolicy, UpstreamError
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class HTTPClientConfig(BaseModel):
+    """Connection pool and timeout settings for upstream HTTP clients"""
+    max_connections: int = Field(default=100, description="Max open connections per service")
+    max_keepalive_connections: int = Field(default=20, description="Max idle keep-alive connections per service")
+    keepalive_expiry: float = Field(default=30.0, description="Seconds an idle connection is kept open")
+    connect_timeout: float = Field(default=5.0, description="Seconds to wait for a connection")
+    read_timeout: float = Field(default=10.0, description="Seconds to wait for response data")
+    write_timeout: float = Field(default=10.0, description="Seconds to wait while sending data")
+    pool_timeout: float = Field(default=5.0, description="Seconds to wait for a free pooled connection")
+    http2: bool = Field(default=False, description="Enable HTTP/2 (requires the h2 package)")
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientConfig":
+        """Build a config from HTTP_* environment variables, keeping defaults for unset ones"""
+        env_variables = {
+            'max_connections': 'HTTP_MAX_CONNECTIONS',
+            'max_keepalive_connections': 'HTTP_MAX_KEEPALIVE_CONNECTIONS',
+            'keepalive_expiry': 'HTTP_KEEPALIVE_EXPIRY',
+            'connect_timeout': 'HTTP_CONNECT_TIMEOUT',
+            'read_timeout': 'HTTP_READ_TIMEOUT',
+            'write_timeout': 'HTTP_WRITE_TIMEOUT',
+            'pool_timeout': 'HTTP_POOL_TIMEOUT',
+            'http2': 'HTTP_HTTP2',
+        }
+        values = {field: os.getenv(variable) for field, variable in env_variables.items()}
+        return cls(**{field: value for field, value in values.items() if value is not None})
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout
+        )
+
+def http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+@functools.lru_cache(maxsize=None)
+def shared_ssl_context() -> ssl.SSLContext:
+    """One verifying SSL context for every upstream client
+
+    Loading the CA bundle is most of the cost of building a client, so it is done
+    once rather than per service.
+    """
+    return httpx.create_ssl_context()
+
+def parse_retry_after(response: httpx.Response, default: Optional[float] = 1.0) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header given in seconds or as an HTTP date"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+class BaseHTTPService:
+    """Base class for services that talk to an upstream API over a pooled httpx client"""
+
+    # Service name used in cache keys
+    cache_namespace = "http"
+
+    def __init__(self,
+                 http_config: Optional[HTTPClientConfig] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 index: Optional[LocalIndex] = None):
+        self.http_config = http_config or HTTPClientConfig()
+        self.transport = transport
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(self.cache_namespace)
+        self.index = index
+        self.quota: Optional[QuotaTracker] = None
+        self.single_flight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self.http_config.http2
+        if http2 and not http2_available():
+            logger.warning(f"{type(self).__name__}: HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            http2 = False
+
+        kwargs: Dict[str, Any] = {
+            "limits": self.http_config.limits(),
+            "timeout": self.http_config.timeout(),
+            "http2": http2,
+        }
+        if self.transport is not None:
+            kwargs["transport"] = self.transport
+        else:
+            kwargs["verify"] = shared_ssl_context()
+        return httpx.AsyncClient(**kwargs)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use if open() was not called"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def open(self) -> None:
+        """Open the shared HTTP client"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+
+    async def close(self) -> None:
+        """Close the shared HTTP client and release pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _lookup_by_ids(self,
+                             name: str,
+                             ids: List[str],
+                             chunk_size: int,
+                             fetch_chunk: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Resolve many IDs with multi-get requests, returning found items in input order
+
+        IDs already in the cache are served per ID. The rest are split into chunks of
+        chunk_size and fetched concurrently; each fetched item is cached under its "id".
+        Unavailable-provider errors are raised only if nothing at all could be returned.
+        """
+        ids = list(dict.fromkeys(item_id.strip() for item_id in ids if item_id and item_id.strip()))
+        items: Dict[str, Dict[str, Any]] = {}
+        missing = []
+
+        for item_id in ids:
+            if self.cache is not None:
+                found, item = await self.cache.lookup(self._id_key(name, item_id))
+                if found:
+                    items[item_id] = item
+                    continue
+            missing.append(item_id)
+
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        # Items are cached per ID for every caller, so they are parsed in full and projected on the way out
+        with fields.projected(None):
+            results = await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunks], return_exceptions=True)
+
+        unavailable = None
+        for result in results:
+            if isinstance(result, ServiceUnavailableError):
+                unavailable = result
+            elif isinstance(result, Exception):
+                logger.error(f"Error looking up {self.cache_namespace} {name}: {result}")
+            else:
+                for item in result:
+                    items[item["id"]] = item
+                    if self.cache is not None:
+                        self.cache.store(self._id_key(name, item["id"]), item, "details")
+
+        if unavailable is not None and not items:
+            raise unavailable
+        return fields.project_all([items[item_id] for item_id in ids if item_id in items])
+
+    async def _paginate(self,
+                        fetch_page: Callable[[int], Awaitable[List[Dict[str, Any]]]],
+                        max_results: int,
+                        page_size: int,
+                        concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """Stream items from numbered pages (0, 1, ...), fetching up to concurrency pages ahead
+
+        Items come out in page order. Iteration ends at max_results or at the first short
+        page. Pages still in flight are cancelled when the caller stops early, once the
+        generator is closed (e.g. with contextlib.aclosing).
+        """
+        pages = -(-max_results // page_size)
+        pending: Deque[asyncio.Task] = deque()
+        next_page = 0
+        yielded = 0
+        try:
+            while True:
+                while next_page < pages and len(pending) < concurrency:
+                    pending.append(asyncio.create_task(fetch_page(next_page)))
+                    next_page += 1
+                if not pending:
+                    return
+
+                items = await pending.popleft()
+                for item in items[:max_results - yielded]:
+                    yield item
+                    yielded += 1
+                if yielded >= max_results or len(items) < page_size:
+                    return
+        finally:
+            for task in pending:
+                if task.done():
+                    if not task.cancelled():
+                        task.exception()
+                else:
+                    task.cancel()
+
+    def _id_key(self, name: str, item_id: str):
+        return self.cache.make_key(self.cache_namespace, name, {"id": item_id}, fold_case=False)
+
+    async def _get(self,
+                   url: str,
+                   params: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None,
+                   endpoint: Optional[str] = None) -> httpx.Response:
+        """Send a GET through the shared client, coalescing identical concurrent requests
+
+        Only the request that actually goes upstream waits on the rate limiter, is
+        retried and is charged against the quota for endpoint; callers that join it
+        share the outcome.
+        """
+        key = (
+            url,
+            tuple(sorted((params or {}).items())),
+            tuple(sorted((headers or {}).items()))
+        )
+        with tracing.span(f"{self.cache_namespace} {self._endpoint_label(url, params, endpoint)}") as upstream_span:
+            if upstream_span is not None:
+                # A coalesced caller's time is all spent waiting on another request's spans
+                upstream_span.set(coalesced=self.single_flight.in_flight(key))
+            return await self.single_flight.do(key, lambda: self._send_with_retries(url, params, headers, endpoint))
+
+    async def _post(self,
+                    url: str,
+                    data: Optional[Dict[str, Any]] = None,
+                    auth: Optional[httpx.Auth] = None,
+                    endpoint: Optional[str] = None) -> httpx.Response:
+        """Send a form POST with the same rate limiting, retries and circuit breaker as _get, without coalescing"""
+        with tracing.span(f"{self.cache_namespace} {self._endpoint_label(url, None, endpoint)}"):
+            return await self._send_with_retries(url, None, None, endpoint, method="POST", data=data, auth=auth)
+
+    async def _send_with_retries(self,
+                                 url: str,
+                                 params: Optional[Dict[str, Any]],
+                                 headers: Optional[Dict[str, str]],
+                                 endpoint: Optional[str],
+                                 method: str = "GET",
+                                 data: Optional[Dict[str, Any]] = None,
+                                 auth: Optional[httpx.Auth] = None) -> httpx.Response:
+        """Send one upstream request with rate limiting, quota checks, retries and the circuit breaker
+
+        Raises UpstreamError once retries are used up on transport errors or 5xx
+        responses, so a failing provider is not mistaken for an empty result.
+        """
+        try:
+            return await self._send_attempts(url, params, headers, endpoint, method, data, auth)
+        except ServiceUnavailableError as e:
+            UPSTREAM_FAILURES.labels(self.cache_namespace, e.reason).inc()
+            raise
+
+    @staticmethod
+    def _endpoint_label(url: str, params: Optional[Dict[str, Any]], endpoint: Optional[str]) -> str:
+        """Low-cardinality name of the API call: the quota endpoint, the Last.fm method or the last path segment"""
+        if endpoint:
+            return endpoint
+        if params and 'method' in params:
+            return str(params['method'])
+        return url.rstrip('/').rsplit('/', 1)[-1]
+
+    @staticmethod
+    async def _backoff(delay: float) -> None:
+        start = time.perf_counter()
+        await asyncio.sleep(delay)
+        tracing.record("retry.backoff", start, time.perf_counter())
+
+    async def _send_attempts(self,
+                             url: str,
+                             params: Optional[Dict[str, Any]],
+                             headers: Optional[Dict[str, str]],
+                             endpoint: Optional[str],
+                             method: str = "GET",
+                             data: Optional[Dict[str, Any]] = None,
+                             auth: Optional[httpx.Auth] = None) -> httpx.Response:
+        probe = self.circuit_breaker.before_call()
+        try:
+            return await self._attempt_loop(url, params, headers, endpoint, method, data, auth)
+        finally:
+            # A rate limit, quota error or cancellation settles nothing about the provider's health
+            if probe:
+                self.circuit_breaker.release_probe()
+
+    async def _attempt_loop(self,
+                            url: str,
+                            params: Optional[Dict[str, Any]],
+                            headers: Optional[Dict[str, str]],
+                            endpoint: Optional[str],
+                            method: str = "GET",
+                            data: Optional[Dict[str, Any]] = None,
+                            auth: Optional[httpx.Auth] = None) -> httpx.Response:
+        service = self.cache_namespace
+        endpoint_label = self._endpoint_label(url, params, endpoint)
+
+        for attempt in range(self.retry_policy.max_attempts):
+            last_attempt = attempt + 1 >= self.retry_policy.max_attempts
+            if self.quota is not None and endpoint:
+                self.quota.check(endpoint)
+            if self.rate_limiter is not None:
+                waiting = time.perf_counter()
+                await self.rate_limiter.acquire()
+                if time.perf_counter() - waiting >= 0.001:
+                    tracing.record("rate_limit.wait", waiting, time.perf_counter())
+
+            in_flight = UPSTREAM_IN_FLIGHT.labels(service)
+            in_flight.inc()
+            start = time.perf_counter()
+            transport_error = None
+            with tracing.span("http.request", attempt=attempt + 1) as request_span:
+                timings = tracing.HTTPTimings(request_span) if request_span is not None else None
+                try:
+                    response = await self.client.request(
+                        method, url, params=params, headers=headers, data=data, auth=auth,
+                        extensions={"trace": timings} if timings is not None else None
+                    )
+                except httpx.TransportError as e:
+                    transport_error = e
+                finally:
+                    in_flight.dec()
+                    UPSTREAM_LATENCY.labels(service, endpoint_label).observe(time.perf_counter() - start)
+                if timings is not None:
+                    timings.apply()
+                    request_span.set(status=response.status_code if transport_error is None else "transport_error")
+
+            if transport_error is not None:
+                UPSTREAM_REQUESTS.labels(service, endpoint_label, "transport_error").inc()
+                if last_attempt:
+                    self.circuit_breaker.record_failure()
+                    raise UpstreamError(service, f"{service} request failed: {transport_error!r}") from transport_error
+                await self._backoff(self.retry_policy.backoff(attempt))
+                continue
+            UPSTREAM_REQUESTS.labels(service, endpoint_label, response.status_code).inc()
+
+            if self.quota is not None and endpoint:
+                self.quota.charge(endpoint)
+
+            retry_after = parse_retry_after(response, default=None)
+            if response.status_code == 429 and self.rate_limiter is not None:
+                self.rate_limiter.pause(retry_after if retry_after is not None else 1.0)
+
+            if last_attempt or not self.retry_policy.is_retryable(response):
+                break
+            if retry_after is not None and retry_after > self.retry_policy.max_retry_after:
+                break
+
+            if response.status_code == 429 and self.rate_limiter is not None:
+                # The paused rate limiter already holds the next attempt back
+                continue
+            await self._backoff(retry_after if retry_after is not None else self.retry_policy.backoff(attempt))
+
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+            raise UpstreamError(service, f"{service} returned HTTP {response.status_code}")
+        if response.status_code == 429:
+            raise RateLimitedError(service, f"{service} is rate limiting requests", retry_after=retry_after)
+
+        self.circuit_breaker.record_success()
+        return response
@@ -5,21 +5,83 @@ This module provides the LastfmService class for interacting with the Last.fm AP
 """
 
 import logging
-from typing import Any, Dict, List
-import json
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
+from . import fields
+from .cache import ResponseCache, cached
+from .errors import ServiceUnavailableError
+from .http_client import BaseHTTPService, HTTPClientConfig
+from .local_index import LocalIndex, indexed
+from .rate_limit import TokenBucket
+from .resilience import CircuitBreaker, RetryPolicy
+
 logger = logging.getLogger(__name__)
 
-class LastfmService:
+# Results per page when paging through searches
+SEARCH_PAGE_SIZE = 50
+
+# Parsed result fields and how to extract each from the API response
+TRACK_FIELDS = {
+    "name": lambda item: item['name'],
+    "artist": lambda item: item['artist'],
+    "url": lambda item: item['url'],
+    "listeners": lambda item: item.get('listeners', 0),
+    "image": lambda item: item.get('image', []),
+    "mbid": lambda item: item.get('mbid', ''),
+}
+ALBUM_FIELDS = {
+    "name": lambda item: item['name'],
+    "artist": lambda item: item['artist'],
+    "url": lambda item: item['url'],
+    "image": lambda item: item.get('image', []),
+    "mbid": lambda item: item.get('mbid', ''),
+}
+ARTIST_FIELDS = {
+    "name": lambda item: item['name'],
+    "url": lambda item: item['url'],
+    "listeners": lambda item: item.get('listeners', 0),
+    "image": lambda item: item.get('image', []),
+    "mbid": lambda item: item.get('mbid', ''),
+}
+# Similar and chart tracks nest the artist as an object
+SIMILAR_TRACK_FIELDS = {
+    "name": lambda item: item['name'],
+    "artist": lambda item: item['artist']['name'],
+    "url": lambda item: item['url'],
+    "match": lambda item: item.get('match', 0),
+    "image": lambda item: item.get('image', []),
+}
+CHART_TRACK_FIELDS = {
+    "name": lambda item: item['name'],
+    "artist": lambda item: item['artist']['name'],
+    "url": lambda item: item['url'],
+    "listeners": lambda item: item.get('listeners', 0),
+    "image": lambda item: item.get('image', []),
+}
+
+class LastfmService(BaseHTTPService):
     """Service for interacting with Last.fm API."""
+
+    cache_namespace = "lastfm"
     
-    def __init__(self, api_key: str):
+    def __init__(self,
+                 api_key: str,
+                 http_config: Optional[HTTPClientConfig] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 index: Optional[LocalIndex] = None):
+        super().__init__(http_config, transport, cache, rate_limiter, retry_policy, circuit_breaker, index)
         self.api_key = api_key
         self.base_url = "https://ws.audioscrobbler.com/2.0/"
     
-    async def search_tracks(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    @cached("search")
+    @indexed("tracks")
+    async def search_tracks(self, query: str, limit: int = 10, page: int = 1) -> List[Dict[str, Any]]:
         """Search for tracks on Last.fm."""
         try:
             params = {
@@ -27,38 +89,34 @@ class LastfmService:
                 'track': query,
                 'api_key': self.api_key,
                 'format': 'json',
-                'limit': limit
+                'limit': limit,
+                'page': page
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            response = await self._get(self.base_url, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    tracks = []
+            if response.status_code == 200:
+                data = response.json()
+                tracks = []
                     
-                    if 'results' in data and 'trackmatches' in data['results']:
-                        for item in data['results']['trackmatches']['track']:
-                            track = {
-                                "name": item['name'],
-                                "artist": item['artist'],
-                                "url": item['url'],
-                                "listeners": item.get('listeners', 0),
-                                "image": item.get('image', []),
-                                "mbid": item.get('mbid', '')
-                            }
-                            tracks.append(track)
+                if 'results' in data and 'trackmatches' in data['results']:
+                    for item in data['results']['trackmatches']['track']:
+                        tracks.append(fields.build(TRACK_FIELDS, item))
                     
-                    return tracks
-                else:
-                    logger.error(f"Last.fm API error: {response.status_code}")
-                    return []
+                return tracks
+            else:
+                logger.error(f"Last.fm API error: {response.status_code}")
+                return []
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Last.fm tracks: {e}")
             return []
     
-    async def search_albums(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    @cached("search")
+    @indexed("albums")
+    async def search_albums(self, query: str, limit: int = 10, page: int = 1) -> List[Dict[str, Any]]:
         """Search for albums on Last.fm."""
         try:
             params = {
@@ -66,37 +124,34 @@ class LastfmService:
                 'album': query,
                 'api_key': self.api_key,
                 'format': 'json',
-                'limit': limit
+                'limit': limit,
+                'page': page
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            response = await self._get(self.base_url, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    albums = []
+            if response.status_code == 200:
+                data = response.json()
+                albums = []
                     
-                    if 'results' in data and 'albummatches' in data['results']:
-                        for item in data['results']['albummatches']['album']:
-                            album = {
-                                "name": item['name'],
-                                "artist": item['artist'],
-                                "url": item['url'],
-                                "image": item.get('image', []),
-                                "mbid": item.get('mbid', '')
-                            }
-                            albums.append(album)
+                if 'results' in data and 'albummatches' in data['results']:
+                    for item in data['results']['albummatches']['album']:
+                        albums.append(fields.build(ALBUM_FIELDS, item))
                     
-                    return albums
-                else:
-                    logger.error(f"Last.fm API error: {response.status_code}")
-                    return []
+                return albums
+            else:
+                logger.error(f"Last.fm API error: {response.status_code}")
+                return []
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Last.fm albums: {e}")
             return []
     
-    async def search_artists(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    @cached("search")
+    @indexed("artists")
+    async def search_artists(self, query: str, limit: int = 10, page: int = 1) -> List[Dict[str, Any]]:
         """Search for artists on Last.fm."""
         try:
             params = {
@@ -104,36 +159,33 @@ class LastfmService:
                 'artist': query,
                 'api_key': self.api_key,
                 'format': 'json',
-                'limit': limit
+                'limit': limit,
+                'page': page
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            response = await self._get(self.base_url, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    artists = []
+            if response.status_code == 200:
+                data = response.json()
+                artists = []
                     
-                    if 'results' in data and 'artistmatches' in data['results']:
-                        for item in data['results']['artistmatches']['artist']:
-                            artist = {
-                                "name": item['name'],
-                                "url": item['url'],
-                                "listeners": item.get('listeners', 0),
-                                "image": item.get('image', []),
-                                "mbid": item.get('mbid', '')
-                            }
-                            artists.append(artist)
+                if 'results' in data and 'artistmatches' in data['results']:
+                    for item in data['results']['artistmatches']['artist']:
+                        artists.append(fields.build(ARTIST_FIELDS, item))
                     
-                    return artists
-                else:
-                    logger.error(f"Last.fm API error: {response.status_code}")
-                    return []
+                return artists
+            else:
+                logger.error(f"Last.fm API error: {response.status_code}")
+                return []
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Last.fm artists: {e}")
             return []
     
+    @cached("similar")
+    @indexed("tracks")
     async def get_similar_tracks(self, artist: str, track: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get similar tracks from Last.fm."""
         try:
@@ -146,33 +198,29 @@ class LastfmService:
                 'limit': limit
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            response = await self._get(self.base_url, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    tracks = []
+            if response.status_code == 200:
+                data = response.json()
+                tracks = []
                     
-                    if 'similartracks' in data and 'track' in data['similartracks']:
-                        for item in data['similartracks']['track']:
-                            track = {
-                                "name": item['name'],
-                                "artist": item['artist']['name'],
-                                "url": item['url'],
-                                "match": item.get('match', 0),
-                                "image": item.get('image', [])
-                            }
-                            tracks.append(track)
+                if 'similartracks' in data and 'track' in data['similartracks']:
+                    for item in data['similartracks']['track']:
+                        tracks.append(fields.build(SIMILAR_TRACK_FIELDS, item))
                     
-                    return tracks
-                else:
-                    logger.error(f"Last.fm API error: {response.status_code}")
-                    return []
+                return tracks
+            else:
+                logger.error(f"Last.fm API error: {response.status_code}")
+                return []
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error getting Last.fm similar tracks: {e}")
             return []
     
+    @cached("chart")
+    @indexed("tracks")
     async def get_top_tracks(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top tracks from Last.fm."""
         try:
@@ -183,33 +231,45 @@ class LastfmService:
                 'limit': limit
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            response = await self._get(self.base_url, params=params)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    tracks = []
+            if response.status_code == 200:
+                data = response.json()
+                tracks = []
                     
-                    if 'tracks' in data and 'track' in data['tracks']:
-                        for item in data['tracks']['track']:
-                            track = {
-                                "name": item['name'],
-                                "artist": item['artist']['name'],
-                                "url": item['url'],
-                                "listeners": item.get('listeners', 0),
-                                "image": item.get('image', [])
-                            }
-                            tracks.append(track)
+                if 'tracks' in data and 'track' in data['tracks']:
+                    for item in data['tracks']['track']:
+                        tracks.append(fields.build(CHART_TRACK_FIELDS, item))
                     
-                    return tracks
-                else:
-                    logger.error(f"Last.fm API error: {response.status_code}")
-                    return []
+                return tracks
+            else:
+                logger.error(f"Last.fm API error: {response.status_code}")
+                return []
                     
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error getting Last.fm top tracks: {e}")
             return []
     
+    def iter_search(self,
+                    query: str,
+                    kind: str = "tracks",
+                    max_results: int = 500,
+                    page_size: int = SEARCH_PAGE_SIZE,
+                    concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """Stream up to max_results tracks, albums or artists, fetching numbered pages concurrently"""
+        searches = {"tracks": self.search_tracks, "albums": self.search_albums, "artists": self.search_artists}
+        if kind not in searches:
+            raise ValueError(f"Unknown Last.fm search kind: {kind}")
+        # Last.fm pages are numbered from 1
+        return self._paginate(
+            lambda page: searches[kind](query, page_size, page + 1),
+            max_results,
+            page_size,
+            concurrency
+        )
+
     async def search_songs(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for songs on Last.fm (alias for search_tracks)."""
         return await self.search_tracks(query, limit) 
@@ -0,0 +1,322 @@
+"""
+Local search index for MCP Music Server services
+This module provides the LocalIndex class, an in-process trigram index over
+every track, artist, album, video and playlist the services have fetched, and
+the indexed decorator that feeds it. Documents are optionally persisted to
+SQLite so the index survives restarts; they are loaded on first use, or ahead
+of it in a worker thread with preload(), so a large index does not hold up
+server startup. While a preload runs, searches return nothing and new results
+are queued rather than blocking the event loop. New documents are written to
+SQLite by a background task in a worker thread.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import fields as projection
+from .text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-music-server", "index.sqlite3")
+
+# Documents to upsert as (key, document, seen_at) and keys to delete, from one add()
+WriteBatch = Tuple[List[Tuple[str, Dict[str, Any], float]], List[Tuple[str]]]
+
+# Share of a query's trigrams a document must contain to be returned
+MIN_SCORE = 0.5
+
+def trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """Trigrams of each word padded with spaces
+
+    With prefix, the last word is left open on the right so "hey ju" matches "hey jude".
+    """
+    words = text.split()
+    grams: Set[str] = set()
+    for position, word in enumerate(words):
+        padded = f"  {word}" if prefix and position == len(words) - 1 else f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _document_fields(item: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Searchable text and identity of a service result, or None for error entries and results without an ID"""
+    title = item.get("name") or item.get("title")
+    if not title or "error" in item:
+        return None
+    artist = item.get("artist") or item.get("channel") or ""
+    identity = item.get("id") or item.get("url") or item.get("spotify_url") or item.get("youtube_url")
+    if not identity:
+        return None
+    return {"text": normalize_text(f"{title} {artist}"), "identity": str(identity)}
+
+class LocalIndex:
+    """Trigram index over fetched results, bounded by document count with least recently seen eviction"""
+
+    def __init__(self, path: Optional[str] = None, max_documents: int = 50000):
+        self.path = path
+        self.max_documents = max_documents
+
+        self._documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._texts: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self.searches = 0
+        self.ingested = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = True
+        self._loading = False
+        self._load_lock = threading.Lock()
+        # Results ingested while a preload runs, added once it finishes
+        self._pending: List[Tuple[str, str, List[Dict[str, Any]]]] = []
+        # Batches not yet written to SQLite, and the task writing them
+        self._writes: List[WriteBatch] = []
+        self._writer: Optional[asyncio.Task] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    key TEXT PRIMARY KEY,
+                    document TEXT NOT NULL,
+                    seen_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS documents_seen ON documents (seen_at)")
+            self._loaded = False
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalIndex"]:
+        """Build the index from LOCAL_INDEX_* environment variables, or None if disabled"""
+        if os.getenv('LOCAL_INDEX', 'true').lower() in ('0', 'false', 'no', 'off'):
+            return None
+        max_documents = int(os.getenv('LOCAL_INDEX_MAX_DOCUMENTS', 50000))
+        path = os.path.expanduser(os.getenv('LOCAL_INDEX_PATH', DEFAULT_INDEX_PATH))
+        if os.getenv('LOCAL_INDEX_PERSIST', 'true').lower() in ('0', 'false', 'no', 'off'):
+            path = None
+        try:
+            return cls(path=path, max_documents=max_documents)
+        except sqlite3.Error as e:
+            logger.error(f"Local index persistence disabled, could not open database: {e}")
+            return cls(max_documents=max_documents)
+
+    def load(self) -> None:
+        """Load persisted documents, once; waits if another thread is already loading them"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded or self._conn is None:
+                return
+            start = time.perf_counter()
+            rows = self._conn.execute(
+                "SELECT key, document FROM documents ORDER BY seen_at DESC LIMIT ?", (self.max_documents,)
+            ).fetchall()
+            for key, document in reversed(rows):
+                self._insert(key, json.loads(document))
+            self._loaded = True
+            logger.info(f"Local index loaded {len(rows)} documents in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def preload(self) -> None:
+        """Load persisted documents in a worker thread so the event loop stays responsive"""
+        if self._loaded or self._loading:
+            return
+        self._loading = True
+        try:
+            await asyncio.to_thread(self.load)
+        finally:
+            self._loading = False
+        pending, self._pending = self._pending, []
+        for platform, kind, items in pending:
+            self.add(platform, kind, items)
+
+    def _insert(self, key: str, document: Dict[str, Any]) -> None:
+        fields = _document_fields(document)
+        if fields is None:
+            return
+        if key in self._documents:
+            self._remove(key)
+        self._documents[key] = document
+        self._texts[key] = fields["text"]
+        for gram in trigrams(fields["text"]):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        self._documents.pop(key, None)
+        text = self._texts.pop(key, "")
+        for gram in trigrams(text):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[gram]
+
+    def add(self, platform: str, kind: str, items: Iterable[Dict[str, Any]]) -> None:
+        """Ingest service results of one kind (tracks, videos, ...) from one platform"""
+        if self._loading:
+            # Persisted documents are older, so these are added after them
+            self._pending.append((platform, kind, list(items)))
+            return
+        self.load()
+        rows = []
+        now = time.time()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            fields = _document_fields(item)
+            if fields is None:
+                continue
+            key = f"{platform}:{kind}:{fields['identity']}"
+            # A later result may lack fields an earlier one had (such as video details), so it updates the document
+            document = {**self._documents.get(key, {}), **item, "platform": platform, "type": kind}
+            self._insert(key, document)
+            rows.append((key, document, now))
+
+        evicted = []
+        while len(self._documents) > self.max_documents:
+            key = next(iter(self._documents))
+            self._remove(key)
+            evicted.append((key,))
+        self.ingested += len(rows)
+
+        if self._conn is not None and rows:
+            self._writes.append((rows, evicted))
+            self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        """Start the background writer, or write inline when no event loop is running (e.g. in scripts)"""
+        if self._writer is not None and not self._writer.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            batches, self._writes = self._writes, []
+            self._write(batches)
+            return
+        self._writer = loop.create_task(self._write_in_background())
+
+    async def _write_in_background(self) -> None:
+        while self._writes:
+            batches, self._writes = self._writes, []
+            await asyncio.to_thread(self._write, batches)
+
+    def _write(self, batches: List[WriteBatch]) -> None:
+        with self._load_lock:
+            if self._conn is None:
+                return
+            for rows, evicted in batches:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO documents (key, document, seen_at) VALUES (?, ?, ?)",
+                        [(key, json.dumps(document, separators=(',', ':'), default=str), seen_at)
+                         for key, document, seen_at in rows]
+                    )
+                    if evicted:
+                        self._conn.executemany("DELETE FROM documents WHERE key = ?", evicted)
+                except sqlite3.Error as e:
+                    logger.error(f"Error persisting local index documents: {e}")
+
+    async def flush(self) -> None:
+        """Wait until every added document has been written to SQLite"""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def search(self,
+               query: str,
+               limit: int = 10,
+               platforms: Optional[List[str]] = None,
+               types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Prefix/fuzzy search by title and artist, best matches first, each with a score
+
+        Returns nothing while a preload is still running instead of waiting for it.
+        """
+        if self._loading and not self._loaded:
+            return []
+        self.load()
+        self.searches += 1
+        text = normalize_text(query)
+        query_grams = trigrams(text, prefix=True)
+        if not query_grams:
+            return []
+
+        counts: Dict[str, int] = {}
+        for gram in query_grams:
+            for key in self._postings.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+
+        needed = MIN_SCORE * len(query_grams)
+        scored = []
+        for key, count in counts.items():
+            if count < needed:
+                continue
+            document = self._documents[key]
+            if platforms and document["platform"] not in platforms:
+                continue
+            if types and document["type"] not in types:
+                continue
+            score = count / len(query_grams)
+            # Break ties in favour of documents that start with the query
+            if self._texts[key].startswith(text):
+                score += 0.5
+            scored.append((score, key))
+
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        return [{**self._documents[key], "score": round(score, 3)} for score, key in scored[:limit]]
+
+    def close(self) -> None:
+        # Writes what the background writer has not taken yet, and waits for a load or
+        # write still running in a worker thread, before closing the connection
+        batches, self._writes = self._writes, []
+        self._write(batches)
+        with self._load_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._documents),
+            "loaded": self._loaded,
+            "max_documents": self.max_documents,
+            "trigrams": len(self._postings),
+            "ingested": self.ingested,
+            "searches": self.searches,
+            "path": self.path,
+        }
+
+def indexed(kind: Optional[str] = None):
+    """Feed a service method's results into the service's LocalIndex
+
+    Pass the result kind for methods returning a list; methods returning a dict keyed
+    by kind (such as a multi-type search) are indexed per key, skipping non-list values.
+    Results built under a field projection are partial records and are not indexed.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            result = await func(self, *args, **kwargs)
+            index: Optional[LocalIndex] = getattr(self, 'index', None)
+            if index is not None and result and projection.current() is None:
+                try:
+                    if isinstance(result, dict):
+                        for result_kind, items in result.items():
+                            if isinstance(items, list):
+                                index.add(self.cache_namespace, result_kind, items)
+                    else:
+                        index.add(self.cache_namespace, kind, result)
+                except Exception as e:
+                    logger.error(f"Error indexing {func.__name__} results: {e}")
+            return result
+
+        return wrapper
+    return decorator
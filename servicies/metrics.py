@@ -0,0 +1,305 @@
+"""
+Metrics for MCP Music Server
+This module provides a small in-process metrics registry (counters, gauges
+and bucketed histograms with labels), the standard metrics recorded by the
+tool registry, the HTTP middleware and the upstream HTTP client, and two views
+of them: Prometheus text exposition for /metrics and a JSON summary for the
+get_server_stats tool.
+
+Values are plain Python numbers updated on the event loop, so recording costs
+a dict lookup and an addition.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A collector returns samples computed at scrape time: (name, type, help, [(labels, value), ...])
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow; cumulated only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating within its bucket, as Prometheus' histogram_quantile does"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        # The quantile lies past the last bucket; its upper bound is the best estimate
+        return self.buckets[-1]
+
+class Metric:
+    """A named metric with one child per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        """The child for these label values, in labelnames order"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def items(self) -> Iterable[Tuple[Dict[str, str], Any]]:
+        for key, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self.items():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self.items():
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(upper)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics in registration order, plus named collectors evaluated at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: Dict[str, Callable[[], List[Family]]] = {}
+        self.started_at = time.time()
+
+    def _register(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def set_collector(self, name: str, collect: Callable[[], List[Family]]) -> None:
+        """Add or replace a collector; the latest MCPServer instance owns the "server" collector"""
+        self._collectors[name] = collect
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = ["# HELP process_start_time_seconds Start time of the process since the epoch",
+                 "# TYPE process_start_time_seconds gauge",
+                 f"process_start_time_seconds {_format_value(round(self.started_at, 3))}"]
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collect in list(self._collectors.values()):
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+TOOL_CALLS = registry.counter("mcp_tool_calls_total", "MCP tool calls by outcome (ok or error)", ("tool", "outcome"))
+TOOL_LATENCY = registry.histogram("mcp_tool_duration_seconds", "MCP tool call latency", ("tool",))
+TOOLS_IN_FLIGHT = registry.gauge("mcp_tools_in_flight", "MCP tool calls in progress", ("tool",))
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests in progress")
+
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "Upstream API requests (each retry counts) by status code or transport_error",
+    ("provider", "endpoint", "status")
+)
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds", "Upstream API request latency, excluding rate limiter waits",
+    ("provider", "endpoint")
+)
+UPSTREAM_IN_FLIGHT = registry.gauge("upstream_requests_in_flight", "Upstream API requests in progress", ("provider",))
+UPSTREAM_FAILURES = registry.counter(
+    "upstream_failures_total", "Upstream calls given up on, by reason (upstream_error, circuit_open, rate_limited, ...)",
+    ("provider", "reason")
+)
+
+def _latency_summary(child: _HistogramChild) -> Dict[str, Any]:
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "count": child.count,
+        "mean_ms": ms(child.sum / child.count) if child.count else None,
+        "p50_ms": ms(child.quantile(0.50)),
+        "p95_ms": ms(child.quantile(0.95)),
+        "p99_ms": ms(child.quantile(0.99)),
+    }
+
+def summary() -> Dict[str, Any]:
+    """Metrics as JSON: per-tool, per-route and per-provider counts and latency percentiles
+
+    Percentiles are estimated from histogram buckets.
+    """
+    tools: Dict[str, Dict[str, Any]] = {}
+    for labels, child in TOOL_LATENCY.items():
+        tools[labels["tool"]] = {**_latency_summary(child), "errors": 0, "in_flight": 0}
+    for labels, child in TOOL_CALLS.items():
+        if labels["outcome"] == "error" and labels["tool"] in tools:
+            tools[labels["tool"]]["errors"] = int(child.value)
+    for labels, child in TOOLS_IN_FLIGHT.items():
+        if labels["tool"] in tools:
+            tools[labels["tool"]]["in_flight"] = int(child.value)
+
+    routes: Dict[str, Dict[str, Any]] = {}
+    for labels, child in HTTP_LATENCY.items():
+        routes[f"{labels['method']} {labels['route']}"] = {**_latency_summary(child), "status": {}}
+    for labels, child in HTTP_REQUESTS.items():
+        route = routes.get(f"{labels['method']} {labels['route']}")
+        if route is not None:
+            route["status"][labels["status"]] = int(child.value)
+
+    providers: Dict[str, Dict[str, Any]] = {}
+
+    def provider(name: str) -> Dict[str, Any]:
+        return providers.setdefault(name, {"requests": 0, "in_flight": 0, "status": {}, "failures": {}, "endpoints": {}})
+
+    for labels, child in UPSTREAM_REQUESTS.items():
+        entry = provider(labels["provider"])
+        entry["requests"] += int(child.value)
+        entry["status"][labels["status"]] = entry["status"].get(labels["status"], 0) + int(child.value)
+    for labels, child in UPSTREAM_LATENCY.items():
+        provider(labels["provider"])["endpoints"][labels["endpoint"]] = _latency_summary(child)
+    for labels, child in UPSTREAM_IN_FLIGHT.items():
+        provider(labels["provider"])["in_flight"] = int(child.value)
+    for labels, child in UPSTREAM_FAILURES.items():
+        provider(labels["provider"])["failures"][labels["reason"]] = int(child.value)
+
+    # Every endpoint of a provider merged into one latency distribution
+    merged: Dict[str, _HistogramChild] = {}
+    for labels, child in UPSTREAM_LATENCY.items():
+        total = merged.setdefault(labels["provider"], _HistogramChild(UPSTREAM_LATENCY.buckets))
+        total.counts = [a + b for a, b in zip(total.counts, child.counts)]
+        total.sum += child.sum
+        total.count += child.count
+    for name, total in merged.items():
+        provider(name)["latency"] = _latency_summary(total)
+    slowest = max(
+        (name for name in merged if merged[name].count),
+        key=lambda name: merged[name].quantile(0.95),
+        default=None
+    )
+
+    return {
+        "uptime_s": round(time.time() - registry.started_at, 1),
+        "tools": tools,
+        "http_routes": routes,
+        "http_in_flight": int(HTTP_IN_FLIGHT.labels().value),
+        "upstream": providers,
+        "slowest_provider": slowest,
+    }
@@ -0,0 +1,218 @@
+"""
+Rate limiting and quota accounting for MCP Music Server services
+This module provides the TokenBucket rate limiter used per provider and the
+QuotaTracker that counts YouTube Data API quota units per endpoint.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from .errors import QuotaExhaustedError, RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+# Quota units charged per YouTube Data API v3 call
+YOUTUBE_QUOTA_COSTS = {"search": 100, "videos": 1, "playlistItems": 1, "playlists": 1, "channels": 1}
+YOUTUBE_DAILY_QUOTA = 10000
+
+DEFAULT_QUOTA_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-music-server", "youtube_quota.json")
+
+def _pacific_timezone():
+    """YouTube quotas reset at midnight Pacific time"""
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo("America/Los_Angeles")
+    except Exception:
+        return timezone(timedelta(hours=-8))
+
+class TokenBucket:
+    """Token bucket limiter that queues callers for at most max_wait seconds"""
+
+    def __init__(self, service: str, rate: float, capacity: float, max_wait: float = 5.0):
+        self.service = service
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, service: str, rate: float, capacity: float) -> "TokenBucket":
+        """Build a limiter from <SERVICE>_RATE_LIMIT, <SERVICE>_RATE_BURST and RATE_LIMIT_MAX_WAIT"""
+        prefix = service.upper()
+        return cls(
+            service,
+            rate=float(os.getenv(f'{prefix}_RATE_LIMIT', rate)),
+            capacity=float(os.getenv(f'{prefix}_RATE_BURST', capacity)),
+            max_wait=float(os.getenv('RATE_LIMIT_MAX_WAIT', 5.0))
+        )
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        """Take tokens, waiting in line if needed, or raise RateLimitedError if the wait is too long
+
+        Tokens are reserved before sleeping (the balance may go negative), so callers
+        are served in arrival order without a lock.
+        """
+        self._refill()
+        self._tokens -= cost
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > self.max_wait:
+            self._tokens += cost
+            self.rejected += 1
+            raise RateLimitedError(self.service, f"{self.service} rate limit reached", retry_after=wait)
+
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back new requests for a while, e.g. after the provider answered 429"""
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "rejected": self.rejected,
+        }
+
+class QuotaTracker:
+    """Counts daily quota units per endpoint, optionally persisted to a JSON file"""
+
+    def __init__(self,
+                 service: str,
+                 daily_limit: int,
+                 costs: Dict[str, int],
+                 path: Optional[str] = None):
+        self.service = service
+        self.daily_limit = daily_limit
+        self.costs = costs
+        self.path = path
+        self._timezone = _pacific_timezone()
+
+        self._day = self._today()
+        self._used: Dict[str, int] = {}
+        self._exhausted = False
+        self._load()
+
+    @classmethod
+    def from_env(cls, persist: bool = True) -> "QuotaTracker":
+        """Build the YouTube quota tracker from YOUTUBE_DAILY_QUOTA and YOUTUBE_QUOTA_PATH
+
+        With persist=False usage is counted in memory only and the file is not touched.
+        """
+        return cls(
+            "youtube",
+            daily_limit=int(os.getenv('YOUTUBE_DAILY_QUOTA', YOUTUBE_DAILY_QUOTA)),
+            costs=YOUTUBE_QUOTA_COSTS,
+            path=os.path.expanduser(os.getenv('YOUTUBE_QUOTA_PATH', DEFAULT_QUOTA_PATH)) if persist else None
+        )
+
+    def _today(self) -> str:
+        return datetime.now(self._timezone).date().isoformat()
+
+    def _roll_over(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = {}
+            self._exhausted = False
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("day") == self._day:
+                self._used = {endpoint: int(units) for endpoint, units in data.get("used", {}).items()}
+                self._exhausted = bool(data.get("exhausted", False))
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading {self.service} quota usage: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as f:
+                json.dump({"day": self._day, "used": self._used, "exhausted": self._exhausted}, f)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            logger.error(f"Error saving {self.service} quota usage: {e}")
+
+    @property
+    def used(self) -> int:
+        self._roll_over()
+        return sum(self._used.values())
+
+    @property
+    def remaining(self) -> int:
+        # Roll over first, so a quotaExceeded reported yesterday does not block today's calls
+        self._roll_over()
+        if self._exhausted:
+            return 0
+        return max(0, self.daily_limit - self.used)
+
+    def seconds_until_reset(self) -> float:
+        now = datetime.now(self._timezone)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=self._timezone)
+        return (midnight - now).total_seconds()
+
+    def check(self, endpoint: str) -> None:
+        """Raise QuotaExhaustedError if a call to endpoint would exceed today's quota"""
+        cost = self.costs.get(endpoint, 1)
+        if cost > self.remaining:
+            raise QuotaExhaustedError(
+                self.service,
+                f"{self.service} daily quota exhausted ({self.used}/{self.daily_limit} units used)",
+                retry_after=self.seconds_until_reset()
+            )
+
+    def charge(self, endpoint: str) -> None:
+        """Record the quota cost of a call that was sent"""
+        self._roll_over()
+        self._used[endpoint] = self._used.get(endpoint, 0) + self.costs.get(endpoint, 1)
+        self._save()
+
+    def mark_exhausted(self) -> None:
+        """Stop calling until the daily reset, e.g. after the provider reported quotaExceeded"""
+        self._roll_over()
+        if not self._exhausted:
+            logger.warning(f"{self.service} reported its daily quota exceeded")
+        self._exhausted = True
+        self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "day": self._day,
+            "daily_limit": self.daily_limit,
+            "used": self.used,
+            "remaining": self.remaining,
+            "by_endpoint": dict(self._used),
+            "resets_in_s": round(self.seconds_until_reset()),
+        }
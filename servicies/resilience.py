@@ -0,0 +1,147 @@
+"""
+Retry and circuit breaker support for MCP Music Server services
+This module provides the RetryPolicy used for transient upstream failures and
+the CircuitBreaker that fails fast while a provider is down.
+"""
+
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .errors import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying; other 4xx responses are final
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(ServiceUnavailableError):
+    """The provider's circuit breaker is open"""
+
+    reason = "circuit_open"
+
+class UpstreamError(ServiceUnavailableError):
+    """The provider kept failing after all retries"""
+
+    reason = "upstream_error"
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable upstream failures"""
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.2,
+                 max_delay: float = 5.0,
+                 max_retry_after: float = 10.0):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Give up instead of retrying when the provider asks to wait longer than this
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Build a policy from RETRY_* environment variables"""
+        return cls(
+            max_attempts=int(os.getenv('RETRY_MAX_ATTEMPTS', 3)),
+            base_delay=float(os.getenv('RETRY_BASE_DELAY', 0.2)),
+            max_delay=float(os.getenv('RETRY_MAX_DELAY', 5.0)),
+            max_retry_after=float(os.getenv('RETRY_MAX_RETRY_AFTER', 10.0))
+        )
+
+    def is_retryable(self, response: Optional[httpx.Response] = None, error: Optional[Exception] = None) -> bool:
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response is not None and response.status_code in RETRYABLE_STATUS_CODES
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay before retry number attempt (starting at 0)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through once recovery_timeout has passed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, service: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    @classmethod
+    def from_env(cls, service: str) -> "CircuitBreaker":
+        """Build a breaker from CIRCUIT_* environment variables"""
+        return cls(
+            service,
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+            recovery_timeout=float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 30.0))
+        )
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go upstream now; True if the call is the half-open probe"""
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return False
+
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(
+                    self.service,
+                    f"{self.service} is unavailable (circuit open)",
+                    retry_after=self.recovery_timeout - (now - self.opened_at)
+                )
+            self.state = self.HALF_OPEN
+            self._probe_started_at = None
+
+        # Half-open: one probe at a time; a probe that never reported back is replaced
+        if self._probe_started_at is not None and now - self._probe_started_at < self.recovery_timeout:
+            self.rejected += 1
+            raise CircuitOpenError(self.service, f"{self.service} is recovering (circuit half-open)")
+        self._probe_started_at = now
+        return True
+
+    def release_probe(self) -> None:
+        """Let the next call probe again when the probe ended without recording a success or failure"""
+        if self.state == self.HALF_OPEN:
+            self._probe_started_at = None
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"{self.service} circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"{self.service} circuit opened after {self.failures} failures")
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,67 @@
+"""
+Request coalescing for MCP Music Server services
+This module provides the SingleFlight class, which lets identical concurrent
+upstream calls share one in-flight task instead of each sending a request.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """An in-flight upstream task and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one shared upstream task"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() for the first caller of a key, and share its result with callers that join while it runs
+
+        Each caller waits through a shield, so one caller being cancelled does not cancel
+        the others. The upstream task is only cancelled once every waiting caller is gone.
+        """
+        self.calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.collapsed += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for key is already running, so a new caller would join it"""
+        return key in self._calls
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """How many calls were made, how many reached upstream and how many were collapsed"""
+        return {
+            "calls": self.calls,
+            "upstream": self.calls - self.collapsed,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._calls),
+        }
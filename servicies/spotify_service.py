@@ -3,126 +3,316 @@ Spotify Service for MCP Music Server
 This module provides the SpotifyService class for interacting with the Spotify API
 """
 
+import asyncio
 import logging
-from typing import Any, Dict, List
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from . import fields
+from .cache import ResponseCache, cached
+from .errors import ServiceUnavailableError
+from .http_client import BaseHTTPService, HTTPClientConfig
+from .local_index import LocalIndex, indexed
+from .rate_limit import TokenBucket
+from .resilience import CircuitBreaker, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
-class SpotifyService:
+# Max IDs per multi-get request for each Spotify entity type
+TRACKS_PER_REQUEST = 50
+ARTISTS_PER_REQUEST = 50
+ALBUMS_PER_REQUEST = 20
+
+def _first_artist(item: Dict[str, Any]) -> str:
+    return item['artists'][0]['name'] if item['artists'] else "Unknown"
+
+def _first_image(images: List[Dict[str, Any]]) -> Optional[str]:
+    return images[0]['url'] if images else None
+
+# Parsed result fields and how to extract each from the Web API object
+TRACK_FIELDS = {
+    "id": lambda item: item['id'],
+    "name": lambda item: item['name'],
+    "artist": _first_artist,
+    "album": lambda item: item['album']['name'],
+    "duration_ms": lambda item: item['duration_ms'],
+    "popularity": lambda item: item['popularity'],
+    "spotify_url": lambda item: item['external_urls']['spotify'],
+    "preview_url": lambda item: item['preview_url'],
+    "release_date": lambda item: item['album']['release_date'],
+    "image_url": lambda item: _first_image(item['album']['images']),
+}
+ARTIST_FIELDS = {
+    "id": lambda item: item['id'],
+    "name": lambda item: item['name'],
+    "popularity": lambda item: item['popularity'],
+    "followers": lambda item: item['followers']['total'],
+    "genres": lambda item: item['genres'],
+    "spotify_url": lambda item: item['external_urls']['spotify'],
+    "image_url": lambda item: _first_image(item['images']),
+}
+ALBUM_FIELDS = {
+    "id": lambda item: item['id'],
+    "name": lambda item: item['name'],
+    "artist": _first_artist,
+    "release_date": lambda item: item['release_date'],
+    "total_tracks": lambda item: item['total_tracks'],
+    "album_type": lambda item: item['album_type'],
+    "spotify_url": lambda item: item['external_urls']['spotify'],
+    "image_url": lambda item: _first_image(item['images']),
+}
+RECOMMENDATION_FIELDS = {
+    name: TRACK_FIELDS[name]
+    for name in ("id", "name", "artist", "album", "popularity", "spotify_url", "preview_url")
+}
+
+# Largest search page, and how deep Spotify lets search results be paged
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_OFFSET = 1000
+
+class SpotifyService(BaseHTTPService):
     """Service for interacting with Spotify API."""
 
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str = None):
+    cache_namespace = "spotify"
+
+    # Refresh the access token this many seconds before Spotify expires it
+    TOKEN_EXPIRY_MARGIN = 60
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 redirect_uri: str = None,
+                 http_config: Optional[HTTPClientConfig] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 index: Optional[LocalIndex] = None):
+        super().__init__(http_config, transport, cache, rate_limiter, retry_policy, circuit_breaker, index)
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.api_url = "https://api.spotify.com/v1"
+        self.token_url = "https://accounts.spotify.com/api/token"
+
+        self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
 
-        auth_manager = SpotifyClientCredentials(
-            client_id=client_id,
-            client_secret=client_secret
+    async def _get_access_token(self, force_refresh: bool = False) -> str:
+        """Return a valid client-credentials access token, fetching a new one when needed"""
+        async with self._token_lock:
+            if not force_refresh and self._access_token and time.monotonic() < self._token_expires_at:
+                return self._access_token
+
+            # Sent through the retry and circuit breaker path; failures raise ServiceUnavailableError
+            # so "Spotify auth is down" is not mistaken for "no results"
+            response = await self._post(
+                self.token_url,
+                data={'grant_type': 'client_credentials'},
+                auth=httpx.BasicAuth(self.client_id, self.client_secret)
+            )
+            try:
+                response.raise_for_status()
+                data = response.json()
+                access_token = data['access_token']
+            except (httpx.HTTPStatusError, ValueError, KeyError) as e:
+                raise ServiceUnavailableError(
+                    self.cache_namespace, f"{self.cache_namespace} authentication failed: {e}"
+                ) from e
+
+            self._access_token = access_token
+            self._token_expires_at = time.monotonic() + data.get('expires_in', 3600) - self.TOKEN_EXPIRY_MARGIN
+            return self._access_token
+
+    async def _api_get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET a Spotify Web API endpoint, refreshing the token once on a 401"""
+        token = await self._get_access_token()
+        response = await self._get(
+            f"{self.api_url}{path}",
+            params=params,
+            headers={'Authorization': f"Bearer {token}"}
         )
-        self.sp = spotipy.Spotify(auth_manager=auth_manager)
 
-    async def search_tracks(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        if response.status_code == 401:
+            token = await self._get_access_token(force_refresh=True)
+            response = await self._get(
+                f"{self.api_url}{path}",
+                params=params,
+                headers={'Authorization': f"Bearer {token}"}
+            )
+
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _parse_track(item: Dict[str, Any]) -> Dict[str, Any]:
+        return fields.build(TRACK_FIELDS, item)
+
+    @staticmethod
+    def _parse_artist(item: Dict[str, Any]) -> Dict[str, Any]:
+        return fields.build(ARTIST_FIELDS, item)
+
+    @staticmethod
+    def _parse_album(item: Dict[str, Any]) -> Dict[str, Any]:
+        return fields.build(ALBUM_FIELDS, item)
+
+    @cached("search")
+    @indexed("tracks")
+    async def search_tracks(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
         """Search tracks on Spotify"""
         try:
-            results = self.sp.search(q=query, type='track', limit=limit)
+            results = await self._api_get('/search', {'q': query, 'type': 'track', 'limit': limit, 'offset': offset})
             tracks = []
 
             for item in results['tracks']['items']:
-                track = {
-                    "id": item['id'],
-                    "name": item['name'],
-                    "artist": item['artists'][0]['name'] if item['artists'] else "Unknown",
-                    "album": item['album']['name'],
-                    "duration_ms": item['duration_ms'],
-                    "popularity": item['popularity'],
-                    "spotify_url": item['external_urls']['spotify'],
-                    "preview_url": item['preview_url'],
-                    "release_date": item['album']['release_date'],
-                    "image_url": item['album']['images'][0]['url'] if item['album']['images'] else None
-                }
-                tracks.append(track)
+                tracks.append(self._parse_track(item))
             return tracks
-        
+
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Spotify tracks: {e}")
             return []
-        
-    async def search_artists(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+
+    @cached("search")
+    @indexed("artists")
+    async def search_artists(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
         """Search for artists om Spotify"""
         try:
-            results = self.sp.search(q=query, type='artist', limit=limit)
+            results = await self._api_get('/search', {'q': query, 'type': 'artist', 'limit': limit, 'offset': offset})
             artists = []
 
             for item in results['artists']['items']:
-                artist = {
-                    "id": item['id'],
-                    "name": item['name'],
-                    "popularity": item['popularity'],
-                    "followers": item['followers']['total'],
-                    "genres": item['genres'],
-                    "spotify_url": item['external_urls']['spotify'],
-                    "image_url": item['images'][0]['urls'] if item['images'] else None
-                }
-                artists.append(artist)
+                artists.append(self._parse_artist(item))
             return artists
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Spotify artists: {e}")
             return []
-        
-    async def search_albums(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+
+    @cached("search")
+    @indexed("albums")
+    async def search_albums(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
         """Search for albums onb Spotify"""
         try:
-            results = self.sp.search(q=query, type='album', limit=limit)
+            results = await self._api_get('/search', {'q': query, 'type': 'album', 'limit': limit, 'offset': offset})
             albums = []
 
             for item in results['albums']['items']:
-                album = {
-                    "id": item['id'],
-                    "name": item['name'],
-                    "artist": item['artists'][0]['name'] if item['artists'] else "Unknown",
-                    "release_date": item['release_date'],
-                    "total_tracks": item['total_tracks'],
-                    "album_type": item['album_type'],
-                    "spotify_url": item['external_urls']['spotify'],
-                    "image_url": item['images'][0]['urls'] if item['images'] else None
-                }
-                albums.append(album)
+                albums.append(self._parse_album(item))
             return albums
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error searching Spotify albums: {e}")
             return []
-        
-    async def get_recommendations(self, 
-                                  seed_tracks: List[str] = None, 
-                                  seed_artists: List[str] = None, 
-                                  seed_genres: List[str] = None, 
+
+    @cached("search")
+    @indexed()
+    async def search_multi(self,
+                           query: str,
+                           limit: int = 10,
+                           types: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Search several result types (tracks, artists, albums) on Spotify in a single request"""
+        parsers = {"tracks": self._parse_track, "artists": self._parse_artist, "albums": self._parse_album}
+        types = [kind for kind in (types or parsers) if kind in parsers]
+        if not types:
+            return {}
+
+        try:
+            # Spotify names types in the singular: track, artist, album
+            search_types = ','.join(kind[:-1] for kind in types)
+            results = await self._api_get('/search', {'q': query, 'type': search_types, 'limit': limit})
+            return {
+                kind: [parsers[kind](item) for item in results[kind]['items']]
+                for kind in types
+            }
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching Spotify: {e}")
+            return {}
+
+    def iter_search(self,
+                    query: str,
+                    kind: str = "tracks",
+                    max_results: int = 200,
+                    page_size: int = SEARCH_PAGE_SIZE,
+                    concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """Stream up to max_results tracks, artists or albums, fetching offset pages concurrently
+
+        Spotify serves search results up to offset 1000.
+        """
+        searches = {"tracks": self.search_tracks, "artists": self.search_artists, "albums": self.search_albums}
+        if kind not in searches:
+            raise ValueError(f"Unknown Spotify search kind: {kind}")
+        page_size = min(page_size, SEARCH_PAGE_SIZE)
+        return self._paginate(
+            lambda page: searches[kind](query, page_size, page * page_size),
+            min(max_results, SEARCH_MAX_OFFSET),
+            page_size,
+            concurrency
+        )
+
+    @cached("recommendations", fold_case=False)
+    @indexed("tracks")
+    async def get_recommendations(self,
+                                  seed_tracks: List[str] = None,
+                                  seed_artists: List[str] = None,
+                                  seed_genres: List[str] = None,
                                   limit: int = 10) -> List[Dict[str, Any]]:
         """Get track recommendations based on seeds"""
         try:
-            recommendations = self.sp.recommendations(
-                seed_tracks=seed_tracks,
-                seed_artists=seed_artists,
-                seed_genres=seed_genres,
-                limit=limit
-            )
+            params: Dict[str, Any] = {'limit': limit}
+            if seed_tracks:
+                params['seed_tracks'] = ','.join(seed_tracks)
+            if seed_artists:
+                params['seed_artists'] = ','.join(seed_artists)
+            if seed_genres:
+                params['seed_genres'] = ','.join(seed_genres)
+
+            recommendations = await self._api_get('/recommendations', params)
 
             tracks = []
 
             for item in recommendations['tracks']:
-                track = {
-                    "id": item['id'],
-                    "name": item['name'],
-                    "artist": item['artists'][0]['name'] if item['artists'] else "Unknown",
-                    "album": item['album']['name'],
-                    "popularity": item['popularity'],
-                    "spotify_url": item['external_urls']['spotify'],
-                    "preview_url": item['preview_url']
-                }
-                tracks.append(track)
+                tracks.append(fields.build(RECOMMENDATION_FIELDS, item))
             return tracks
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error getting Spotify recommendations: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    @indexed("tracks")
+    async def get_tracks(self, track_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get tracks by Spotify ID, 50 per request, in input order"""
+        return await self._lookup_by_ids("track", track_ids, TRACKS_PER_REQUEST, self._fetch_tracks)
+
+    @indexed("artists")
+    async def get_artists(self, artist_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get artists by Spotify ID, 50 per request, in input order"""
+        return await self._lookup_by_ids("artist", artist_ids, ARTISTS_PER_REQUEST, self._fetch_artists)
+
+    @indexed("albums")
+    async def get_albums(self, album_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get albums by Spotify ID, 20 per request, in input order"""
+        return await self._lookup_by_ids("album", album_ids, ALBUMS_PER_REQUEST, self._fetch_albums)
+
+    async def _fetch_tracks(self, track_ids: List[str]) -> List[Dict[str, Any]]:
+        results = await self._api_get('/tracks', {'ids': ','.join(track_ids)})
+        # Unknown IDs come back as null entries
+        return [self._parse_track(item) for item in results['tracks'] if item]
+
+    async def _fetch_artists(self, artist_ids: List[str]) -> List[Dict[str, Any]]:
+        results = await self._api_get('/artists', {'ids': ','.join(artist_ids)})
+        return [self._parse_artist(item) for item in results['artists'] if item]
+
+    async def _fetch_albums(self, album_ids: List[str]) -> List[Dict[str, Any]]:
+        results = await self._api_get('/albums', {'ids': ','.join(album_ids)})
+        return [self._parse_album(item) for item in results['albums'] if item]
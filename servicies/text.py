@@ -0,0 +1,18 @@
+"""
+Text normalization for MCP Music Server
+This module provides normalize_text, shared by the local search index and
+cross-platform entity resolution so both see a title the same way.
+"""
+
+import re
+import unicodedata
+
+# Anything that is not a letter or digit, underscores included
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[\W_]+")
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = NON_ALPHANUMERIC_PATTERN.sub(" ", text.lower())
+    return " ".join(text.split())
@@ -0,0 +1,409 @@
+"""
+Request tracing for MCP Music Server
+This module provides lightweight span trees: every tool call or HTTP request
+is a root span, and the orchestrator, cached service methods and upstream
+requests below it become child spans. Upstream requests are split into rate
+limiter wait, connection pool queue and network time, and an event loop lag
+monitor shows when a request was waiting on a blocked loop.
+
+Finished traces that are slow (or randomly sampled) are appended to a local
+JSON Lines file and, when an endpoint is configured, exported to an OTLP/HTTP
+collector. Tracing is opt-in (TRACING=true) and costs nothing when no Tracer
+is installed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-music-server", "traces.jsonl")
+
+# Spans shorter than this are not worth a loop lag figure
+LOOP_LAG_MIN_MS = 1.0
+
+class Span:
+    """One timed operation in a trace"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "children",
+                 "start", "end", "start_time", "status")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent = parent
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.start_time = time.time()
+        self.status = "ok"
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def self_ms(self) -> float:
+        """Time not covered by any child span: parsing, serialization and other local work"""
+        end = self.end if self.end is not None else time.perf_counter()
+        intervals = sorted(
+            (max(child.start, self.start), min(child.end if child.end is not None else end, end))
+            for child in self.children
+        )
+        covered, cursor = 0.0, self.start
+        for child_start, child_end in intervals:
+            child_start = max(child_start, cursor)
+            if child_end > child_start:
+                covered += child_end - child_start
+                cursor = child_end
+        return max(0.0, (end - self.start) - covered) * 1000
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+_tracer: Optional["Tracer"] = None
+
+def install(tracer: Optional["Tracer"]) -> None:
+    """Make tracer the process-wide tracer; None turns tracing off"""
+    global _tracer
+    _tracer = tracer
+
+def current() -> Optional[Span]:
+    """The innermost open span, or None outside a trace"""
+    return _current.get() if _tracer is not None else None
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a block as a child of the current span, or as a new trace's root span
+
+    Yields the Span, or None when tracing is off, so callers guard attribute updates.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+
+    parent = _current.get()
+    if parent is not None and parent.end is not None:
+        # A background task outliving its trace starts a trace of its own
+        parent = None
+    trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+    current_span = Span(name, trace_id, parent, attributes)
+    if parent is not None:
+        parent.children.append(current_span)
+    token = _current.set(current_span)
+    try:
+        yield current_span
+    except asyncio.CancelledError:
+        current_span.status = "cancelled"
+        raise
+    except BaseException as e:
+        current_span.status = "error"
+        current_span.attributes["error"] = repr(e)[:200]
+        raise
+    finally:
+        current_span.end = time.perf_counter()
+        _current.reset(token)
+        if parent is None:
+            tracer.finish(current_span)
+
+def record(name: str, start: float, end: float, **attributes: Any) -> None:
+    """Add an already finished child span (perf_counter start and end) to the current span"""
+    parent = current()
+    if parent is None:
+        return
+    child = Span(name, parent.trace_id, parent, attributes)
+    child.start_time -= child.start - start
+    child.start, child.end = start, end
+    parent.children.append(child)
+
+class HTTPTimings:
+    """httpx "trace" extension callback that splits one request into pool queue and network phases"""
+
+    def __init__(self, request_span: Span):
+        self.span = request_span
+        self.events: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore names events like "connection.connect_tcp.started" and "http11.send_request_headers.complete"
+        self.events[event_name.split(".", 1)[-1]] = time.perf_counter()
+
+    def _phase(self, name: str) -> Optional[float]:
+        started, completed = self.events.get(f"{name}.started"), self.events.get(f"{name}.complete")
+        if started is None or completed is None:
+            return None
+        return round((completed - started) * 1000, 2)
+
+    def apply(self) -> None:
+        """Set queue, connect, send, server wait and receive times on the request span"""
+        if not self.events:
+            # No transport events (a replayed cassette or a mock transport)
+            return
+        first = min(self.events.values())
+        timings = {
+            "queue_ms": round((first - self.span.start) * 1000, 2),
+            "connect_ms": self._phase("connect_tcp"),
+            "tls_ms": self._phase("start_tls"),
+            "send_ms": self._phase("send_request_headers"),
+            "server_ms": self._phase("receive_response_headers"),
+            "receive_ms": self._phase("receive_response_body"),
+        }
+        self.span.set(**{name: value for name, value in timings.items() if value is not None})
+
+class JSONLExporter:
+    """Appends each sampled trace as one JSON line, rotating the file at max_bytes"""
+
+    def __init__(self, path: str = DEFAULT_TRACE_PATH, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, record: Dict[str, Any]) -> None:
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record, separators=(',', ':'), default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write trace to {self.path}: {e}")
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+class OTLPExporter:
+    """Batches sampled traces and posts them to an OTLP/HTTP collector as JSON"""
+
+    def __init__(self,
+                 endpoint: str,
+                 service_name: str = "mcp-music-server",
+                 flush_interval: float = 5.0,
+                 max_batch: int = 512,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.transport = transport
+        self._spans: List[Dict[str, Any]] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        # Flushes started when a batch fills up, referenced until done so they are not garbage collected
+        self._flushes: Set[asyncio.Task] = set()
+        self.exported = 0
+        self.failed = 0
+
+    @staticmethod
+    def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        converted = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            converted.append({"key": key, "value": typed})
+        return converted
+
+    def export(self, record: Dict[str, Any]) -> None:
+        trace_start_ns = int(record["start_time"] * 1e9)
+        for index, entry in enumerate(record["spans"]):
+            start_ns = trace_start_ns + int(entry["offset_ms"] * 1e6)
+            self._spans.append({
+                "traceId": record["trace_id"],
+                "spanId": entry["span_id"],
+                "parentSpanId": entry.get("parent_id") or "",
+                "name": entry["name"],
+                # SERVER for the root, CLIENT for upstream requests, INTERNAL otherwise
+                "kind": 2 if index == 0 else 3 if entry["name"] == "http.request" else 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(entry["duration_ms"] * 1e6)),
+                "attributes": self._attributes({**entry["attributes"], "self_ms": entry["self_ms"]}),
+                "status": {"code": 2 if entry["status"] == "error" else 0},
+            })
+        if len(self._spans) >= self.max_batch and self._task is not None:
+            flush = asyncio.get_running_loop().create_task(self.flush())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        spans, self._spans = self._spans, []
+        if not spans or self._client is None:
+            self._spans = spans + self._spans
+            return
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]}
+        try:
+            response = await self._client.post(self.endpoint, json=payload)
+            response.raise_for_status()
+            self.exported += len(spans)
+        except httpx.HTTPError as e:
+            self.failed += len(spans)
+            logger.warning(f"OTLP export of {len(spans)} spans to {self.endpoint} failed: {e!r}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=5.0, transport=self.transport)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self._client is not None:
+            await self.flush()
+            await self._client.aclose()
+            self._client = None
+
+class Tracer:
+    """Collects finished traces, keeps the slow or sampled ones and hands them to exporters"""
+
+    def __init__(self,
+                 slow_ms: float = 1000.0,
+                 sample_rate: float = 0.0,
+                 exporters: Optional[List[Any]] = None,
+                 loop_lag_interval: float = 0.05):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.exporters = exporters or []
+        self.loop_lag_interval = loop_lag_interval
+        # (perf_counter at wake-up, lag in seconds), about a minute of history
+        self._lag_samples: Deque[Tuple[float, float]] = deque(maxlen=max(1, int(60 / loop_lag_interval)) if loop_lag_interval > 0 else 1)
+        self._monitor: Optional[asyncio.Task] = None
+        self.traces = 0
+        self.kept = 0
+        self.slowest_ms = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["Tracer"]:
+        """Build a tracer from TRACE_* environment variables, or None unless TRACING is on"""
+        if os.getenv('TRACING', 'false').lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        exporters: List[Any] = [JSONLExporter(
+            path=os.path.expanduser(os.getenv('TRACE_PATH', DEFAULT_TRACE_PATH)),
+            max_bytes=int(os.getenv('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024))
+        )]
+        endpoint = os.getenv('TRACE_OTLP_ENDPOINT') or os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT')
+        if not endpoint and os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT'):
+            endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT').rstrip('/') + '/v1/traces'
+        if endpoint:
+            exporters.append(OTLPExporter(endpoint, service_name=os.getenv('OTEL_SERVICE_NAME', 'mcp-music-server')))
+        return cls(
+            slow_ms=float(os.getenv('TRACE_SLOW_MS', 1000)),
+            sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', 0.0)),
+            exporters=exporters,
+            loop_lag_interval=float(os.getenv('TRACE_LOOP_LAG_INTERVAL', 0.05))
+        )
+
+    async def start(self) -> None:
+        """Start the loop lag monitor and exporters; call from inside the running event loop"""
+        if self._monitor is None and self.loop_lag_interval > 0:
+            self._monitor = asyncio.create_task(self._watch_loop())
+        for exporter in self.exporters:
+            await exporter.start()
+
+    async def close(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for exporter in self.exporters:
+            await exporter.close()
+
+    async def _watch_loop(self) -> None:
+        """Sleep for a fixed interval and record how late each wake-up was"""
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.loop_lag_interval)
+            now = time.perf_counter()
+            self._lag_samples.append((now, max(0.0, now - before - self.loop_lag_interval)))
+
+    def _loop_lag_ms(self, start: float, end: float) -> Optional[float]:
+        """Worst event loop lag seen while a span was open"""
+        if self._monitor is None:
+            return None
+        lags = [lag for woke, lag in self._lag_samples if start <= woke <= end + self.loop_lag_interval]
+        return round(max(lags) * 1000, 2) if lags else 0.0
+
+    def finish(self, root: Span) -> None:
+        self.traces += 1
+        duration_ms = root.duration_ms
+        self.slowest_ms = max(self.slowest_ms, duration_ms)
+        slow = duration_ms >= self.slow_ms
+        if not self.exporters or not (slow or random.random() < self.sample_rate):
+            return
+        self.kept += 1
+        record = self.to_record(root, "slow" if slow else "sampled")
+        for exporter in self.exporters:
+            exporter.export(record)
+
+    def to_record(self, root: Span, reason: str) -> Dict[str, Any]:
+        """A trace as a flat, depth-first list of spans with offsets from the root's start"""
+        spans = []
+        for current_span in root.walk():
+            entry = {
+                "span_id": current_span.span_id,
+                "parent_id": current_span.parent.span_id if current_span.parent is not None else None,
+                "name": current_span.name,
+                "offset_ms": round((current_span.start - root.start) * 1000, 2),
+                "duration_ms": round(current_span.duration_ms, 2),
+                "self_ms": round(current_span.self_ms(), 2),
+                "status": current_span.status,
+                "attributes": current_span.attributes,
+            }
+            if current_span.duration_ms >= LOOP_LAG_MIN_MS:
+                lag = self._loop_lag_ms(current_span.start, current_span.end)
+                if lag is not None:
+                    entry["loop_lag_max_ms"] = lag
+            spans.append(entry)
+        return {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "reason": reason,
+            "start_time": round(root.start_time, 6),
+            "duration_ms": round(root.duration_ms, 2),
+            "spans": spans,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": self.traces,
+            "kept": self.kept,
+            "slow_ms": self.slow_ms,
+            "sample_rate": self.sample_rate,
+            "slowest_ms": round(self.slowest_ms, 1),
+            "exporters": [type(exporter).__name__ for exporter in self.exporters],
+        }
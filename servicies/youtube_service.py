@@ -4,107 +4,223 @@ This module provides the YouTubeService class for interacting with the YouTube D
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from googleapiclient.discovery import build
+import httpx
+
+from . import fields
+from .cache import ResponseCache, cached
+from .errors import QuotaExhaustedError, ServiceUnavailableError
+from .http_client import BaseHTTPService, HTTPClientConfig
+from .local_index import LocalIndex, indexed
+from .rate_limit import YOUTUBE_DAILY_QUOTA, YOUTUBE_QUOTA_COSTS, QuotaTracker, TokenBucket
+from .resilience import CircuitBreaker, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
-class YouTubeService:
+# Fields from videos.list merged into search results when include_details is set
+DETAIL_FIELDS = ("duration", "view_count", "like_count")
+
+# videos.list accepts up to 50 comma-separated IDs for the same 1-unit cost
+VIDEOS_PER_REQUEST = 50
+
+# search.list result kinds and the largest maxResults it accepts
+SEARCH_TYPES = {"videos": "video", "playlists": "playlist"}
+SEARCH_PAGE_SIZE = 50
+
+# Parsed result fields and how to extract each from the Data API resource
+SNIPPET_FIELDS = {
+    "title": lambda item: item['snippet']['title'],
+    "channel": lambda item: item['snippet']['channelTitle'],
+    "description": lambda item: item['snippet']['description'],
+    "published_at": lambda item: item['snippet']['publishedAt'],
+    "thumbnail": lambda item: item['snippet']['thumbnails']['high']['url'],
+}
+SEARCH_FIELDS = {
+    "videos": {
+        "id": lambda item: item['id']['videoId'],
+        **SNIPPET_FIELDS,
+        "youtube_url": lambda item: f"https://www.youtube.com/watch?v={item['id']['videoId']}",
+    },
+    "playlists": {
+        "id": lambda item: item['id']['playlistId'],
+        **SNIPPET_FIELDS,
+        "youtube_url": lambda item: f"https://www.youtube.com/playlist?list={item['id']['playlistId']}",
+    },
+}
+VIDEO_DETAIL_FIELDS = {
+    "id": lambda item: item['id'],
+    "title": lambda item: item['snippet']['title'],
+    "channel": lambda item: item['snippet']['channelTitle'],
+    "description": lambda item: item['snippet']['description'],
+    "duration": lambda item: item['contentDetails']['duration'],
+    "view_count": lambda item: item['statistics'].get('viewCount', 0),
+    "like_count": lambda item: item['statistics'].get('likeCount', 0),
+    "published_at": lambda item: item['snippet']['publishedAt'],
+    "youtube_url": lambda item: f"https://www.youtube.com/watch?v={item['id']}",
+}
+
+class YouTubeService(BaseHTTPService):
     """Service for interacting with YouTube data API"""
 
-    def __init__(self, api_key: str):
+    cache_namespace = "youtube"
+
+    def __init__(self,
+                 api_key: str,
+                 http_config: Optional[HTTPClientConfig] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 quota: Optional[QuotaTracker] = None,
+                 index: Optional[LocalIndex] = None):
+        super().__init__(http_config, transport, cache, rate_limiter, retry_policy, circuit_breaker, index)
         self.api_key = api_key
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
+        self.base_url = "https://www.googleapis.com/youtube/v3"
+        self.quota = quota or QuotaTracker("youtube", YOUTUBE_DAILY_QUOTA, YOUTUBE_QUOTA_COSTS)
 
-    async def search_music_videos(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
-        """Search for music videos on YouTube"""
-        try:
-            request = self.youtube.search().list(
-                part='snippet',
-                q=query,
-                type='video',
-                videoCategoryId='10',
-                maxResults=max_results,
-                order='relevance'
+    async def _api_get(self, resource: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET a YouTube Data API v3 resource such as 'search' or 'videos'"""
+        response = await self._get(
+            f"{self.base_url}/{resource}",
+            params={**params, 'key': self.api_key},
+            endpoint=resource
+        )
+
+        if response.status_code == 403 and 'quotaExceeded' in response.text:
+            self.quota.mark_exhausted()
+            raise QuotaExhaustedError(
+                "youtube", "youtube daily quota exhausted", retry_after=self.quota.seconds_until_reset()
             )
-            response = request.execute()
-            videos = []
-
-            for item in response['items']:
-                video = {
-                    "id": item['id']['videoId'],
-                    "title": item['snippet']['title'],
-                    "channel": item['snippet']['channelTitle'],
-                    "description": item['snippet']['description'],
-                    "published_at": item['snippet']['publishedAt'],
-                    "thumbnail": item['snippet']['thumbnails']['high']['url'],
-                    "youtube_url": f"https://www.youtube.com/watch?v={item['id']['videoId']}"
-                }
-                videos.append(video)
-            
+
+        response.raise_for_status()
+        return response.json()
+
+    # Page tokens are opaque and case-sensitive; only the query is case-folded
+    @cached("search", case_sensitive=("page_token",))
+    @indexed()
+    async def _search_page(self,
+                           query: str,
+                           kind: str,
+                           page_size: int = 10,
+                           page_token: Optional[str] = None) -> Dict[str, Any]:
+        """One page of search results as {kind: [...], "next_page_token": ...}, or {} on error"""
+        try:
+            params = {
+                'part': 'snippet',
+                'q': query,
+                'type': SEARCH_TYPES[kind],
+                'maxResults': page_size,
+                'order': 'relevance'
+            }
+            if kind == "videos":
+                params['videoCategoryId'] = '10'
+            if page_token:
+                params['pageToken'] = page_token
+            response = await self._api_get('search', params)
+
+            extractors = SEARCH_FIELDS[kind]
+            items = [fields.build(extractors, item) for item in response['items']]
+            return {kind: items, "next_page_token": response.get('nextPageToken')}
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching YouTube {kind}: {e}")
+            return {}
+
+    async def _add_details(self, videos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge duration and counts from one batched videos.list call into search results
+
+        The videos must carry their IDs; build them under fields.including("id").
+        """
+        if not videos:
             return videos
+        with fields.including("id"):
+            details = {detail["id"]: detail for detail in await self.get_videos_details([v["id"] for v in videos])}
+        return [
+            {**video, **{field: details[video["id"]][field] for field in DETAIL_FIELDS if field in details[video["id"]]}}
+            if video["id"] in details else video
+            for video in videos
+        ]
+
+    async def search_music_videos(self,
+                                  query: str,
+                                  max_results: int = 10,
+                                  include_details: bool = False) -> List[Dict[str, Any]]:
+        """Search for music videos on YouTube, optionally adding duration and counts in one extra call"""
+        if not include_details:
+            page = await self._search_page(query, "videos", max_results)
+            return page.get("videos", [])
+
+        # Details are merged by video ID, so it is built even when the projection leaves it out
+        with fields.including("id"):
+            page = await self._search_page(query, "videos", max_results)
+        videos = page.get("videos", [])
+        try:
+            videos = await self._add_details(videos)
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error searching YouTube music videos: {e}")
-            return []
-        
+            logger.error(f"Error adding YouTube video details: {e}")
+        return fields.project_all(videos)
+
     async def search_music_playlists(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """Search for music playlists on YouTube."""
-        try:
-            request = self.youtube.search().list(
-                part='snippet',
-                q=query,
-                type='playlist',
-                maxResults=max_results,
-                order='relevance'
-            )
-            
-            response = request.execute()
-            playlists = []
-            
-            for item in response['items']:
-                playlist = {
-                    "id": item['id']['playlistId'],
-                    "title": item['snippet']['title'],
-                    "channel": item['snippet']['channelTitle'],
-                    "description": item['snippet']['description'],
-                    "published_at": item['snippet']['publishedAt'],
-                    "thumbnail": item['snippet']['thumbnails']['high']['url'],
-                    "youtube_url": f"https://www.youtube.com/playlist?list={item['id']['playlistId']}"
-                }
-                playlists.append(playlist)
-            
-            return playlists
-        except Exception as e:
-            logger.error(f"Error searching YouTube playlists: {e}")
-            return []
-        
+        page = await self._search_page(query, "playlists", max_results)
+        return page.get("playlists", [])
+
+    async def iter_search(self,
+                          query: str,
+                          kind: str = "videos",
+                          max_results: int = 200,
+                          page_size: int = SEARCH_PAGE_SIZE,
+                          include_details: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream up to max_results videos or playlists, following nextPageToken page by page
+
+        Each page needs the previous page's token, so pages are fetched one at a time,
+        and each costs 100 quota units; stop iterating to avoid fetching the rest.
+        """
+        if kind not in SEARCH_TYPES:
+            raise ValueError(f"Unknown YouTube search kind: {kind}")
+        include_details = include_details and kind == "videos"
+        page_token = None
+        yielded = 0
+        while yielded < max_results:
+            if include_details:
+                with fields.including("id"):
+                    page = await self._search_page(query, kind, min(page_size, SEARCH_PAGE_SIZE), page_token)
+            else:
+                page = await self._search_page(query, kind, min(page_size, SEARCH_PAGE_SIZE), page_token)
+            items = page.get(kind, [])[:max_results - yielded]
+            if include_details:
+                items = fields.project_all(await self._add_details(items))
+            for item in items:
+                yield item
+            yielded += len(items)
+            page_token = page.get("next_page_token")
+            if not items or not page_token:
+                return
+
     async def get_video_details(self, video_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about a YouTube video."""
-        try:
-            request = self.youtube.videos().list(
-                part='snippet,statistics,contentDetails',
-                id=video_id
-            )
-            
-            response = request.execute()
-            
-            if response['items']:
-                item = response['items'][0]
-                video = {
-                    "id": item['id'],
-                    "title": item['snippet']['title'],
-                    "channel": item['snippet']['channelTitle'],
-                    "description": item['snippet']['description'],
-                    "duration": item['contentDetails']['duration'],
-                    "view_count": item['statistics']['viewCount'],
-                    "like_count": item['statistics'].get('likeCount', 0),
-                    "published_at": item['snippet']['publishedAt'],
-                    "youtube_url": f"https://www.youtube.com/watch?v={item['id']}"
-                }
-                return video
-            
-            return None
-        except Exception as e:
-            logger.error(f"Error getting YouTube video details: {e}")
-            return None 
\ No newline at end of file
+        videos = await self.get_videos_details([video_id])
+        return videos[0] if videos else None
+
+    @indexed("videos")
+    async def get_videos_details(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get details for many YouTube videos, in input order
+
+        Cached videos are served per ID; the rest are fetched in chunks of 50
+        concurrently, one videos.list call (1 quota unit) per chunk.
+        """
+        return await self._lookup_by_ids("video", video_ids, VIDEOS_PER_REQUEST, self._fetch_videos_details)
+
+    async def _fetch_videos_details(self, video_ids: List[str]) -> List[Dict[str, Any]]:
+        """One videos.list call for up to 50 IDs"""
+        response = await self._api_get('videos', {
+            'part': 'snippet,statistics,contentDetails',
+            'id': ','.join(video_ids)
+        })
+
+        return [fields.build(VIDEO_DETAIL_FIELDS, item) for item in response['items']]
@@ -0,0 +1,104 @@
+"""
+Tests for batch search: query dedup, the shared concurrency limit and NDJSON streaming
+"""
+
+import asyncio
+import json
+from contextlib import aclosing
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from mcp_server_class import MCPServer
+from web_responses import NDJSONResponse
+
+class StubOrchestrator:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+        self.running = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def search_all_platforms(self, query, limit=5, platforms=None, types=None, merge=False):
+        self.queries.append(query)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0 if query == "fast" else self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+        return {"status": "success", "query": query}
+
+def make_server(orchestrator, concurrency=8, max_queries=500):
+    """An MCPServer with only the batch search state, without upstream services or caches"""
+    server = MCPServer.__new__(MCPServer)
+    server.orchestrator = orchestrator
+    server.batch_semaphore = asyncio.Semaphore(concurrency)
+    server.batch_max_queries = max_queries
+    return server
+
+@pytest.mark.asyncio
+async def test_queries_differing_in_case_or_spacing_are_searched_once():
+    orchestrator = StubOrchestrator()
+    server = make_server(orchestrator)
+    response = await server.search_batch(["Song", " song  ", "Other", "Song", ""])
+
+    assert sorted(orchestrator.queries) == ["Other", "Song"]
+    results = response["results"]
+    assert list(results) == ["Song", " song  ", "Other", ""]
+    assert results["Song"] is results[" song  "]
+    assert results["Other"]["query"] == "Other"
+    assert results[""] == {"status": "error", "message": "Empty query"}
+    assert response["queries"] == 5
+    assert response["distinct"] == 3
+
+@pytest.mark.asyncio
+async def test_batches_share_the_concurrency_limit():
+    orchestrator = StubOrchestrator(delay=0.01)
+    server = make_server(orchestrator, concurrency=3)
+    await asyncio.gather(
+        server.search_batch([f"first {i}" for i in range(6)]),
+        server.search_batch([f"second {i}" for i in range(6)]),
+    )
+    assert len(orchestrator.queries) == 12
+    assert orchestrator.peak == 3
+
+@pytest.mark.asyncio
+async def test_stopping_early_cancels_pending_searches():
+    orchestrator = StubOrchestrator(delay=10)
+    server = make_server(orchestrator, concurrency=3)
+    async with aclosing(server.search_batch_results(["fast", "a", "b", "c"])) as batch:
+        async for group, result in batch:
+            assert group == ["fast"]
+            break
+    await asyncio.sleep(0)
+    assert orchestrator.cancelled == 3
+    assert orchestrator.running == 0
+
+@pytest.mark.asyncio
+async def test_oversized_batches_are_rejected():
+    server = make_server(StubOrchestrator(), max_queries=2)
+    assert await server.search_batch(["a", "b", "c"]) == {"error": "At most 2 queries per batch, got 3"}
+    assert make_server(None).batch_error(["a"]) == "Music orchestrator not available"
+
+def test_ndjson_streams_one_compact_object_per_line():
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            yield {"query": "Déjà Vu", "results": {"status": "success"}}
+            yield {"done": True, "queries": 1}
+        return NDJSONResponse(lines())
+
+    response = TestClient(app).get("/stream")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.content.endswith(b"\n")
+    lines = response.content.decode().splitlines()
+    assert lines[0] == '{"query":"Déjà Vu","results":{"status":"success"}}'
+    assert [json.loads(line) for line in lines][-1] == {"done": True, "queries": 1}
@@ -0,0 +1,77 @@
+"""
+Tests for the in-memory ResponseCache
+"""
+
+import time
+
+import pytest
+
+from servicies.cache import ResponseCache, estimate_size
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    cache = ResponseCache()
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set(("spotify", "a"), ["value"], ttl=10)
+    assert cache.get(("spotify", "a")) == (True, ["value"])
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(("spotify", "a")) == (False, None)
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.set(("a",), [1], ttl=60)
+    cache.set(("b",), [2], ttl=60)
+    cache.get(("a",))
+    cache.set(("c",), [3], ttl=60)
+
+    assert cache.get(("a",))[0]
+    assert not cache.get(("b",))[0]
+    assert cache.get(("c",))[0]
+    assert cache.stats()["evictions"] == 1
+
+def test_byte_cap_evicts_and_skips_oversized_values():
+    value = ["x" * 100]
+    size = estimate_size(value)
+    cache = ResponseCache(max_bytes=size * 2)
+    for name in ("a", "b", "c"):
+        cache.set((name,), value, ttl=60)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] == size * 2
+    assert not cache.get(("a",))[0]
+
+    cache.set(("huge",), ["x" * 1000], ttl=60)
+    assert not cache.get(("huge",))[0]
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+def test_keys_normalize_whitespace_and_case_but_not_ids():
+    first = ResponseCache.make_key("spotify", "search_tracks", {"query": "Hey  Jude "})
+    second = ResponseCache.make_key("spotify", "search_tracks", {"query": "hey jude"})
+    assert first == second
+    assert (ResponseCache.make_key("spotify", "get_tracks", {"id": "AbC"}, fold_case=False)
+            != ResponseCache.make_key("spotify", "get_tracks", {"id": "abc"}, fold_case=False))
+
+@pytest.mark.asyncio
+async def test_get_or_load_caches_non_empty_results_only():
+    cache = ResponseCache()
+    calls = 0
+
+    async def load_empty():
+        nonlocal calls
+        calls += 1
+        return []
+
+    for _ in range(2):
+        assert await cache.get_or_load(("empty",), "search", load_empty) == []
+    assert calls == 2
+
+    async def load_found():
+        nonlocal calls
+        calls += 1
+        return ["found"]
+
+    for _ in range(2):
+        assert await cache.get_or_load(("found",), "search", load_found) == ["found"]
+    assert calls == 3
@@ -0,0 +1,65 @@
+"""
+Tests for HTTP cassette recording and replay
+"""
+
+import gzip
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+from servicies.cassette import Cassette
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def record(path: str, count: int) -> Cassette:
+    cassette = Cassette(path, mode="record")
+    inner = httpx.MockTransport(lambda request: httpx.Response(200, json={"q": request.url.params["q"]}))
+    async with httpx.AsyncClient(transport=cassette.transport(inner)) as client:
+        for i in range(count):
+            await client.get("https://api.example.com/search", params={"q": str(i), "key": "secret"})
+    cassette.close()
+    return cassette
+
+@pytest.mark.asyncio
+async def test_recordings_replay_without_secrets(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    await record(path, 3)
+    with gzip.open(path, "rt") as archive:
+        assert "secret" not in archive.read()
+
+    cassette = Cassette(path, mode="replay", time_scale=0)
+    async with httpx.AsyncClient(transport=cassette.transport()) as client:
+        response = await client.get("https://api.example.com/search", params={"q": "1", "key": "other"})
+        assert response.json() == {"q": "1"}
+        missing = await client.get("https://api.example.com/search", params={"q": "404"})
+        assert missing.status_code == 404
+
+def test_recordings_survive_a_killed_process(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    script = (
+        "import asyncio, os, sys\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        "from tests.test_cassette import record\n"
+        "from servicies.cassette import Cassette\n"
+        "Cassette.close = lambda self: None\n"
+        # Keep the cassette referenced so nothing is flushed on garbage collection
+        f"cassette = asyncio.run(record({path!r}, 50))\n"
+        "os._exit(0)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=ROOT)
+    assert Cassette(path, mode="replay").stats()["recordings"] == 50
+
+def test_truncated_cassette_loads_what_it_can(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    with open(path, "wb") as archive:
+        for i in range(3):
+            archive.write(gzip.compress(f'{{"method":"GET","url":"https://api.example.com/x?q={i}",'
+                                        f'"status":200,"headers":{{}},"elapsed_ms":1,"body":"{{}}"}}\n'.encode()))
+        archive.write(gzip.compress(b"not json\n"))
+        archive.write(gzip.compress(b'{"method":"GET","url":"https://api.example.com/x?q=9"}\n')[:-10])
+
+    cassette = Cassette(path, mode="replay")
+    assert cassette.stats()["recordings"] == 3
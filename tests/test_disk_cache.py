@@ -0,0 +1,112 @@
+"""
+Tests for the persistent DiskCache tier
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from servicies.cache import ResponseCache
+from servicies.disk_cache import DiskCache
+
+def test_size_cap_counts_entries_written_by_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = DiskCache(path, max_bytes=10_000)
+    second = DiskCache(path, max_bytes=10_000)
+    try:
+        for i in range(6):
+            first.set(("spotify", "first", i), "x" * 1000, 60)
+            second.set(("spotify", "second", i), "x" * 1000, 60)
+        # Each process alone stays under the cap; together they would be at 12 000 bytes
+        assert first.size_bytes() <= 10_000
+        assert first.stats()["bytes"] == second.stats()["bytes"]
+        assert second.get(("spotify", "second", 5)) is not None
+    finally:
+        first.close()
+        second.close()
+
+@pytest.mark.asyncio
+async def test_disk_reads_and_writes_run_off_the_event_loop(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"))
+    loop_thread = threading.get_ident()
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(disk, name)
+
+        def traced(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        setattr(disk, name, traced)
+
+    cache = ResponseCache(disk=disk)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        return ["result"]
+
+    key = cache.make_key("spotify", "search_tracks", {"query": "hey jude"})
+    assert await cache.get_or_load(key, "search", load) == ["result"]
+    await cache.close()
+    assert threads and loop_thread not in threads
+
+    # The write finished before close, so a new process finds the entry
+    reopened = ResponseCache(disk=DiskCache(str(tmp_path / "cache.sqlite3")))
+    try:
+        assert await reopened.get_or_load(key, "search", load) == ["result"]
+        assert calls == 1
+    finally:
+        await reopened.close()
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_it_refreshes(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), stale_ttl=3600)
+    key = ("spotify", "search_tracks", ("query", "hey jude"))
+    disk.set(key, ["old"], ttl=-1)
+    cache = ResponseCache(disk=disk)
+    refreshed = asyncio.Event()
+
+    async def load():
+        refreshed.set()
+        return ["new"]
+
+    try:
+        assert await cache.get_or_load(key, "search", load) == ["old"]
+        await asyncio.wait_for(refreshed.wait(), 5)
+        await asyncio.sleep(0)
+        assert await cache.get_or_load(key, "search", load) == ["new"]
+        assert cache.stats()["stale_hits"] == 1
+        assert cache.stats()["refreshes"] == 1
+    finally:
+        await cache.close()
+
+@pytest.mark.asyncio
+async def test_empty_refresh_keeps_the_stale_entry(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), stale_ttl=3600)
+    key = ("spotify", "search_tracks", ("query", "hey jude"))
+    disk.set(key, ["old"], ttl=-1)
+    cache = ResponseCache(disk=disk)
+
+    async def load_empty():
+        return []
+
+    try:
+        assert await cache.get_or_load(key, "search", load_empty) == ["old"]
+        await asyncio.gather(*cache._refresh_tasks)
+        value, expires_in = disk.get(key)
+        assert value == ["old"] and expires_in < 0
+        assert cache.stats()["refreshes"] == 1
+    finally:
+        await cache.close()
+
+def test_entries_past_the_stale_window_are_dropped(tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), stale_ttl=10)
+    try:
+        disk.set(("spotify", "a"), ["old"], ttl=-60)
+        assert disk.get(("spotify", "a")) is None
+        assert disk.stats()["entries"] == 0
+    finally:
+        disk.close()
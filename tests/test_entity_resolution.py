@@ -0,0 +1,69 @@
+"""
+Tests for cross-platform entity resolution
+"""
+
+import time
+
+import pytest
+
+from entity_resolution import _artists_match, clean_artist, clean_title, resolve_works
+
+def artists_match(left: str, right: str) -> bool:
+    left, right = clean_artist(left), clean_artist(right)
+    return _artists_match(left, right, frozenset(left.split()), frozenset(right.split()))
+
+@pytest.mark.parametrize("left, right", [
+    ("John Lennon", "John Legend"),
+    ("Michael Jackson", "Janet Jackson"),
+    ("Taylor Swift", "Taylor Dayne"),
+    ("Johnny Cash", "Johnny Marr"),
+    ("Kendrick Lamar", "Kendrick Scott"),
+])
+def test_artists_sharing_a_name_do_not_match(left, right):
+    assert not artists_match(left, right)
+
+@pytest.mark.parametrize("left, right", [
+    ("The Beatles", "Beatles"),
+    ("Queen", "Queen Official"),
+    ("Beyoncé", "Beyonce"),
+    ("AdeleVEVO", "Adele"),
+    ("Jon Lennon", "John Lennon"),
+])
+def test_artist_variants_match(left, right):
+    assert artists_match(left, right)
+
+def test_same_song_across_platforms_is_one_work():
+    works = resolve_works({
+        "spotify": {"tracks": [{"id": "s1", "name": "Hey Jude - Remastered 2015", "artist": "The Beatles"}]},
+        "lastfm": {"tracks": [{"name": "Hey Jude", "artist": "Beatles", "url": "https://last.fm/hey-jude"}]},
+        "youtube": {"videos": [{"id": "y1", "title": "The Beatles - Hey Jude (Official Video)", "channel": "TheBeatlesVEVO"}]},
+    })
+    assert len(works) == 1
+    assert works[0]["platforms"] == ["spotify", "lastfm", "youtube"]
+    assert works[0]["artist"] == "The Beatles"
+
+def test_same_title_by_different_artists_stays_apart():
+    artists = ["John Lennon", "John Legend", "Michael Jackson", "Janet Jackson", "Taylor Swift",
+               "Taylor Dayne", "Johnny Cash", "Johnny Marr", "Kendrick Lamar", "Kendrick Scott"]
+    works = resolve_works({"spotify": {"tracks": [
+        {"id": str(i), "name": "Love", "artist": artist} for i, artist in enumerate(artists)
+    ]}})
+    assert len(works) == len(artists)
+
+def test_many_artists_sharing_a_title_do_not_chain():
+    tracks = [{"id": str(i), "name": "Love", "artist": f"Artist {i}"} for i in range(150)]
+    works = resolve_works({"spotify": {"tracks": tracks}})
+    assert len(works) == 150
+
+def test_thousands_of_same_title_candidates_resolve_quickly():
+    tracks = [{"id": str(i), "name": "Love", "artist": f"Bench Artist {i % 977}"} for i in range(3000)]
+    start = time.perf_counter()
+    works = resolve_works({"spotify": {"tracks": tracks}, "lastfm": {"tracks": tracks}})
+    assert time.perf_counter() - start < 1.0
+    assert len(works) == 977
+
+def test_index_and_resolution_normalize_titles_the_same_way():
+    from servicies.local_index import _document_fields
+
+    title = "Déjà_Vu (Live)!"
+    assert _document_fields({"id": "x", "name": title})["text"] == clean_title(title) == "deja vu live"
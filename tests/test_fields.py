@@ -0,0 +1,56 @@
+"""
+Tests for field projection and response profiles
+"""
+
+import asyncio
+
+import pytest
+
+from servicies import fields
+
+EXTRACTORS = {
+    "id": lambda item: item["id"],
+    "name": lambda item: item["name"],
+    "popularity": lambda item: item["stats"]["popularity"],
+}
+
+def test_resolve_profiles_and_fields():
+    assert fields.resolve() is None
+    assert fields.resolve(profile="full") is None
+    assert fields.resolve(profile="minimal") == fields.PROFILES["minimal"]
+    # Explicit fields win over a profile
+    assert fields.resolve([" name ", "", "id"], profile="minimal") == frozenset({"name", "id"})
+    with pytest.raises(ValueError, match="Unknown profile: tiny"):
+        fields.resolve(profile="tiny")
+
+def test_build_only_calls_projected_extractors():
+    item = {"id": "1", "name": "Song"}  # popularity would raise KeyError if extracted
+    with fields.projected(frozenset({"id", "name"})):
+        assert fields.build(EXTRACTORS, item) == {"id": "1", "name": "Song"}
+    with pytest.raises(KeyError):
+        fields.build(EXTRACTORS, item)
+
+def test_project_keeps_error_and_index_metadata():
+    item = {"id": "1", "name": "Song", "album": "Album", "platform": "spotify", "score": 0.9}
+    assert fields.project(item, frozenset({"name"})) == {"name": "Song", "platform": "spotify", "score": 0.9}
+    error = {"error": "down", "service": "spotify", "reason": "circuit_open"}
+    assert fields.project_all([error], frozenset({"name"})) == [error]
+    assert fields.project_all([item]) == [item]
+
+def test_including_widens_only_an_active_projection():
+    with fields.projected(frozenset({"name"})):
+        with fields.including("id"):
+            assert fields.current() == frozenset({"name", "id"})
+        assert fields.current() == frozenset({"name"})
+    with fields.including("id"):
+        assert fields.current() is None
+
+@pytest.mark.asyncio
+async def test_tasks_started_in_a_projection_inherit_it():
+    async def projection():
+        return fields.current()
+
+    with fields.projected(frozenset({"name"})):
+        task = asyncio.create_task(projection())
+    assert await task == frozenset({"name"})
+    assert fields.current() is None
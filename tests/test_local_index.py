@@ -0,0 +1,86 @@
+"""
+Tests for LocalIndex loading
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from servicies.local_index import LocalIndex
+
+def track(track_id: str, name: str, artist: str) -> dict:
+    return {"id": track_id, "name": name, "artist": artist, "album": "Album"}
+
+@pytest.mark.asyncio
+async def test_search_and_add_do_not_block_while_preloading(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    seed = LocalIndex(path=path)
+    seed.add("spotify", "tracks", [track("1", "Hey Jude", "The Beatles")])
+    seed.close()
+
+    index = LocalIndex(path=path)
+    release = threading.Event()
+    load = index.load
+
+    def slow_load() -> None:
+        release.wait(5)
+        load()
+
+    index.load = slow_load
+    try:
+        preload = asyncio.create_task(index.preload())
+        await asyncio.sleep(0)
+
+        # Neither call may wait for the worker thread still holding the load
+        assert index.search("hey jude") == []
+        index.add("spotify", "tracks", [track("2", "Let It Be", "The Beatles")])
+        assert index.stats()["loaded"] is False
+
+        release.set()
+        await asyncio.wait_for(preload, 5)
+        assert [result["id"] for result in index.search("hey jude")] == ["1"]
+        assert [result["id"] for result in index.search("let it be")] == ["2"]
+    finally:
+        release.set()
+        index.close()
+
+def test_search_loads_without_preload(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    seed = LocalIndex(path=path)
+    seed.add("spotify", "tracks", [track("1", "Hey Jude", "The Beatles")])
+    seed.close()
+
+    index = LocalIndex(path=path)
+    try:
+        assert [result["id"] for result in index.search("hey jude")] == ["1"]
+    finally:
+        index.close()
+
+@pytest.mark.asyncio
+async def test_add_writes_in_a_worker_thread(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    index = LocalIndex(path=path)
+    loop_thread = threading.get_ident()
+    threads = []
+    write = index._write
+
+    def traced(batches):
+        threads.append(threading.get_ident())
+        write(batches)
+
+    index._write = traced
+    try:
+        index.add("spotify", "tracks", [track("1", "Hey Jude", "The Beatles")])
+        # Searchable at once, persisted in the background
+        assert [result["id"] for result in index.search("hey jude")] == ["1"]
+        await index.flush()
+        assert threads and loop_thread not in threads
+    finally:
+        index.close()
+
+    reopened = LocalIndex(path=path)
+    try:
+        assert [result["id"] for result in reopened.search("hey jude")] == ["1"]
+    finally:
+        reopened.close()
@@ -0,0 +1,69 @@
+"""
+Tests for the metrics registry and its Prometheus text exposition
+"""
+
+import pytest
+
+from servicies.metrics import MetricsRegistry
+
+def _samples(text):
+    """Non-comment exposition lines as {series: value}"""
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    calls = registry.counter("tool_calls_total", "Tool calls", ("tool", "outcome"))
+    in_flight = registry.gauge("in_flight", "In flight")
+    calls.labels("search", "ok").inc()
+    calls.labels("search", "ok").inc(2)
+    calls.labels('say "hi"\n', "error").inc(0.5)
+    in_flight.inc(3)
+    in_flight.dec()
+
+    text = registry.render()
+    assert text.endswith("\n")
+    assert "# HELP tool_calls_total Tool calls\n# TYPE tool_calls_total counter\n" in text
+    assert "# TYPE in_flight gauge\n" in text
+    samples = _samples(text)
+    assert samples['tool_calls_total{tool="search",outcome="ok"}'] == "3"
+    assert samples['tool_calls_total{tool="say \\"hi\\"\\n",outcome="error"}'] == "0.5"
+    assert samples["in_flight"] == "2"
+    assert "process_start_time_seconds" in samples
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("/search").observe(value)
+
+    samples = _samples(registry.render())
+    assert samples['latency_seconds_bucket{route="/search",le="0.1"}'] == "2"
+    assert samples['latency_seconds_bucket{route="/search",le="1"}'] == "3"
+    assert samples['latency_seconds_bucket{route="/search",le="+Inf"}'] == "4"
+    assert samples['latency_seconds_sum{route="/search"}'] == "3.65"
+    assert samples['latency_seconds_count{route="/search"}'] == "4"
+
+def test_histogram_quantile_interpolates_within_bucket():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(1.0, 2.0))
+    child = latency.labels()
+    assert child.quantile(0.5) is None
+    for value in (0.5, 1.5, 1.5, 1.5):
+        latency.observe(value)
+    assert child.quantile(0.5) == pytest.approx(1.0 + 1.0 / 3)
+
+def test_collectors_render_at_scrape_time():
+    registry = MetricsRegistry()
+    entries = [1]
+    registry.set_collector("cache", lambda: [("cache_entries", "gauge", "Cache entries", [({"tier": "memory"}, len(entries))])])
+    assert _samples(registry.render())['cache_entries{tier="memory"}'] == "1"
+    entries.append(2)
+    assert _samples(registry.render())['cache_entries{tier="memory"}'] == "2"
+
+def test_label_count_and_duplicate_names_are_rejected():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("tool",))
+    with pytest.raises(ValueError, match="takes labels"):
+        calls.labels("search", "extra")
+    with pytest.raises(ValueError, match="already registered"):
+        registry.counter("calls_total", "Calls again")
@@ -0,0 +1,73 @@
+"""
+Tests for MusicDiscoveryOrchestrator.search_all_platforms
+"""
+
+import gc
+import warnings
+
+import pytest
+
+from orchestrator import MusicDiscoveryOrchestrator
+
+class StubSpotify:
+    def __init__(self):
+        self.calls = []
+
+    async def search_multi(self, query, limit=10, types=None):
+        self.calls.append(types)
+        return {kind: [{"id": f"{kind}-1", "name": query, "artist": "Artist"}] for kind in types}
+
+class StubYouTube:
+    async def search_music_videos(self, query, max_results=10):
+        return [{"id": "video-1", "title": query, "channel": "Channel"}]
+
+    async def search_music_playlists(self, query, max_results=10):
+        return []
+
+class StubLastfm:
+    async def search_tracks(self, query, limit=10):
+        return [{"name": query, "artist": "Artist", "url": "https://www.last.fm/music/artist/_/song"}]
+
+    async def search_artists(self, query, limit=10):
+        return []
+
+    async def search_albums(self, query, limit=10):
+        return []
+
+class BrokenIndex:
+    def search(self, *args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+@pytest.mark.asyncio
+async def test_failing_local_search_leaves_no_unawaited_coroutines():
+    orchestrator = MusicDiscoveryOrchestrator(StubSpotify(), StubYouTube(), StubLastfm(), local_index=BrokenIndex())
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        response = await orchestrator.search_all_platforms("song", local_first=True)
+        gc.collect()
+    assert response == {"status": "error", "message": "index unavailable"}
+    assert not [warning for warning in caught if "never awaited" in str(warning.message)]
+
+@pytest.mark.asyncio
+async def test_unknown_platforms_and_types_are_rejected():
+    orchestrator = MusicDiscoveryOrchestrator(StubSpotify(), StubYouTube(), StubLastfm())
+    assert await orchestrator.search_all_platforms("song", platforms=["napster"]) == {
+        "status": "error", "message": "Unknown platforms: napster"
+    }
+    assert await orchestrator.search_all_platforms("song", types=["tracks", "podcasts"]) == {
+        "status": "error", "message": "Unknown types: podcasts"
+    }
+
+@pytest.mark.asyncio
+async def test_only_selected_platforms_and_types_are_searched():
+    spotify = StubSpotify()
+    orchestrator = MusicDiscoveryOrchestrator(spotify, StubYouTube(), None)
+    response = await orchestrator.search_all_platforms(
+        "song", platforms=["spotify", "lastfm"], types=["tracks", "videos"], merge=False
+    )
+    assert response["status"] == "success"
+    assert spotify.calls == [["tracks"]]
+    assert set(response["spotify"]) == {"tracks"}
+    assert "youtube" not in response
+    assert response["platforms"]["lastfm"]["status"] == "disabled"
+    assert response["platforms"]["spotify"]["status"] == "ok"
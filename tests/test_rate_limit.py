@@ -0,0 +1,54 @@
+"""
+Tests for the TokenBucket rate limiter and QuotaTracker
+"""
+
+import time
+
+import pytest
+
+from servicies.errors import QuotaExhaustedError, RateLimitedError
+from servicies.rate_limit import QuotaTracker, TokenBucket
+
+@pytest.mark.asyncio
+async def test_pause_holds_back_the_next_request():
+    bucket = TokenBucket("test", rate=100.0, capacity=10.0)
+    bucket.pause(0.05)
+
+    start = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+    assert bucket.stats()["waited"] == 1
+
+@pytest.mark.asyncio
+async def test_pause_longer_than_max_wait_rejects():
+    bucket = TokenBucket("test", rate=10.0, capacity=10.0, max_wait=1.0)
+    bucket.pause(30.0)
+    with pytest.raises(RateLimitedError) as raised:
+        await bucket.acquire()
+    assert raised.value.retry_after > 1.0
+    assert bucket.stats()["rejected"] == 1
+
+def test_pause_never_shortens_an_existing_wait():
+    bucket = TokenBucket("test", rate=10.0, capacity=10.0)
+    bucket.pause(5.0)
+    bucket.pause(1.0)
+    assert bucket.stats()["tokens"] <= -49.0
+
+@pytest.mark.asyncio
+async def test_burst_is_served_without_waiting():
+    bucket = TokenBucket("test", rate=1.0, capacity=3.0, max_wait=0.0)
+    for _ in range(3):
+        await bucket.acquire()
+    with pytest.raises(RateLimitedError):
+        await bucket.acquire()
+    assert bucket.stats()["waited"] == 0
+
+def test_exhausted_quota_resets_at_the_daily_rollover(monkeypatch):
+    tracker = QuotaTracker("youtube", daily_limit=10000, costs={"search": 100})
+    tracker.mark_exhausted()
+    with pytest.raises(QuotaExhaustedError):
+        tracker.check("search")
+
+    monkeypatch.setattr(tracker, "_today", lambda: "2099-01-01")
+    assert tracker.remaining == 10000
+    tracker.check("search")
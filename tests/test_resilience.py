@@ -0,0 +1,214 @@
+"""
+Tests for retries and the circuit breaker around upstream requests
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from servicies.errors import QuotaExhaustedError, RateLimitedError
+from servicies.http_client import BaseHTTPService
+from servicies.rate_limit import QuotaTracker
+from servicies.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, UpstreamError
+
+URL = "https://api.example.com/v1/search"
+
+def make_service(handler, max_attempts: int = 1, failure_threshold: int = 2) -> BaseHTTPService:
+    return BaseHTTPService(
+        transport=httpx.MockTransport(handler),
+        retry_policy=RetryPolicy(max_attempts=max_attempts, base_delay=0.0),
+        circuit_breaker=CircuitBreaker("http", failure_threshold=failure_threshold, recovery_timeout=30.0),
+    )
+
+def expire(breaker: CircuitBreaker) -> None:
+    """Move an open breaker past its recovery timeout"""
+    breaker.opened_at = time.monotonic() - breaker.recovery_timeout
+
+async def open_breaker(service: BaseHTTPService) -> None:
+    for _ in range(service.circuit_breaker.failure_threshold):
+        with pytest.raises(UpstreamError):
+            await service._get(URL)
+    assert service.circuit_breaker.state == CircuitBreaker.OPEN
+
+class Upstream:
+    """Mock transport handler answering with a queue of status codes, then 200"""
+
+    def __init__(self, *statuses: int, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        return httpx.Response(status, headers=self.headers if status != 200 else {}, json={})
+
+def test_retry_policy_requires_an_attempt():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+@pytest.mark.asyncio
+async def test_breaker_opens_rejects_and_closes_after_a_successful_probe():
+    upstream = Upstream(500, 500)
+    service = make_service(upstream)
+    try:
+        await open_breaker(service)
+        with pytest.raises(CircuitOpenError):
+            await service._get(URL)
+        assert upstream.requests == 2
+
+        expire(service.circuit_breaker)
+        response = await service._get(URL)
+        assert response.status_code == 200
+        assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+        assert service.circuit_breaker.stats()["rejected"] == 1
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_the_breaker():
+    upstream = Upstream(500, 500, 503)
+    service = make_service(upstream)
+    try:
+        await open_breaker(service)
+        expire(service.circuit_breaker)
+        with pytest.raises(UpstreamError):
+            await service._get(URL)
+        assert service.circuit_breaker.state == CircuitBreaker.OPEN
+        assert service.circuit_breaker.stats()["times_opened"] == 2
+        with pytest.raises(CircuitOpenError):
+            await service._get(URL)
+    finally:
+        await service.close()
+
+def test_half_open_admits_one_probe_at_a_time():
+    breaker = CircuitBreaker("http", failure_threshold=1)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+@pytest.mark.asyncio
+async def test_probe_is_released_after_a_final_429():
+    upstream = Upstream(500, 500, 429)
+    service = make_service(upstream)
+    try:
+        await open_breaker(service)
+        expire(service.circuit_breaker)
+        with pytest.raises(RateLimitedError):
+            await service._get(URL)
+        assert service.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+
+        # The next call may probe instead of being rejected until the probe times out
+        response = await service._get(URL)
+        assert response.status_code == 200
+        assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_probe_is_released_when_the_quota_is_exhausted():
+    upstream = Upstream(500, 500)
+    service = make_service(upstream)
+    try:
+        await open_breaker(service)
+        expire(service.circuit_breaker)
+        service.quota = QuotaTracker("youtube", daily_limit=0, costs={"search": 100})
+        with pytest.raises(QuotaExhaustedError):
+            await service._get(URL, endpoint="search")
+
+        service.quota = None
+        response = await service._get(URL, endpoint="search")
+        assert response.status_code == 200
+        assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_probe_is_released_when_the_caller_is_cancelled():
+    started = asyncio.Event()
+    hang = True
+    upstream = Upstream(500, 500)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if hang and not upstream.statuses:
+            started.set()
+            await asyncio.sleep(60)
+        return upstream(request)
+
+    service = make_service(handler)
+    try:
+        await open_breaker(service)
+        expire(service.circuit_breaker)
+        probe = asyncio.create_task(service._get(URL))
+        await asyncio.wait_for(started.wait(), 5)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # Let the cancelled upstream task run its cleanup
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        hang = False
+        response = await service._get(URL)
+        assert response.status_code == 200
+        assert service.circuit_breaker.state == CircuitBreaker.CLOSED
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_retries_transient_failures_until_success():
+    upstream = Upstream(503, 502)
+    service = make_service(upstream, max_attempts=3)
+    try:
+        response = await service._get(URL)
+        assert response.status_code == 200
+        assert upstream.requests == 3
+        assert service.circuit_breaker.failures == 0
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors():
+    upstream = Upstream(404)
+    service = make_service(upstream, max_attempts=3)
+    try:
+        response = await service._get(URL)
+        assert response.status_code == 404
+        assert upstream.requests == 1
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_retry_after_sets_the_backoff(monkeypatch):
+    delays = []
+
+    async def backoff(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(BaseHTTPService, "_backoff", staticmethod(backoff))
+    upstream = Upstream(503, headers={"Retry-After": "2"})
+    service = make_service(upstream, max_attempts=3)
+    try:
+        response = await service._get(URL)
+        assert response.status_code == 200
+        assert delays == [2.0]
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_gives_up_when_retry_after_is_too_long():
+    upstream = Upstream(429, 429, headers={"Retry-After": "3600"})
+    service = make_service(upstream, max_attempts=3)
+    try:
+        with pytest.raises(RateLimitedError) as raised:
+            await service._get(URL)
+        assert raised.value.retry_after == 3600.0
+        assert upstream.requests == 1
+        assert service.circuit_breaker.failures == 0
+    finally:
+        await service.close()
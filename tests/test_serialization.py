@@ -0,0 +1,68 @@
+"""
+Tests for response serialization and HTTP response helpers
+"""
+
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import serialization
+from serialization import dumps, loads
+from web_responses import CompressionMiddleware, FastJSONResponse, PrettyQueryMiddleware
+
+VALUE = {"name": "Déjà Vu", "tracks": [1, 2], "released": date(2020, 1, 2), 3: None}
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_compact_output(backend):
+    assert serialization.backend() == backend
+    assert dumps(VALUE) == '{"name":"Déjà Vu","tracks":[1,2],"released":"2020-01-02","3":null}'
+
+def test_pretty_output(backend):
+    text = dumps({"name": "Déjà Vu", "tracks": [1]}, pretty=True)
+    assert text == '{\n  "name": "Déjà Vu",\n  "tracks": [\n    1\n  ]\n}'
+    assert loads(text) == {"name": "Déjà Vu", "tracks": [1]}
+
+def make_app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(PrettyQueryMiddleware)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/small")
+    async def small():
+        return {"a": 1}
+
+    @app.get("/large")
+    async def large():
+        return {"items": ["x" * 10] * 50}
+
+    @app.get("/forced")
+    async def forced():
+        return FastJSONResponse({"a": 1}, pretty=True)
+
+    return app
+
+def test_pretty_query_parameter_and_per_response_override():
+    client = TestClient(make_app())
+    assert client.get("/small").text == '{"a":1}'
+    assert client.get("/small?pretty=true").text == '{\n  "a": 1\n}'
+    assert client.get("/forced").text == '{\n  "a": 1\n}'
+
+def test_large_bodies_are_compressed():
+    client = TestClient(make_app())
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == {"items": ["x" * 10] * 50}
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert json.loads(small.content) == {"a": 1}
@@ -0,0 +1,92 @@
+"""
+Tests for SingleFlight request coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from servicies.single_flight import SingleFlight
+
+class Upstream:
+    """Upstream call that blocks until released and counts how often it ran"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "result"
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert flight.in_flight("key")
+
+    upstream.release.set()
+    assert await asyncio.gather(*callers) == ["result"] * 3
+    assert upstream.calls == 1
+    assert flight.stats() == {"calls": 3, "upstream": 1, "collapsed": 2, "in_flight": 0}
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_shared():
+    flight = SingleFlight()
+    upstream = Upstream()
+    upstream.release.set()
+    await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+    assert upstream.calls == 2
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+
+    async def fail():
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not flight.in_flight("key")
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_keeps_the_call_for_the_others():
+    flight = SingleFlight()
+    upstream = Upstream()
+    first = asyncio.create_task(flight.do("key", upstream))
+    second = asyncio.create_task(flight.do("key", upstream))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    upstream.release.set()
+    assert await second == "result"
+    assert not upstream.cancelled
+
+@pytest.mark.asyncio
+async def test_cancelling_every_caller_cancels_the_upstream_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+    callers = [asyncio.create_task(flight.do("key", upstream)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert upstream.cancelled
+    assert not flight.in_flight("key")
+
+    # A later caller starts a fresh upstream call
+    upstream.release.set()
+    assert await flight.do("key", upstream) == "result"
+    assert upstream.calls == 2
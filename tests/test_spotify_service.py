@@ -0,0 +1,145 @@
+"""
+Tests for SpotifyService authentication and projected lookups
+"""
+
+import httpx
+import pytest
+
+from servicies import fields
+from servicies.cache import ResponseCache
+from servicies.errors import ServiceUnavailableError
+from servicies.local_index import LocalIndex
+from servicies.resilience import CircuitBreaker, RetryPolicy, UpstreamError
+from servicies.spotify_service import SpotifyService
+
+def make_service(handler) -> SpotifyService:
+    return SpotifyService(
+        "client-id", "client-secret",
+        transport=httpx.MockTransport(handler),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.0),
+        circuit_breaker=CircuitBreaker("spotify", failure_threshold=2),
+    )
+
+def search_response() -> httpx.Response:
+    return httpx.Response(200, json={"tracks": {"items": []}})
+
+@pytest.mark.asyncio
+async def test_token_request_is_retried():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == "/api/token":
+            if requests.count("/api/token") == 1:
+                return httpx.Response(503)
+            assert request.headers["Authorization"].startswith("Basic ")
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+        assert request.headers["Authorization"] == "Bearer token"
+        return search_response()
+
+    service = make_service(handler)
+    try:
+        assert await service.search_tracks("hey jude") == []
+        assert requests == ["/api/token", "/api/token", "/v1/search"]
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_token_endpoint_outage_is_not_an_empty_result():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            return httpx.Response(503)
+        return search_response()
+
+    service = make_service(handler)
+    try:
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await service.search_tracks("hey jude")
+        assert service.circuit_breaker.state == CircuitBreaker.OPEN
+    finally:
+        await service.close()
+
+@pytest.mark.asyncio
+async def test_rejected_credentials_raise_service_unavailable():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            return httpx.Response(400, json={"error": "invalid_client"})
+        return search_response()
+
+    service = make_service(handler)
+    try:
+        with pytest.raises(ServiceUnavailableError, match="authentication failed"):
+            await service.search_multi("hey jude")
+    finally:
+        await service.close()
+
+def track_item(track_id: str) -> dict:
+    return {
+        "id": track_id, "name": f"Song {track_id}", "artists": [{"name": "Artist"}],
+        "album": {"name": "Album", "release_date": "2020-01-01", "images": []},
+        "duration_ms": 180000, "popularity": 50, "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "preview_url": None,
+    }
+
+def lookup_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/token":
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+    if request.url.path == "/v1/tracks":
+        return httpx.Response(200, json={"tracks": [track_item(i) for i in request.url.params["ids"].split(",")]})
+    return httpx.Response(200, json={"tracks": {"items": [track_item("searched")]}})
+
+@pytest.mark.asyncio
+async def test_projected_calls_keep_full_records_in_the_id_cache_and_out_of_the_index():
+    service = SpotifyService(
+        "client-id", "client-secret", transport=httpx.MockTransport(lookup_handler),
+        cache=ResponseCache(), index=LocalIndex()
+    )
+    try:
+        with fields.projected(fields.resolve(["id", "name"])):
+            assert await service.get_tracks(["a", "b"]) == [{"id": "a", "name": "Song a"}, {"id": "b", "name": "Song b"}]
+            assert await service.search_tracks("song") == [{"id": "searched", "name": "Song searched"}]
+        assert service.index.stats()["documents"] == 0
+
+        found, cached_track = await service.cache.lookup(service._id_key("track", "a"))
+        assert found and cached_track == service._parse_track(track_item("a"))
+
+        # Unprojected calls are indexed in full
+        full = await service.get_tracks(["a"])
+        assert full[0]["album"] == "Album"
+        assert service.index.search("song a")[0]["album"] == "Album"
+    finally:
+        await service.close()
+
+def album_item(album_id: str) -> dict:
+    return {
+        "id": album_id, "name": f"Album {album_id}", "artists": [{"name": "Artist"}], "release_date": "2020",
+        "total_tracks": 10, "album_type": "album", "external_urls": {"spotify": "https://open.spotify.com/album/x"},
+        "images": [],
+    }
+
+@pytest.mark.asyncio
+async def test_search_multi_maps_types_to_one_request():
+    searches = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+        searches.append(request.url.params["type"])
+        return httpx.Response(200, json={
+            "tracks": {"items": [track_item("t")]},
+            "albums": {"items": [album_item("a")]},
+        })
+
+    service = make_service(handler)
+    try:
+        results = await service.search_multi("song", 5, ["tracks", "albums", "playlists"])
+        assert searches == ["track,album"]
+        assert list(results) == ["tracks", "albums"]
+        assert results["tracks"][0]["id"] == "t"
+        assert results["albums"][0]["album_type"] == "album"
+
+        assert await service.search_multi("song", 5, ["playlists"]) == {}
+        assert searches == ["track,album"]
+    finally:
+        await service.close()
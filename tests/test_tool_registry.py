@@ -0,0 +1,65 @@
+"""
+Tests for the tool registry
+"""
+
+from typing import List, Optional
+
+import pytest
+
+from servicies import fields
+from tool_registry import ToolArgumentsError, ToolRegistry
+
+registry = ToolRegistry()
+
+class Server:
+    @registry.tool("Search tracks", query="Search query", limit="Max number of results")
+    async def search(self, query: str, limit: int = 10, platforms: List[str] = None) -> List[dict]:
+        return [{"id": "1", "name": query, "limit": limit, "platforms": platforms, "projection": fields.current()}]
+
+def test_schema_is_built_from_the_signature():
+    schema = registry.get("search").schema()
+    assert schema["name"] == "search"
+    assert schema["description"] == "Search tracks"
+    properties = schema["inputSchema"]["properties"]
+    assert schema["inputSchema"]["required"] == ["query"]
+    assert properties["query"] == {"type": "string", "description": "Search query"}
+    assert properties["limit"] == {"type": "integer", "default": 10, "description": "Max number of results"}
+    assert properties["platforms"] == {"type": "array", "items": {"type": "string"}}
+    assert {"fields", "profile", "pretty"} <= set(properties)
+    assert "additionalProperties" not in schema["inputSchema"]
+
+@pytest.mark.parametrize("args, problem", [
+    ({}, "query: Field required"),
+    ({"query": "x", "limit": "many"}, "limit: Input should be a valid integer"),
+    ({"query": "x", "lmit": 5}, "lmit: Extra inputs are not permitted"),
+    ({"query": "x", "profile": "huge"}, "profile: Input should be"),
+])
+def test_invalid_arguments_are_rejected(args, problem):
+    with pytest.raises(ToolArgumentsError, match="Invalid arguments for search") as raised:
+        registry.get("search").validate(args)
+    assert problem in str(raised.value)
+
+@pytest.mark.asyncio
+async def test_call_validates_coerces_and_applies_the_projection():
+    result = await registry.call(Server(), "search", {"query": "x", "limit": "3", "fields": ["name"], "pretty": True})
+    assert result[0]["limit"] == 3
+    assert result[0]["projection"] == frozenset({"name"})
+
+    result = await registry.call(Server(), "search", {"query": "x", "profile": "minimal"})
+    assert result[0]["projection"] == fields.PROFILES["minimal"]
+
+@pytest.mark.asyncio
+async def test_unknown_tool_raises_key_error():
+    with pytest.raises(KeyError):
+        await registry.call(Server(), "missing", {})
+
+def test_registration_errors():
+    with pytest.raises(ValueError, match="already registered"):
+        @registry.tool("Again")
+        async def search(self, query: str):
+            pass
+
+    with pytest.raises(TypeError, match="unknown parameters: qeury"):
+        @ToolRegistry().tool("Typo", qeury="Search query")
+        async def typo(self, query: str):
+            pass
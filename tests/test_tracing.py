@@ -0,0 +1,124 @@
+"""
+Tests for request tracing
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from orchestrator import MusicDiscoveryOrchestrator
+from servicies import tracing
+
+def trace_record(spans: int) -> dict:
+    return {
+        "trace_id": "0" * 32, "start_time": 1700000000.0,
+        "spans": [{
+            "span_id": f"{i:016x}", "parent_id": None, "name": "span", "offset_ms": 0.0,
+            "duration_ms": 1.0, "self_ms": 1.0, "status": "ok", "attributes": {},
+        } for i in range(spans)],
+    }
+
+def test_tracing_is_off_unless_enabled(monkeypatch):
+    monkeypatch.delenv("TRACING", raising=False)
+    assert tracing.Tracer.from_env() is None
+
+    monkeypatch.setenv("TRACING", "true")
+    monkeypatch.setenv("TRACE_LOOP_LAG_INTERVAL", "0")
+    assert isinstance(tracing.Tracer.from_env(), tracing.Tracer)
+
+@pytest.mark.asyncio
+async def test_full_otlp_batch_flush_is_kept_and_awaited_on_close():
+    posted = []
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await release.wait()
+        posted.append(request)
+        return httpx.Response(200)
+
+    exporter = tracing.OTLPExporter(
+        "http://collector/v1/traces", flush_interval=60, max_batch=2, transport=httpx.MockTransport(handler)
+    )
+    await exporter.start()
+    exporter.export(trace_record(2))
+    assert len(exporter._flushes) == 1
+
+    closing = asyncio.create_task(exporter.close())
+    await asyncio.sleep(0)
+    release.set()
+    await closing
+    assert len(posted) == 1
+    assert exporter.exported == 2
+    assert not exporter._flushes
+
+class Captured:
+    def __init__(self):
+        self.records = []
+
+    def export(self, record):
+        self.records.append(record)
+
+class TracedService:
+    """Each search opens an upstream span, as BaseHTTPService does, and yields to the loop"""
+
+    def __init__(self, platform):
+        self.platform = platform
+
+    async def _search(self, query, limit=10, *args):
+        with tracing.span("upstream", provider=self.platform):
+            await asyncio.sleep(0)
+        return []
+
+    search_multi = search_music_videos = search_music_playlists = _search
+    search_tracks = search_artists = search_albums = _search
+
+@pytest.mark.asyncio
+async def test_fan_out_spans_share_the_trace_and_link_to_their_parents():
+    captured = Captured()
+    tracing.install(tracing.Tracer(slow_ms=0, exporters=[captured], loop_lag_interval=0))
+    try:
+        orchestrator = MusicDiscoveryOrchestrator(
+            TracedService("spotify"), TracedService("youtube"), TracedService("lastfm")
+        )
+        with tracing.span("request"):
+            await orchestrator.search_all_platforms("song", types=["tracks", "videos"])
+    finally:
+        tracing.install(None)
+
+    [record] = captured.records
+    spans = {span["span_id"]: span for span in record["spans"]}
+    root = record["spans"][0]
+    assert root["name"] == "request" and root["parent_id"] is None
+
+    platform_spans = [span for span in spans.values() if span["name"].startswith("orchestrator.")]
+    assert sorted(span["name"] for span in platform_spans) == [
+        "orchestrator.lastfm", "orchestrator.spotify", "orchestrator.youtube"
+    ]
+    assert all(span["parent_id"] == root["span_id"] for span in platform_spans)
+
+    upstream = [span for span in spans.values() if span["name"] == "upstream"]
+    assert len(upstream) == 3
+    for span in upstream:
+        parent = spans[span["parent_id"]]
+        assert parent["name"] == f"orchestrator.{span['attributes']['provider']}"
+
+def test_span_outliving_its_trace_starts_a_new_trace():
+    captured = Captured()
+    tracing.install(tracing.Tracer(slow_ms=0, exporters=[captured], loop_lag_interval=0))
+    try:
+        with tracing.span("request"):
+            parent = tracing.current()
+        token = tracing._current.set(parent)
+        try:
+            with tracing.span("late"):
+                pass
+        finally:
+            tracing._current.reset(token)
+    finally:
+        tracing.install(None)
+
+    first, second = captured.records
+    assert second["name"] == "late"
+    assert second["trace_id"] != first["trace_id"]
+    assert second["spans"][0]["parent_id"] is None
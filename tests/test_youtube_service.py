@@ -0,0 +1,76 @@
+"""
+Tests for YouTubeService caching
+"""
+
+import httpx
+import pytest
+
+from servicies import fields
+from servicies.cache import ResponseCache
+from servicies.youtube_service import YouTubeService
+
+def search_response(request: httpx.Request) -> httpx.Response:
+    token = request.url.params.get("pageToken", "first")
+    return httpx.Response(200, json={
+        "items": [{
+            "id": {"videoId": f"video-{token}"},
+            "snippet": {
+                "title": f"Page {token}", "channelTitle": "Channel", "description": "",
+                "publishedAt": "2024-01-01T00:00:00Z", "thumbnails": {"high": {"url": "https://i.ytimg.com/x.jpg"}},
+            },
+        }],
+        "nextPageToken": None,
+    })
+
+@pytest.mark.asyncio
+async def test_page_tokens_differing_only_in_case_are_cached_separately():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return search_response(request)
+
+    service = YouTubeService("key", cache=ResponseCache(), transport=httpx.MockTransport(handler))
+    try:
+        upper = await service._search_page("Bohemian Rhapsody", "videos", 10, "CAOQAA")
+        lower = await service._search_page("Bohemian Rhapsody", "videos", 10, "CAoQAA")
+        assert upper["videos"][0]["id"] == "video-CAOQAA"
+        assert lower["videos"][0]["id"] == "video-CAoQAA"
+        assert len(requests) == 2
+
+        # The query is still case-folded
+        again = await service._search_page("bohemian  rhapsody", "videos", 10, "CAOQAA")
+        assert again == upper
+        assert len(requests) == 2
+    finally:
+        await service.close()
+
+def details_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        "items": [{
+            "id": video_id,
+            "snippet": {
+                "title": f"Video {video_id}", "channelTitle": "Channel", "description": "",
+                "publishedAt": "2024-01-01T00:00:00Z",
+            },
+            "contentDetails": {"duration": "PT3M"},
+            "statistics": {"viewCount": "10", "likeCount": "1"},
+        } for video_id in request.url.params["id"].split(",")],
+    })
+
+def videos_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/videos"):
+        return details_response(request)
+    return search_response(request)
+
+@pytest.mark.asyncio
+async def test_include_details_with_a_projection_that_leaves_out_the_id():
+    service = YouTubeService("key", cache=ResponseCache(), transport=httpx.MockTransport(videos_handler))
+    try:
+        with fields.projected(fields.resolve(["title", "duration"])):
+            videos = await service.search_music_videos("Bohemian Rhapsody", 10, include_details=True)
+            streamed = [video async for video in service.iter_search("Bohemian Rhapsody", max_results=1, include_details=True)]
+        assert videos == [{"title": "Page first", "duration": "PT3M"}]
+        assert streamed == videos
+    finally:
+        await service.close()
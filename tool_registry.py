@@ -0,0 +1,176 @@
+"""
+Tool registry for MCP music server
+This module provides the ToolRegistry used to declare MCP tools on MCPServer
+methods with the tool decorator. Each tool's argument model and JSON schema are
+built once from the method's typed signature, so listing tools is a cached
+lookup and calling one is a dict lookup plus pydantic validation.
+"""
+
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, List, Literal, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
+
+from servicies import fields as projection
+from servicies import tracing
+from servicies.metrics import TOOL_CALLS, TOOL_LATENCY, TOOLS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+class ToolArgumentsError(ValueError):
+    """Tool arguments failed validation"""
+
+class Tool:
+    """A registered tool: its name, description, argument model and JSON schema"""
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 func: Callable[..., Any],
+                 arguments: Type[BaseModel]):
+        self.name = name
+        self.description = description
+        self.func = func
+        self.arguments = arguments
+        self.input_schema = _input_schema(arguments)
+
+    def schema(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+    def validate(self, args: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Validated keyword arguments for the tool, raising ToolArgumentsError"""
+        try:
+            return dict(self.arguments.model_validate(args or {}))
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'arguments'}: {error['msg']}" for error in e.errors()
+            )
+            raise ToolArgumentsError(f"Invalid arguments for {self.name}: {problems}") from None
+
+    async def run(self, target: Any, arguments: Dict[str, Any]) -> Any:
+        """Call the tool method on target (an MCPServer) with validated arguments, under the requested projection
+
+        The pretty argument is left to the caller, which serializes the result.
+        """
+        arguments = dict(arguments)
+        arguments.pop("pretty", None)
+        selected = projection.resolve(arguments.pop("fields", None), arguments.pop("profile", None))
+        in_flight = TOOLS_IN_FLIGHT.labels(self.name)
+        in_flight.inc()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with projection.projected(selected), tracing.span(f"tool {self.name}") as tool_span:
+                result = await self.func(target, **arguments)
+                outcome = "error" if _is_error_result(result) else "ok"
+                if tool_span is not None:
+                    tool_span.set(outcome=outcome)
+            return result
+        finally:
+            in_flight.dec()
+            TOOL_LATENCY.labels(self.name).observe(time.perf_counter() - start)
+            TOOL_CALLS.labels(self.name, outcome).inc()
+
+    async def call(self, target: Any, args: Optional[Dict[str, Any]]) -> Any:
+        """Validate args and call the tool method on target"""
+        return await self.run(target, self.validate(args))
+
+def _is_error_result(result: Any) -> bool:
+    """Whether a tool returned an error entry instead of results"""
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, list) and len(result) == 1 and isinstance(result[0], dict) and "error" in result[0]
+
+def _strip_schema(schema: Any) -> Any:
+    """Drop pydantic titles and collapse Optional[X] into X so schemas stay small"""
+    if isinstance(schema, list):
+        return [_strip_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    schema = {key: _strip_schema(value) for key, value in schema.items() if key != "title"}
+    options = schema.get("anyOf")
+    if options and any(option == {"type": "null"} for option in options):
+        remaining = [option for option in options if option != {"type": "null"}]
+        if len(remaining) == 1:
+            del schema["anyOf"]
+            schema = {**remaining[0], **schema}
+    if schema.get("default", "") is None:
+        del schema["default"]
+    return schema
+
+def _input_schema(arguments: Type[BaseModel]) -> Dict[str, Any]:
+    schema = _strip_schema(arguments.model_json_schema())
+    schema.pop("additionalProperties", None)
+    schema.setdefault("properties", {})
+    schema.setdefault("required", [])
+    return schema
+
+def _arguments_model(name: str, func: Callable[..., Any], params: Dict[str, str]) -> Type[BaseModel]:
+    """Pydantic model for a method's parameters (after self), with descriptions from params"""
+    fields: Dict[str, Any] = {}
+    for parameter in list(inspect.signature(func).parameters.values())[1:]:
+        annotation = parameter.annotation if parameter.annotation is not inspect.Parameter.empty else Any
+        if parameter.default is None:
+            annotation = Optional[annotation]
+        default = ... if parameter.default is inspect.Parameter.empty else parameter.default
+        fields[parameter.name] = (annotation, Field(default, description=params.get(parameter.name)))
+
+    unknown = set(params) - set(fields)
+    if unknown:
+        raise TypeError(f"Tool {name} describes unknown parameters: {', '.join(sorted(unknown))}")
+
+    # Every tool accepts a field projection and a per-call output format
+    fields["fields"] = (Optional[List[str]], Field(None, description="Only return these fields of each result"))
+    fields["profile"] = (
+        Optional[Literal[tuple(projection.PROFILES)]],
+        Field(None, description=f"Named field set for results (default: {projection.DEFAULT_PROFILE})")
+    )
+    fields["pretty"] = (Optional[bool], Field(None, description="Pretty-print the JSON result"))
+    model_name = "".join(part.title() for part in name.split("_")) + "Arguments"
+    return create_model(model_name, __config__=ConfigDict(extra="forbid"), **fields)
+
+class ToolRegistry:
+    """Tools declared with the tool decorator, in declaration order"""
+
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+        self._schemas: Optional[List[Dict[str, Any]]] = None
+
+    def tool(self, description: str, name: Optional[str] = None, **params: str):
+        """Register an async method as a tool; keyword arguments describe its parameters"""
+        def decorator(func):
+            tool_name = name or func.__name__
+            if tool_name in self._tools:
+                raise ValueError(f"Tool {tool_name} is already registered")
+            self._tools[tool_name] = Tool(tool_name, description, func, _arguments_model(tool_name, func, params))
+            self._schemas = None
+            return func
+        return decorator
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        """Tool listings for list_tools, built once"""
+        if self._schemas is None:
+            self._schemas = [tool.schema() for tool in self._tools.values()]
+        return self._schemas
+
+    async def call(self, target: Any, name: str, args: Optional[Dict[str, Any]]) -> Any:
+        """Dispatch a tool call by name, raising KeyError for unknown tools"""
+        tool = self._tools.get(name)
+        if tool is None:
+            raise KeyError(name)
+        return await tool.call(target, args)
+
+registry = ToolRegistry()
+tool = registry.tool
@@ -0,0 +1,235 @@
+"""
+HTTP response helpers for the MCP Music Server web interface
+This module provides the FastJSONResponse class that renders with the shared
+serializer, the NDJSONResponse class that streams one JSON document per line,
+middlewares that turn ?pretty=true into pretty-printed output and
+?fields=/?profile= into a result projection, a compression middleware for
+large bodies (brotli when installed, gzip otherwise) and middlewares that
+record request metrics and trace spans.
+"""
+
+import gzip
+import os
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from serialization import dumps_bytes, pretty_output
+from servicies import fields as projection
+from servicies import tracing
+from servicies.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when available, compact unless the request asked for pretty output"""
+
+    def __init__(self, content: Any, *args: Any, pretty: Optional[bool] = None, **kwargs: Any):
+        self.pretty = pretty_output.get() if pretty is None else pretty
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        with tracing.span("serialize"):
+            return dumps_bytes(content, pretty=self.pretty)
+
+class NDJSONResponse(StreamingResponse):
+    """Stream each object from an async iterator as one compact JSON line, sent as soon as it is ready"""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, items: AsyncIterator[Any], status_code: int = 200):
+        super().__init__(self._lines(items), status_code=status_code)
+
+    @staticmethod
+    async def _lines(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+        async for item in items:
+            yield dumps_bytes(item) + b"\n"
+
+class PrettyQueryMiddleware:
+    """Pretty-print JSON responses for requests with ?pretty=true"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or b"pretty=" not in scope.get("query_string", b""):
+            await self.app(scope, receive, send)
+            return
+
+        value = next(
+            (part.split(b"=", 1)[1] for part in scope["query_string"].split(b"&") if part.startswith(b"pretty=")),
+            b""
+        )
+        token = pretty_output.set(value.lower() in (b"1", b"true", b"yes", b"on"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pretty_output.reset(token)
+
+class ProjectionQueryMiddleware:
+    """Apply ?fields=a,b or ?profile=minimal|standard|full to every route's results"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        query_string = scope.get("query_string", b"") if scope["type"] == "http" else b""
+        if b"fields=" not in query_string and b"profile=" not in query_string:
+            await self.app(scope, receive, send)
+            return
+
+        params = QueryParams(query_string)
+        try:
+            selected = projection.resolve(
+                [field for field in params.get("fields", "").split(",") if field.strip()],
+                params.get("profile")
+            )
+        except ValueError as e:
+            response = FastJSONResponse({"detail": str(e)}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        with projection.projected(selected):
+            await self.app(scope, receive, send)
+
+def available_encodings() -> List[str]:
+    """Content encodings the server can produce, most preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+class CompressionMiddleware:
+    """Compress single-chunk responses of at least minimum_size bytes
+
+    Streaming responses (several body chunks, e.g. NDJSON) pass through untouched so
+    clients keep receiving them incrementally.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        """Middleware options from RESPONSE_COMPRESSION_* environment variables"""
+        return {
+            "minimum_size": int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', 1024)),
+            "gzip_level": int(os.getenv('RESPONSE_GZIP_LEVEL', 6)),
+            "brotli_quality": int(os.getenv('RESPONSE_BROTLI_QUALITY', 4)),
+        }
+
+    def _choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding in available_encodings():
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if message.get("more_body", False) or len(body) < self.minimum_size or "content-encoding" in headers:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+class MetricsMiddleware:
+    """Record latency, status code and in-flight count of every HTTP request, labelled by route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; templates keep label values few
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(scope["method"], route, status).inc()
+
+class TracingMiddleware:
+    """Open a root trace span for every HTTP request and return its ID in an X-Trace-Id header"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracing.span(f"{scope['method']} {scope['path']}") as request_span:
+            if request_span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    request_span.set(status=message["status"])
+                    MutableHeaders(raw=message["headers"]).append("X-Trace-Id", request_span.trace_id)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    request_span.name = f"{scope['method']} {route}"
+                    request_span.set(path=scope["path"])
@@ -3,12 +3,45 @@
 Web interface for the MCP Music Server
 """
 
-from fastapi import FastAPI, HTTPException
+import os
+from contextlib import aclosing, asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
 import uvicorn
 from mcp_server_class import MCPServer
+from orchestrator import Platform, ResultType
+from web_responses import (
+    CompressionMiddleware, FastJSONResponse, MetricsMiddleware, NDJSONResponse, PrettyQueryMiddleware,
+    ProjectionQueryMiddleware, TracingMiddleware
+)
+from servicies import metrics
+from tool_registry import Tool, registry
 
-app = FastAPI(title="MCP Music Server", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open service HTTP clients on startup and close them on shutdown"""
+    await music_server.startup()
+    try:
+        yield
+    finally:
+        await music_server.shutdown()
+
+app = FastAPI(
+    title="MCP Music Server",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
+
+def split_list(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated query parameter"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
 
 # Add CORS middleware
 app.add_middleware(
@@ -18,6 +51,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrettyQueryMiddleware)
+app.add_middleware(ProjectionQueryMiddleware)
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options_from_env())
+app.add_middleware(TracingMiddleware)
+# Added last so it is outermost and times the whole request
+app.add_middleware(MetricsMiddleware)
 
 # Initialize the music server
 music_server = MCPServer()
@@ -26,6 +65,51 @@ music_server = MCPServer()
 async def root():
     return {"message": "MCP Music Server API", "status": "running"}
 
+@app.get("/health")
+async def health():
+    """Circuit breaker state per provider"""
+    return music_server.health()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters and size"""
+    return music_server.cache_stats()
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    """Counts of identical in-flight upstream calls that were collapsed"""
+    return music_server.coalescing_stats()
+
+@app.get("/limits/stats")
+async def rate_limit_stats():
+    """Rate limiter state per provider and YouTube quota usage"""
+    return music_server.rate_limit_stats()
+
+@app.get("/index/stats")
+async def local_index_stats():
+    """Size and usage of the local search index"""
+    return music_server.local_index_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/stats")
+async def server_stats():
+    """Metrics summary: per-route, per-tool and per-provider latency percentiles and errors"""
+    return await music_server.get_server_stats()
+
+@app.get("/cassette/stats")
+async def cassette_stats():
+    """Record/replay cassette counters"""
+    return music_server.cassette_stats()
+
+@app.get("/tracing/stats")
+async def tracing_stats():
+    """Traces seen, kept as slow or sampled, and where they are exported"""
+    return music_server.tracing_stats()
+
 @app.get("/search/spotify/{query}")
 async def search_spotify_tracks(query: str, limit: int = 10):
     """Search Spotify tracks"""
@@ -36,14 +120,24 @@ async def search_spotify_tracks(query: str, limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/search/youtube/{query}")
-async def search_youtube_videos(query: str, max_results: int = 10):
+async def search_youtube_videos(query: str, max_results: int = 10, include_details: bool = False):
     """Search YouTube videos"""
     try:
-        results = await music_server.search_youtube_videos(query, max_results)
+        results = await music_server.search_youtube_videos(query, max_results, include_details)
         return {"query": query, "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/youtube/videos")
+async def get_youtube_videos_details(ids: str):
+    """Get details for comma-separated YouTube video IDs"""
+    try:
+        video_ids = split_list(ids) or []
+        results = await music_server.get_youtube_videos_details(video_ids)
+        return {"ids": video_ids, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/search/lastfm/{query}")
 async def search_lastfm_songs(query: str, limit: int = 10):
     """Search Last.fm songs"""
@@ -54,13 +148,95 @@ async def search_lastfm_songs(query: str, limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/search/all/{query}")
-async def search_all_platforms(query: str, limit: int = 5):
-    """Search across all platforms"""
+async def search_all_platforms(query: str,
+                               limit: int = 5,
+                               platforms: Optional[str] = None,
+                               types: Optional[str] = None,
+                               merge: bool = True,
+                               local_first: bool = False):
+    """Search across all platforms, optionally only comma-separated platforms and types"""
     try:
-        results = await music_server.search_all_platforms(query, limit)
+        results = await music_server.search_all_platforms(
+            query, limit, split_list(platforms), split_list(types), merge, local_first
+        )
         return {"query": query, "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batches with at least this many queries stream NDJSON unless the request says otherwise
+BATCH_STREAM_MIN_QUERIES = int(os.getenv('BATCH_STREAM_MIN_QUERIES', 50))
+
+class BatchSearchRequest(BaseModel):
+    """Body of POST /search/batch"""
+    queries: List[str] = Field(description="Search queries")
+    limit: int = Field(default=5, description="Max number of results per query, platform and type")
+    platforms: Optional[List[Platform]] = Field(default=None, description="Platforms to search (default: all)")
+    types: Optional[List[ResultType]] = Field(default=None, description="Result types to search for (default: all)")
+    merge: bool = Field(default=False, description="Group the same song across platforms into works")
+    stream: Optional[bool] = Field(
+        default=None,
+        description="Stream one NDJSON line per query as it finishes (default: for large batches or Accept: application/x-ndjson)"
+    )
+
+@app.post("/search/batch")
+async def search_batch(body: BatchSearchRequest, request: Request):
+    """Search many queries at once, each distinct query once, with results keyed by query"""
+    error = music_server.batch_error(body.queries)
+    if error:
+        raise HTTPException(status_code=400 if music_server.orchestrator else 503, detail=error)
+
+    stream = body.stream
+    if stream is None:
+        stream = ("application/x-ndjson" in request.headers.get("accept", "")
+                  or len(body.queries) >= BATCH_STREAM_MIN_QUERIES)
+    if not stream:
+        try:
+            return await music_server.search_batch(body.queries, body.limit, body.platforms, body.types, body.merge)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def lines():
+        distinct = 0
+        results = music_server.search_batch_results(body.queries, body.limit, body.platforms, body.types, body.merge)
+        async with aclosing(results) as batch:
+            async for group, result in batch:
+                distinct += 1
+                for query in group:
+                    yield {"query": query, "results": result}
+        yield {"done": True, "queries": len(body.queries), "distinct": distinct}
+
+    return NDJSONResponse(lines())
+
+@app.get("/search/local/{query}")
+async def search_local(query: str, limit: int = 10, platforms: Optional[str] = None, types: Optional[str] = None):
+    """Search previously fetched results without calling upstream"""
+    try:
+        results = await music_server.search_local(query, limit, split_list(platforms), split_list(types))
+        return {"query": query, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/tools")
+async def list_tools():
+    """Schemas of every MCP tool, each also served as POST /tools/{name}"""
+    return registry.schemas()
+
+def add_tool_route(tool: Tool) -> None:
+    """Expose a registered tool as a POST route taking its arguments as a JSON body"""
+    arguments = tool.arguments
+
+    async def call_tool(args: arguments):
+        try:
+            results = await tool.run(music_server, dict(args))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        # A pretty argument in the body overrides ?pretty
+        return FastJSONResponse({"tool": tool.name, "results": results}, pretty=args.pretty)
+
+    app.post(f"/tools/{tool.name}", name=tool.name, summary=tool.description)(call_tool)
+
+for registered_tool in registry:
+    add_tool_route(registered_tool)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file